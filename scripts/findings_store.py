@@ -0,0 +1,203 @@
+"""
+Persistent SQLite findings store for incremental report generation.
+
+Two kinds of state are kept:
+ - parsed artifacts, keyed by (repo, content hash, loader version): an
+   artifact whose bytes haven't changed since a previous run is not parsed
+   again, its findings are read back from the store;
+ - runs, keyed by (repo, commit), each with the fingerprints of its unique
+   findings, so a run can be diffed against the repo's previous run (new,
+   fixed and persisting findings) and severity totals can be trended.
+
+Diffs run as indexed SQL anti-joins on (run_id, fingerprint), so nothing
+proportional to the number of findings is held in memory.
+"""
+import hashlib
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from report_loaders import LOADER_VERSION, SEVERITIES, Finding
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    repo TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    loader TEXT NOT NULL,
+    loader_version INTEGER NOT NULL,
+    ingested_at REAL NOT NULL,
+    PRIMARY KEY (repo, content_hash, loader)
+);
+CREATE TABLE IF NOT EXISTS artifact_findings (
+    repo TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    loader TEXT NOT NULL,
+    scanner TEXT, file TEXT, line INTEGER, rule_id TEXT, severity TEXT, message TEXT, family TEXT, snippet TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_artifact_findings_artifact ON artifact_findings (repo, content_hash, loader);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    repo TEXT NOT NULL,
+    commit_sha TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    total INTEGER NOT NULL DEFAULT 0,
+    critical INTEGER NOT NULL DEFAULT 0,
+    high INTEGER NOT NULL DEFAULT 0,
+    medium INTEGER NOT NULL DEFAULT 0,
+    low INTEGER NOT NULL DEFAULT 0,
+    info INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (repo, commit_sha)
+);
+CREATE TABLE IF NOT EXISTS findings (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    fingerprint TEXT NOT NULL,
+    scanners TEXT NOT NULL,
+    file TEXT, line INTEGER, rule_id TEXT, severity TEXT, message TEXT,
+    PRIMARY KEY (run_id, fingerprint)
+);
+CREATE INDEX IF NOT EXISTS ix_findings_fingerprint ON findings (fingerprint);
+"""
+
+_FINDING_COLUMNS = "fingerprint, scanners, file, line, rule_id, severity, message"
+
+
+def content_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FindingsStore:
+    """Findings per artifact and per run in a local SQLite file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA foreign_keys = ON")
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.execute("PRAGMA synchronous = NORMAL")
+        self.db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.db.close()
+
+    # --- parsed artifacts -----------------------------------------------------------------
+
+    def has_artifact(self, repo: str, digest: str, loader: str) -> bool:
+        row = self.db.execute(
+            "SELECT loader_version FROM artifacts WHERE repo = ? AND content_hash = ? AND loader = ?",
+            (repo, digest, loader),
+        ).fetchone()
+        return row is not None and row["loader_version"] == LOADER_VERSION
+
+    def save_artifact(self, repo: str, digest: str, loader: str, findings: Iterable[Finding]) -> None:
+        with self.db:
+            self.db.execute(
+                "DELETE FROM artifact_findings WHERE repo = ? AND content_hash = ? AND loader = ?",
+                (repo, digest, loader),
+            )
+            self.db.executemany(
+                "INSERT INTO artifact_findings VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                # Fingerprints depend on the checkout, not on the artifact, so they aren't cached
+                ((repo, digest, loader, *finding[:8]) for finding in findings),
+            )
+            self.db.execute(
+                "INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?, ?, ?)",
+                (repo, digest, loader, LOADER_VERSION, time.time()),
+            )
+
+    def artifact_findings(self, repo: str, digest: str, loader: str) -> Iterator[Finding]:
+        rows = self.db.execute(
+            "SELECT scanner, file, line, rule_id, severity, message, family, snippet FROM artifact_findings"
+            " WHERE repo = ? AND content_hash = ? AND loader = ?",
+            (repo, digest, loader),
+        )
+        for row in rows:
+            yield Finding(*row)
+
+    def prune_artifacts(self, repo: str, keep: Iterable[Tuple[str, str]]) -> int:
+        """Forget the repo's parsed artifacts other than the ``(content hash, loader)`` pairs in ``keep``."""
+        keep = set(keep)
+        stale = [
+            (row["content_hash"], row["loader"])
+            for row in self.db.execute("SELECT content_hash, loader FROM artifacts WHERE repo = ?", (repo,))
+            if (row["content_hash"], row["loader"]) not in keep
+        ]
+        with self.db:
+            for digest, loader in stale:
+                for table in ("artifact_findings", "artifacts"):
+                    self.db.execute(
+                        f"DELETE FROM {table} WHERE repo = ? AND content_hash = ? AND loader = ?",
+                        (repo, digest, loader),
+                    )
+        return len(stale)
+
+    # --- runs -----------------------------------------------------------------------------
+
+    def record_run(self, repo: str, commit: str, findings: Iterable[Tuple[str, Finding, List[str]]]) -> int:
+        """Store the run's unique ``(fingerprint, finding, scanners)``; re-recording a commit replaces it."""
+        totals = dict.fromkeys(SEVERITIES, 0)
+
+        def rows():
+            for fingerprint, finding, scanners in findings:
+                totals[finding.severity] += 1
+                yield (
+                    run_id, fingerprint, ",".join(scanners),
+                    finding.file, finding.line, finding.rule_id, finding.severity, finding.message,
+                )
+
+        with self.db:
+            self.db.execute("DELETE FROM runs WHERE repo = ? AND commit_sha = ?", (repo, commit))
+            run_id = self.db.execute(
+                "INSERT INTO runs (repo, commit_sha, created_at) VALUES (?, ?, ?)", (repo, commit, time.time())
+            ).lastrowid
+            self.db.executemany(
+                f"INSERT OR IGNORE INTO findings (run_id, {_FINDING_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows()
+            )
+            self.db.execute(
+                "UPDATE runs SET total = ?, critical = ?, high = ?, medium = ?, low = ?, info = ? WHERE id = ?",
+                (sum(totals.values()), *(totals[severity] for severity in SEVERITIES), run_id),
+            )
+        return run_id
+
+    def previous_run(self, run_id: int) -> Optional[sqlite3.Row]:
+        return self.db.execute(
+            "SELECT * FROM runs WHERE repo = (SELECT repo FROM runs WHERE id = ?) AND id < ? ORDER BY id DESC LIMIT 1",
+            (run_id, run_id),
+        ).fetchone()
+
+    def _only_in(self, run_id: int, other_run_id: int) -> str:
+        return (
+            f"FROM findings f WHERE f.run_id = {int(run_id)} AND NOT EXISTS "
+            f"(SELECT 1 FROM findings o WHERE o.run_id = {int(other_run_id)} AND o.fingerprint = f.fingerprint)"
+        )
+
+    def iter_new(self, run_id: int, previous_id: int) -> Iterator[Dict[str, Any]]:
+        for row in self.db.execute(f"SELECT {_FINDING_COLUMNS} {self._only_in(run_id, previous_id)}"):
+            yield {**dict(row), "scanners": row["scanners"].split(",")}
+
+    def iter_fixed(self, run_id: int, previous_id: int) -> Iterator[Dict[str, Any]]:
+        return self.iter_new(previous_id, run_id)
+
+    def diff(self, run_id: int) -> Dict[str, Any]:
+        """Counts of new, fixed and persisting findings against the repo's previous run."""
+        previous = self.previous_run(run_id)
+        total = self.db.execute("SELECT total FROM runs WHERE id = ?", (run_id,)).fetchone()["total"]
+        if previous is None:
+            return {"previous_commit": None, "new": total, "fixed": 0, "persisting": 0}
+        new = self.db.execute(f"SELECT COUNT(*) {self._only_in(run_id, previous['id'])}").fetchone()[0]
+        fixed = self.db.execute(f"SELECT COUNT(*) {self._only_in(previous['id'], run_id)}").fetchone()[0]
+        return {"previous_commit": previous["commit_sha"], "new": new, "fixed": fixed, "persisting": total - new}
+
+    def trend(self, repo: str, limit: int = 30) -> List[Dict[str, Any]]:
+        """Severity totals of the repo's latest runs, oldest first."""
+        rows = self.db.execute(
+            "SELECT commit_sha, created_at, total, critical, high, medium, low, info FROM runs"
+            " WHERE repo = ? ORDER BY id DESC LIMIT ?",
+            (repo, limit),
+        ).fetchall()
+        return [dict(row) for row in reversed(rows)]
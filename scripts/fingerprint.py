@@ -0,0 +1,118 @@
+"""
+Cross-scanner finding fingerprints.
+
+A fingerprint is the SHA-1 of
+ - the normalized path (URI scheme, CI workspace prefixes and ``./`` removed),
+ - the rule family (CWE or CVE when the scanner names one, otherwise its rule id),
+ - the line window (``line // LINE_WINDOW``), and
+ - the flagged source line with whitespace collapsed.
+
+The flagged line is read from the checked-out source tree when one is
+given, so Bandit, Semgrep and CodeQL hash the same text for the same
+location even though their own snippets differ; otherwise the scanner's
+snippet is used. Source files are cached by ``cached_files`` (LRU; None
+keeps every file read), which should cover the files a report touches or
+lookups thrash. ``FindingIndex`` is a plain hash index over fingerprints,
+so deduplicating N findings is O(N) time and O(unique findings) memory.
+"""
+import hashlib
+import posixpath
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import unquote
+
+from report_loaders import SEVERITIES, Finding
+
+LINE_WINDOW = 5
+SOURCE_CACHE_FILES = 4096
+
+_SCHEME = re.compile(r"^[a-z][a-z0-9+.-]*://", re.IGNORECASE)
+_WORKSPACE = re.compile(r"^/(?:github/workspace|home/runner/work/[^/]+/[^/]+|src)/")
+_SEVERITY_RANK = {severity: rank for rank, severity in enumerate(reversed(SEVERITIES))}
+
+
+@lru_cache(maxsize=65536)
+def normalize_path(path: str) -> str:
+    path = unquote(str(path or "").strip()).replace("\\", "/")
+    path = _WORKSPACE.sub("", _SCHEME.sub("", path))
+    if not path:
+        return ""
+    path = posixpath.normpath(path)
+    return "" if path == "." else path.lstrip("/")
+
+
+def normalize_snippet(snippet: str) -> str:
+    return " ".join(snippet.split()) if snippet else ""
+
+
+class Fingerprinter:
+    """Compute fingerprints, reading flagged lines from ``source_dir`` when it is set."""
+
+    def __init__(
+        self,
+        source_dir: Optional[str] = None,
+        line_window: int = LINE_WINDOW,
+        cached_files: Optional[int] = SOURCE_CACHE_FILES,
+    ):
+        self.source_dir = Path(source_dir).resolve() if source_dir else None
+        self.line_window = line_window
+        self._lines = lru_cache(maxsize=cached_files)(self._read_lines)
+
+    def _read_lines(self, path: str) -> Tuple[str, ...]:
+        source = (self.source_dir / path).resolve()
+        if self.source_dir not in source.parents:
+            return ()
+        try:
+            with open(source, encoding="utf-8", errors="replace") as f:
+                return tuple(f.read().splitlines())
+        except OSError:
+            return ()
+
+    def source_line(self, path: str, line: int) -> str:
+        if self.source_dir is None or not path or line <= 0:
+            return ""
+        lines = self._lines(path)
+        return lines[line - 1] if line <= len(lines) else ""
+
+    def __call__(self, finding: Finding) -> str:
+        if finding.fingerprint:
+            return finding.fingerprint
+        path = normalize_path(finding.file)
+        snippet = self.source_line(path, finding.line) or finding.snippet
+        family = (finding.family or finding.rule_id).lower()
+        key = "\0".join((path, family, str(finding.line // self.line_window), normalize_snippet(snippet)))
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+class FindingIndex:
+    """fingerprint -> (finding with the highest reported severity, scanners that reported it)."""
+
+    def __init__(self, fingerprinter: Optional[Fingerprinter] = None):
+        self.fingerprinter = fingerprinter or Fingerprinter()
+        self._entries: Dict[str, list] = {}
+        self.added = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, finding: Finding, fingerprint: Optional[str] = None) -> str:
+        fingerprint = fingerprint or self.fingerprinter(finding)
+        self.added += 1
+        entry = self._entries.get(fingerprint)
+        if entry is None:
+            self._entries[fingerprint] = [finding, {finding.scanner}]
+            return fingerprint
+        entry[1].add(finding.scanner)
+        if _SEVERITY_RANK[finding.severity] > _SEVERITY_RANK[entry[0].severity]:
+            entry[0] = entry[0]._replace(severity=finding.severity)
+        return fingerprint
+
+    def scanners(self, fingerprint: str) -> List[str]:
+        entry = self._entries.get(fingerprint)
+        return sorted(entry[1]) if entry else []
+
+    def __iter__(self) -> Iterator[Tuple[str, Finding, List[str]]]:
+        for fingerprint, (finding, scanners) in self._entries.items():
+            yield fingerprint, finding, sorted(scanners)
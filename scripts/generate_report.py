@@ -1,75 +1,158 @@
 """
 Generate comprehensive security reports from scanning artifacts.
 """
+import argparse
 import json
 import logging
+import os
+import re
+from collections import Counter
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Any
-from jinja2 import Template
+from typing import Dict, Iterable, List, Any, Optional
+from jinja2 import Environment, FileSystemLoader
+
+from findings_store import FindingsStore, content_hash
+from fingerprint import SOURCE_CACHE_FILES, FindingIndex, Fingerprinter
+from report_loaders import LOADERS, Finding, discover, load_artifacts
 
 logger = logging.getLogger(__name__)
 
+TEMPLATE_DIR = Path(__file__).resolve().parent / "templates"
+
+
+@lru_cache(maxsize=None)
+def template_environment(template_dir: str = str(TEMPLATE_DIR)) -> Environment:
+    """Shared Environment per template directory, so each template is compiled once per process."""
+    return Environment(
+        loader=FileSystemLoader(template_dir),
+        autoescape=True,
+        auto_reload=False,
+        trim_blocks=True,
+        lstrip_blocks=True,
+    )
+
+
+def render_template(name: str, output_file, **context) -> None:
+    """Stream a template to ``output_file`` chunk by chunk instead of building the whole document in memory."""
+    template = template_environment().get_template(name)
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.writelines(template.generate(**context))
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-") or "scanner"
+
 
 class ReportGenerator:
     """Generate security reports from various scanners."""
 
-    def __init__(self, artifact_dir: str = "./artifacts"):
+    def __init__(
+        self,
+        artifact_dir: str = "./artifacts",
+        workers: Optional[int] = None,
+        source_dir: Optional[str] = None,
+        source_cache_files: Optional[int] = SOURCE_CACHE_FILES,
+        store: Optional[FindingsStore] = None,
+        repo: str = "",
+        commit: str = "",
+    ):
         self.artifact_dir = Path(artifact_dir)
-        self.findings = {
+        self.workers = workers
+        # Optional persistent store: skips re-parsing unchanged artifacts and diffs against the previous run
+        self.store = store
+        self.repo = repo
+        self.commit = commit
+        # Flagged lines are read from source_dir (the checkout) so scanners fingerprint the same text
+        # source_cache_files should cover the files the report touches (None: no limit)
+        self.fingerprinter = Fingerprinter(source_dir, cached_files=source_cache_files)
+        # Artifacts that failed to parse; their scanners' findings are missing from this run
+        self.failed_artifacts: List[str] = []
+        self.findings: Dict[str, List[Finding]] = {
             "bandit": [],
             "semgrep": [],
             "safety": [],
             "trivy": [],
             "pylint": [],
+            "codeql": [],
+            "dependency-check": [],
         }
 
-    def load_bandit_report(self, report_path: str) -> List[Dict]:
-        """Load Bandit JSON report."""
+    def load_report(self, loader: str, report_path: str) -> List[Finding]:
+        """Stream one report through a registered loader (see report_loaders.LOADERS), deduplicated."""
         try:
-            with open(report_path) as f:
-                data = json.load(f)
-                return data.get("results", [])
+            return self.deduplicate_findings(LOADERS[loader].parse(report_path))
         except FileNotFoundError:
-            logger.warning(f"Bandit report not found: {report_path}")
+            logger.warning(f"{loader} report not found: {report_path}")
             return []
 
-    def load_semgrep_report(self, report_path: str) -> List[Dict]:
+    def load_bandit_report(self, report_path: str) -> List[Finding]:
+        """Load Bandit JSON report."""
+        return self.load_report("bandit", report_path)
+
+    def load_semgrep_report(self, report_path: str) -> List[Finding]:
         """Load Semgrep JSON report."""
-        try:
-            with open(report_path) as f:
-                data = json.load(f)
-                return data.get("results", [])
-        except FileNotFoundError:
-            logger.warning(f"Semgrep report not found: {report_path}")
-            return []
+        return self.load_report("semgrep", report_path)
 
-    def load_safety_report(self, report_path: str) -> List[Dict]:
+    def load_safety_report(self, report_path: str) -> List[Finding]:
         """Load Safety JSON report."""
-        try:
-            with open(report_path) as f:
-                data = json.load(f)
-                # Safety returns different format
-                return data if isinstance(data, list) else []
-        except FileNotFoundError:
-            logger.warning(f"Safety report not found: {report_path}")
-            return []
+        return self.load_report("safety", report_path)
+
+    def load_artifacts(self, loaders: Optional[Iterable[str]] = None) -> int:
+        """Discover every known report under artifact_dir and parse them in parallel; returns the file count."""
+        jobs = discover(self.artifact_dir, loaders)
+        logger.info(f"Found {len(jobs)} scanner artifacts in {self.artifact_dir}")
+        loader_for = {path: loader for loader, path in jobs}
+        to_parse = jobs
+        if self.store is not None:
+            digests = {path: content_hash(path) for _, path in jobs}
+            to_parse = []
+            for loader, path in jobs:
+                if self.store.has_artifact(self.repo, digests[path], loader):
+                    logger.info(f"Unchanged since a previous run, reusing stored findings: {path}")
+                    self._add_findings(self.store.artifact_findings(self.repo, digests[path], loader))
+                else:
+                    to_parse.append((loader, path))
+
+        for path, findings in load_artifacts(to_parse, self.workers):
+            if findings is None:
+                # Not stored, so the artifact is parsed (and the failure logged) again next run
+                self.failed_artifacts.append(path)
+                continue
+            logger.info(f"Parsed {len(findings)} findings from {path}")
+            if self.store is not None:
+                self.store.save_artifact(self.repo, digests[path], loader_for[path], findings)
+            self._add_findings(findings)
+
+        if self.store is not None:
+            self.store.prune_artifacts(self.repo, {(digests[path], loader) for loader, path in jobs})
+        for scanner, findings in self.findings.items():
+            self.findings[scanner] = self.deduplicate_findings(findings)
+        return len(jobs)
 
-    def deduplicate_findings(self, findings: List[Dict]) -> List[Dict]:
-        """Remove duplicate findings."""
+    def _add_findings(self, findings: Iterable[Finding]) -> None:
+        for finding in findings:
+            self.findings.setdefault(finding.scanner, []).append(finding)
+
+    def deduplicate_findings(self, findings: Iterable[Finding]) -> List[Finding]:
+        """Remove duplicate findings by fingerprint; only unique findings are kept, so streams stay memory-bounded."""
         seen = set()
         unique_findings = []
 
         for finding in findings:
-            finding_hash = f"{finding.get('file', '')}:{finding.get('line', 0)}:{finding.get('id', '')}"
-            if finding_hash not in seen:
-                seen.add(finding_hash)
+            # Fingerprinted once here; aggregate_findings reuses it
+            if not finding.fingerprint:
+                finding = finding._replace(fingerprint=self.fingerprinter(finding))
+            if finding.fingerprint not in seen:
+                seen.add(finding.fingerprint)
                 unique_findings.append(finding)
 
         return unique_findings
 
     def aggregate_findings(self) -> Dict[str, Any]:
-        """Aggregate all findings."""
+        """Aggregate all findings, merging the same finding reported by several scanners."""
         aggregated = {
             "timestamp": datetime.now().isoformat(),
             "summary": {
@@ -82,123 +165,92 @@ class ReportGenerator:
             },
             "by_scanner": {},
             "by_severity": {},
+            "failed_artifacts": list(self.failed_artifacts),
         }
 
+        # One fingerprint per finding: dedup within each scanner, then merge across scanners
+        index = FindingIndex(self.fingerprinter)
         for scanner_name, findings in self.findings.items():
-            findings = self.deduplicate_findings(findings)
-            aggregated["by_scanner"][scanner_name] = {
-                "count": len(findings),
-                "findings": findings[:10],  # Top 10 only
-            }
-            aggregated["summary"]["total_issues"] += len(findings)
-
+            seen = {}
             for finding in findings:
-                severity = finding.get("severity", "info").lower()
-                if severity in aggregated["summary"]:
-                    aggregated["summary"][severity] += 1
+                fingerprint = finding.fingerprint or self.fingerprinter(finding)
+                if fingerprint not in seen:
+                    seen[fingerprint] = finding
+                    index.add(finding, fingerprint)
+            aggregated["by_scanner"][scanner_name] = {"count": len(seen), "findings": seen.items()}
+
+        for data in aggregated["by_scanner"].values():
+            data["findings"] = [
+                {**finding._asdict(), "fingerprint": fingerprint, "scanners": index.scanners(fingerprint)}
+                for fingerprint, finding in data["findings"]
+            ]
+
+        agreement = Counter()
+        for _, finding, scanners in index:
+            aggregated["summary"]["total_issues"] += 1
+            aggregated["summary"][finding.severity] += 1
+            if len(scanners) > 1:
+                agreement["+".join(scanners)] += 1
+        aggregated["cross_scanner"] = {
+            "reported": index.added,
+            "unique": len(index),
+            "confirmed": sum(agreement.values()),
+            "agreement": dict(agreement.most_common()),
+        }
+
+        if self.store is not None:
+            run_id = self.store.record_run(self.repo, self.commit, index)
+            aggregated["diff"] = self.store.diff(run_id)
+            previous = self.store.previous_run(run_id)
+            if previous is not None:
+                aggregated["diff"]["new_findings"] = list(self.store.iter_new(run_id, previous["id"]))
+                aggregated["diff"]["fixed_findings"] = list(self.store.iter_fixed(run_id, previous["id"]))
+            aggregated["trend"] = self.store.trend(self.repo)
 
         return aggregated
 
-    def generate_html_report(self, aggregated: Dict, output_file: str = "security-report.html"):
-        """Generate HTML report."""
-        html_template = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Security Report</title>
-            <style>
-                body { font-family: 'Segoe UI', Tahoma, Geneva, Verdana; margin: 20px; background: #f5f5f5; }
-                .container { max-width: 1200px; margin: 0 auto; background: white; padding: 20px; border-radius: 8px; }
-                h1 { color: #d32f2f; }
-                .summary { display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 15px; margin: 20px 0; }
-                .stat-card { background: #f9f9f9; padding: 15px; border-radius: 4px; border-left: 4px solid #d32f2f; }
-                .stat-number { font-size: 24px; font-weight: bold; }
-                .stat-label { color: #666; }
-                .critical { color: #d32f2f; font-weight: bold; }
-                .high { color: #f57c00; }
-                .medium { color: #fbc02d; }
-                .low { color: #388e3c; }
-                table { width: 100%; border-collapse: collapse; margin: 20px 0; }
-                th, td { padding: 12px; text-align: left; border-bottom: 1px solid #ddd; }
-                th { background: #f5f5f5; font-weight: bold; }
-                .scanner-section { margin: 30px 0; }
-                footer { margin-top: 40px; padding-top: 20px; border-top: 1px solid #ddd; color: #666; font-size: 12px; }
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <h1>🔒 Security Assessment Report</h1>
-                <p><strong>Generated:</strong> {{ timestamp }}</p>
-                
-                <div class="summary">
-                    <div class="stat-card">
-                        <div class="stat-number critical">{{ summary.total_issues }}</div>
-                        <div class="stat-label">Total Issues</div>
-                    </div>
-                    <div class="stat-card">
-                        <div class="stat-number critical">{{ summary.critical }}</div>
-                        <div class="stat-label">Critical</div>
-                    </div>
-                    <div class="stat-card">
-                        <div class="stat-number high">{{ summary.high }}</div>
-                        <div class="stat-label">High</div>
-                    </div>
-                    <div class="stat-card">
-                        <div class="stat-number medium">{{ summary.medium }}</div>
-                        <div class="stat-label">Medium</div>
-                    </div>
-                    <div class="stat-card">
-                        <div class="stat-number low">{{ summary.low }}</div>
-                        <div class="stat-label">Low</div>
-                    </div>
-                </div>
-
-                {% for scanner, data in by_scanner.items() %}
-                <div class="scanner-section">
-                    <h2>{{ scanner|upper }} - {{ data.count }} Issues</h2>
-                    {% if data.findings %}
-                    <table>
-                        <tr>
-                            <th>File</th>
-                            <th>Line</th>
-                            <th>Severity</th>
-                            <th>Issue</th>
-                        </tr>
-                        {% for finding in data.findings %}
-                        <tr>
-                            <td>{{ finding.file|default('N/A') }}</td>
-                            <td>{{ finding.line|default('N/A') }}</td>
-                            <td class="{{ finding.severity|default('low')|lower }}">{{ finding.severity|default('LOW') }}</td>
-                            <td>{{ finding.message|default(finding.issue|default('N/A')) }}</td>
-                        </tr>
-                        {% endfor %}
-                    </table>
-                    {% else %}
-                    <p><strong>✅ No issues found</strong></p>
-                    {% endif %}
-                </div>
-                {% endfor %}
-
-                <footer>
-                    <p>Report generated by DevSecOps Automation Pipeline</p>
-                    <p>For questions or issues, please contact the security team.</p>
-                </footer>
-            </div>
-        </body>
-        </html>
-        """
-
-        template = Template(html_template)
-        html_content = template.render(
+    def generate_html_report(
+        self, aggregated: Dict, output_file: str = "security-report.html", page_size: Optional[int] = None
+    ):
+        """Generate HTML report: one page, or with page_size an index page plus paginated per-scanner pages."""
+        if not page_size:
+            render_template(
+                "report.html.j2",
+                output_file,
+                timestamp=aggregated["timestamp"],
+                summary=aggregated["summary"],
+                by_scanner=aggregated["by_scanner"],
+            )
+            logger.info(f"HTML report generated: {output_file}")
+            return
+
+        index = Path(output_file)
+        pages = {}
+        for scanner, data in aggregated["by_scanner"].items():
+            findings = data["findings"]
+            page_count = -(-len(findings) // page_size)
+            pages[scanner] = [f"{index.stem}-{_slug(scanner)}-{page}.html" for page in range(1, page_count + 1)]
+            for page, name in enumerate(pages[scanner], 1):
+                render_template(
+                    "scanner.html.j2",
+                    index.with_name(name),
+                    timestamp=aggregated["timestamp"],
+                    scanner=scanner,
+                    count=data["count"],
+                    findings=islice(findings, (page - 1) * page_size, page * page_size),
+                    page=page,
+                    pages=pages[scanner],
+                    index=index.name,
+                )
+        render_template(
+            "index.html.j2",
+            index,
             timestamp=aggregated["timestamp"],
             summary=aggregated["summary"],
             by_scanner=aggregated["by_scanner"],
+            pages=pages,
         )
-
-        with open(output_file, "w") as f:
-            f.write(html_content)
-
-        logger.info(f"HTML report generated: {output_file}")
+        logger.info(f"HTML report generated: {output_file} ({sum(map(len, pages.values()))} scanner pages)")
 
     def generate_json_report(self, aggregated: Dict, output_file: str = "security-report.json"):
         """Generate JSON report."""
@@ -207,12 +259,13 @@ class ReportGenerator:
 
         logger.info(f"JSON report generated: {output_file}")
 
-    def generate_reports(self, output_dir: str = "."):
+    def generate_reports(self, output_dir: str = ".", page_size: Optional[int] = None):
         """Generate all reports."""
         aggregated = self.aggregate_findings()
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
 
         self.generate_json_report(aggregated, f"{output_dir}/security-report.json")
-        self.generate_html_report(aggregated, f"{output_dir}/security-report.html")
+        self.generate_html_report(aggregated, f"{output_dir}/security-report.html", page_size)
 
         return aggregated
 
@@ -220,12 +273,38 @@ class ReportGenerator:
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
 
-    generator = ReportGenerator(artifact_dir="./artifacts")
+    parser = argparse.ArgumentParser(description="Generate security reports from scanner artifacts")
+    parser.add_argument("--artifact-dir", default="./artifacts", help="Directory searched for scanner reports")
+    parser.add_argument("--output-dir", default="./reports")
+    parser.add_argument("--source-dir", default=".", help="Checkout the scanners ran on (for fingerprints)")
+    parser.add_argument(
+        "--source-cache-files",
+        type=int,
+        default=SOURCE_CACHE_FILES,
+        help="Source files kept in memory while fingerprinting; 0 keeps every file",
+    )
+    parser.add_argument("--workers", type=int, default=None, help="Parallel parser processes (default: CPU count)")
+    parser.add_argument("--page-size", type=int, default=0, help="Findings per HTML page; 0 renders a single page")
+    parser.add_argument("--store", default="", help="SQLite findings store for incremental runs and run-to-run diffs")
+    parser.add_argument("--repo", default=os.getenv("GITHUB_REPOSITORY", "local"))
+    parser.add_argument("--commit", default=os.getenv("GITHUB_SHA", "local"))
+    args = parser.parse_args()
+
+    store = FindingsStore(args.store) if args.store else None
+    generator = ReportGenerator(
+        artifact_dir=args.artifact_dir,
+        workers=args.workers,
+        source_dir=args.source_dir,
+        source_cache_files=args.source_cache_files or None,
+        store=store,
+        repo=args.repo,
+        commit=args.commit,
+    )
 
     # Load reports
-    generator.findings["bandit"] = generator.load_bandit_report("./artifacts/bandit-report.json")
-    generator.findings["semgrep"] = generator.load_semgrep_report("./artifacts/semgrep.json")
-    generator.findings["safety"] = generator.load_safety_report("./artifacts/safety.json")
+    generator.load_artifacts()
 
     # Generate reports
-    generator.generate_reports(output_dir="./reports")
+    generator.generate_reports(output_dir=args.output_dir, page_size=args.page_size)
+    if store is not None:
+        store.close()
@@ -0,0 +1,222 @@
+"""
+Incremental JSON parsing for large scanner artifacts.
+
+``iter_json_items(path, "results.item")`` yields the elements of the
+``results`` array one at a time without loading the whole document, using
+ijson when it is installed and otherwise a small stdlib parser that reads the
+file in chunks, decodes only the items on the requested path with
+``json.JSONDecoder.raw_decode`` and skips everything else with a bracket
+scanner. Memory use is bounded by the largest single item, not the file size.
+
+Prefixes follow ijson's syntax: dotted object keys, with ``item`` standing
+for "every element of this array" (``"item"`` for a top-level array,
+``"runs.item.results.item"`` for SARIF results). ``iter_json_paths`` reads
+several prefixes in the same pass.
+"""
+import json
+import re
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover - optional speed-up
+    ijson = None
+
+CHUNK_SIZE = 1 << 16
+
+_decoder = json.JSONDecoder()
+_STRUCTURE = re.compile(r'["\[\]{}]')
+_STRING_END = re.compile(r'["\\]')
+_WHITESPACE = " \t\r\n"
+# Characters that can continue a number, so one decoded just before them may be cut short
+_NUMBER_TAIL = frozenset("0123456789.eE+-")
+
+
+class _Reader:
+    """Sliding window over a text file with just enough JSON to walk and skip values."""
+
+    def __init__(self, f, chunk_size: int = CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Drop consumed text and append more; reads grow with the window so long values stay linear."""
+        if self.eof:
+            return False
+        chunk = self.f.read(max(self.chunk_size, len(self.buf) - self.pos))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character (not consumed), or "" at end of input."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def next_char(self) -> str:
+        ch = self.peek()
+        if not ch:
+            raise ValueError("Unexpected end of JSON input")
+        self.pos += 1
+        return ch
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            # A number ending the window, or followed by a partial fraction/exponent
+            # ("1." decodes as 1), may continue in the next chunk
+            if (end == len(self.buf) or self.buf[end] in _NUMBER_TAIL) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+    def skip(self) -> None:
+        """Consume one value without decoding it."""
+        if self.peek() not in ("[", "{"):
+            self.value()
+            return
+        depth = 0
+        in_string = False
+        while True:
+            match = (_STRING_END if in_string else _STRUCTURE).search(self.buf, self.pos)
+            if match is None:
+                self.pos = len(self.buf)
+                if not self.fill():
+                    raise ValueError("Unexpected end of JSON input")
+                continue
+            ch = match.group()
+            self.pos = match.end()
+            if in_string:
+                if ch == '"':
+                    in_string = False
+                    continue
+                # Skip the escaped character, which may be the first one of the next chunk
+                if self.pos >= len(self.buf) and not self.fill():
+                    raise ValueError("Unexpected end of JSON input")
+                self.pos += 1
+            elif ch == '"':
+                in_string = True
+            elif ch in "[{":
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return
+
+
+def _walk(reader: _Reader, node: Dict[Optional[str], Any]) -> Iterator[Tuple[str, Any]]:
+    """Yield ``(prefix, value)`` under ``node``, a trie of path segments whose ``None`` entry is a requested prefix."""
+    prefix = node.get(None)
+    children = {key: child for key, child in node.items() if key is not None}
+    if prefix is not None and not children:
+        yield prefix, reader.value()
+        return
+    if prefix is not None:
+        yield prefix, None
+    opening = reader.peek()
+    if opening == "[" and "item" in children:
+        closing = "]"
+    elif opening == "{":
+        closing = "}"
+    else:
+        # Path doesn't match this document's shape: nothing to yield
+        reader.skip()
+        return
+    reader.pos += 1
+    if reader.peek() == closing:
+        reader.pos += 1
+        return
+    while True:
+        if closing == "]":
+            yield from _walk(reader, children["item"])
+        else:
+            key = reader.value()
+            if reader.next_char() != ":":
+                raise ValueError(f"Expected ':' after key {key!r}")
+            if key in children:
+                yield from _walk(reader, children[key])
+            else:
+                reader.skip()
+        ch = reader.next_char()
+        if ch == closing:
+            return
+        if ch != ",":
+            raise ValueError(f"Expected ',' or '{closing}', got {ch!r}")
+
+
+def _trie(prefixes: Iterable[str]) -> Dict[Optional[str], Any]:
+    root: Dict[Optional[str], Any] = {}
+    for prefix in prefixes:
+        node = root
+        for key in prefix.split(".") if prefix else []:
+            node = node.setdefault(key, {})
+        node[None] = prefix
+    return root
+
+
+def _ijson_paths(f, prefixes: Iterable[str]) -> Iterator[Tuple[str, Any]]:
+    targets = set(prefixes)
+    marks = {prefix for prefix in targets if any(other.startswith(prefix + ".") for other in targets)}
+    events = ijson.parse(f, use_float=True)
+    for prefix, event, value in events:
+        if prefix not in targets or event in ("map_key", "end_map", "end_array"):
+            continue
+        if prefix in marks:
+            yield prefix, None
+        elif event in ("start_map", "start_array"):
+            builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+            depth = 1
+            for _, event, value in events:
+                builder.event(event, value)
+                depth += event in ("start_map", "start_array")
+                depth -= event in ("end_map", "end_array")
+                if depth == 0:
+                    break
+            yield prefix, builder.value
+        else:
+            yield prefix, value
+
+
+def iter_json_items(path, prefix: str, chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+    """Yield the values at ``prefix`` in the JSON file at ``path``, one at a time."""
+    if ijson is not None:
+        with open(path, "rb") as f:
+            yield from ijson.items(f, prefix, use_float=True)
+        return
+    for _, value in iter_json_paths(path, [prefix], chunk_size):
+        yield value
+
+
+def iter_json_paths(path, prefixes: Iterable[str], chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[str, Any]]:
+    """
+    Yield ``(prefix, value)`` for the values at any of ``prefixes``, in document order, in one pass.
+
+    A prefix that is an ancestor of another requested prefix is not decoded:
+    it yields ``(prefix, None)`` where each of its values starts, so callers
+    can tell e.g. which SARIF run the following results belong to.
+    """
+    prefixes = list(prefixes)
+    if ijson is not None:
+        with open(path, "rb") as f:
+            yield from _ijson_paths(f, prefixes)
+        return
+    with open(path, encoding="utf-8") as f:
+        yield from _walk(_Reader(f, chunk_size), _trie(prefixes))
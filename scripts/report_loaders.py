@@ -0,0 +1,369 @@
+"""
+Scanner report loaders for the report generator.
+
+Every loader streams one artifact format into compact ``Finding`` records
+(file, line, rule id, severity, message, plus the rule family - CWE or CVE
+when the scanner reports one - and the flagged source line, which feed the
+cross-scanner fingerprint). Loaders register themselves with
+the glob patterns of the artifacts they understand, so ``discover()`` can
+pick up everything under an artifact directory and ``load_artifacts()`` can
+parse the files in parallel in a process pool.
+
+Supported formats: Bandit, Semgrep, Safety, Trivy, Pylint (``--output-format=json``)
+and OWASP Dependency-Check JSON, plus SARIF 2.1 (CodeQL, and the SARIF output
+of the other scanners). A ``.sarif`` file is skipped when a native JSON report
+with the same name sits next to it, since both carry the same findings.
+"""
+import fnmatch
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from json_stream import iter_json_items, iter_json_paths
+
+logger = logging.getLogger(__name__)
+
+SEVERITIES = ("critical", "high", "medium", "low", "info")
+
+# Bump when any parser's output changes; findings cached in a FindingsStore by older versions are re-parsed
+LOADER_VERSION = 1
+
+_SEVERITY_ALIASES = {
+    "error": "high",
+    "fatal": "high",
+    "moderate": "medium",
+    "warning": "medium",
+    "note": "low",
+    "negligible": "low",
+    "refactor": "low",
+    "convention": "low",
+    "informational": "info",
+    "none": "info",
+}
+
+
+class Finding(NamedTuple):
+    """One normalized finding; a tuple, so millions of them stay small and pickle cheaply."""
+
+    scanner: str
+    file: str
+    line: int
+    rule_id: str
+    severity: str
+    message: str
+    family: str = ""
+    snippet: str = ""
+    # Cross-scanner fingerprint, filled in once by the report generator (see fingerprint.py)
+    fingerprint: str = ""
+
+
+def normalize_severity(value) -> str:
+    severity = str(value or "info").strip().lower()
+    severity = _SEVERITY_ALIASES.get(severity, severity)
+    return severity if severity in SEVERITIES else "info"
+
+
+def severity_from_score(score) -> Optional[str]:
+    """Severity band for a CVSS-style 0-10 score, or None if there is no usable score."""
+    try:
+        score = float(score)
+    except (TypeError, ValueError):
+        return None
+    if score >= 9.0:
+        return "critical"
+    if score >= 7.0:
+        return "high"
+    if score >= 4.0:
+        return "medium"
+    return "low" if score > 0 else "info"
+
+
+class Loader(NamedTuple):
+    name: str
+    patterns: Tuple[str, ...]
+    parse: Callable[[str], Iterator[Finding]]
+
+
+LOADERS: Dict[str, Loader] = {}
+
+
+def register_loader(name: str, *patterns: str):
+    """Register ``parse(path) -> Iterator[Finding]`` for artifacts matching ``patterns`` (relative paths)."""
+
+    def decorator(parse: Callable[[str], Iterator[Finding]]):
+        LOADERS[name] = Loader(name, patterns, parse)
+        return parse
+
+    return decorator
+
+
+_CWE = re.compile(r"cwe[-/_]?0*(\d+)", re.IGNORECASE)
+
+
+def cwe(*values) -> str:
+    """``CWE-<n>`` from the first value (string, list of strings, or number) that names one."""
+    for value in values:
+        if isinstance(value, (list, tuple)):
+            found = cwe(*value)
+        elif isinstance(value, int):
+            found = f"CWE-{value}"
+        else:
+            match = _CWE.search(str(value or ""))
+            found = f"CWE-{match.group(1)}" if match else ""
+        if found:
+            return found
+    return ""
+
+
+def _first_line(text) -> str:
+    text = str(text or "")
+    # Semgrep OSS redacts matched lines
+    return "" if text.strip() == "requires login" else text.split("\n", 1)[0]
+
+
+def _bandit_line(code: str, line_number: int) -> str:
+    """Bandit's ``code`` is numbered context lines; pick the flagged one."""
+    for numbered in (code or "").splitlines():
+        number, _, text = numbered.partition(" ")
+        if number.isdigit() and int(number) == line_number:
+            return text
+    return ""
+
+
+def _int(value) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+@register_loader("bandit", "*bandit*.json")
+def parse_bandit(path: str) -> Iterator[Finding]:
+    for result in iter_json_items(path, "results.item"):
+        line = _int(result.get("line_number"))
+        yield Finding(
+            "bandit",
+            result.get("filename", ""),
+            line,
+            result.get("test_id", ""),
+            normalize_severity(result.get("issue_severity")),
+            result.get("issue_text", ""),
+            cwe((result.get("issue_cwe") or {}).get("id")),
+            _bandit_line(result.get("code", ""), line),
+        )
+
+
+@register_loader("semgrep", "*semgrep*.json")
+def parse_semgrep(path: str) -> Iterator[Finding]:
+    for result in iter_json_items(path, "results.item"):
+        extra = result.get("extra") or {}
+        yield Finding(
+            "semgrep",
+            result.get("path", ""),
+            _int((result.get("start") or {}).get("line")),
+            result.get("check_id", ""),
+            normalize_severity(extra.get("severity")),
+            extra.get("message", ""),
+            cwe((extra.get("metadata") or {}).get("cwe")),
+            _first_line(extra.get("lines")),
+        )
+
+
+@register_loader("safety", "*safety*.json")
+def parse_safety(path: str) -> Iterator[Finding]:
+    # Safety 1.x prints a list of [package, spec, version, advisory, id, ...]; 2.x+ an object
+    with open(path, encoding="utf-8") as f:
+        legacy = f.read(4096).lstrip()[:1] == "["
+    if legacy:
+        for item in iter_json_items(path, "item"):
+            package, _, version, advisory, vulnerability_id = (list(item) + [""] * 5)[:5]
+            # No severity in Safety's free database
+            yield Finding("safety", package, 0, str(vulnerability_id), "medium", f"{package} {version}: {advisory}")
+        return
+    for item in iter_json_items(path, "vulnerabilities.item"):
+        package = item.get("package_name", "")
+        cvss = (item.get("severity") or {}).get("cvssv3") or {}
+        yield Finding(
+            "safety",
+            package,
+            0,
+            str(item.get("vulnerability_id", "")),
+            normalize_severity(cvss.get("base_severity") or severity_from_score(cvss.get("base_score")) or "medium"),
+            f"{package} {item.get('analyzed_version', '')}: {item.get('advisory', '')}",
+            str(item.get("CVE") or ""),
+        )
+
+
+@register_loader("trivy", "*trivy*.json")
+def parse_trivy(path: str) -> Iterator[Finding]:
+    for result in iter_json_items(path, "Results.item"):
+        target = result.get("Target", "")
+        for vulnerability in result.get("Vulnerabilities") or ():
+            yield Finding(
+                "trivy",
+                target,
+                0,
+                vulnerability.get("VulnerabilityID", ""),
+                normalize_severity(vulnerability.get("Severity")),
+                f"{vulnerability.get('PkgName', '')} {vulnerability.get('InstalledVersion', '')}: "
+                f"{vulnerability.get('Title') or vulnerability.get('Description', '')}",
+                vulnerability.get("VulnerabilityID", ""),
+            )
+        for misconfiguration in result.get("Misconfigurations") or ():
+            yield Finding(
+                "trivy",
+                target,
+                _int((misconfiguration.get("CauseMetadata") or {}).get("StartLine")),
+                misconfiguration.get("AVDID") or misconfiguration.get("ID", ""),
+                normalize_severity(misconfiguration.get("Severity")),
+                misconfiguration.get("Message") or misconfiguration.get("Title", ""),
+                cwe(misconfiguration.get("CweIDs")),
+            )
+        for secret in result.get("Secrets") or ():
+            yield Finding(
+                "trivy",
+                target,
+                _int(secret.get("StartLine")),
+                secret.get("RuleID", ""),
+                normalize_severity(secret.get("Severity")),
+                secret.get("Title", ""),
+                "",
+                secret.get("Match", ""),
+            )
+
+
+@register_loader("pylint", "*pylint*.json")
+def parse_pylint(path: str) -> Iterator[Finding]:
+    for message in iter_json_items(path, "item"):
+        yield Finding(
+            "pylint",
+            message.get("path", ""),
+            _int(message.get("line")),
+            message.get("message-id") or message.get("symbol", ""),
+            normalize_severity(message.get("type")),
+            message.get("message", ""),
+        )
+
+
+@register_loader("dependency-check", "*dependency-check*.json")
+def parse_dependency_check(path: str) -> Iterator[Finding]:
+    for dependency in iter_json_items(path, "dependencies.item"):
+        for vulnerability in dependency.get("vulnerabilities") or ():
+            score = (vulnerability.get("cvssv3") or {}).get("baseScore")
+            yield Finding(
+                "dependency-check",
+                dependency.get("fileName", ""),
+                0,
+                vulnerability.get("name", ""),
+                severity_from_score(score) or normalize_severity(vulnerability.get("severity")),
+                vulnerability.get("description", ""),
+                vulnerability.get("name", ""),
+            )
+
+
+def _sarif_scanner(name: str) -> str:
+    name = name.lower()
+    for known in ("codeql", "semgrep", "trivy", "bandit", "dependency-check"):
+        if known in name:
+            return known
+    return name.replace(" ", "-") or "sarif"
+
+
+def _sarif_rules(tool: dict) -> Tuple[Dict[str, Optional[str]], Dict[str, str]]:
+    """``(severity, family)`` by rule id from a run's ``tool.driver.rules``."""
+    rule_severity, rule_family = {}, {}
+    for rule in (tool.get("driver") or {}).get("rules") or []:
+        properties = rule.get("properties") or {}
+        rule_family[rule.get("id")] = cwe(properties.get("tags"), properties.get("cwe"))
+        level = (rule.get("defaultConfiguration") or {}).get("level")
+        rule_severity[rule.get("id")] = severity_from_score(properties.get("security-severity")) or (
+            normalize_severity(level) if level else None
+        )
+    return rule_severity, rule_family
+
+
+@register_loader("sarif", "*.sarif", "*.sarif.json")
+def parse_sarif(path: str) -> Iterator[Finding]:
+    # One pass: each run's tool (small) is decoded whole, its results are streamed. Results that
+    # precede their run's tool in the file are held until the tool arrives.
+    scanner, rule_severity, rule_family = None, {}, {}
+    pending: List[dict] = []
+
+    def finding(result: dict) -> Finding:
+        rule_id = result.get("ruleId") or (result.get("rule") or {}).get("id", "")
+        location = ((result.get("locations") or [{}])[0]).get("physicalLocation") or {}
+        region = location.get("region") or {}
+        level = result.get("level")
+        return Finding(
+            scanner or "sarif",
+            (location.get("artifactLocation") or {}).get("uri", ""),
+            _int(region.get("startLine")),
+            rule_id,
+            rule_severity.get(rule_id) or normalize_severity(level or "warning"),
+            (result.get("message") or {}).get("text", ""),
+            rule_family.get(rule_id, ""),
+            _first_line((region.get("snippet") or {}).get("text")),
+        )
+
+    for prefix, value in iter_json_paths(path, ("runs.item", "runs.item.tool", "runs.item.results.item")):
+        if prefix == "runs.item":
+            # A new run: anything still pending belonged to a run without a tool
+            yield from map(finding, pending)
+            pending.clear()
+            scanner, rule_severity, rule_family = None, {}, {}
+        elif prefix == "runs.item.tool":
+            scanner = _sarif_scanner((value.get("driver") or {}).get("name", ""))
+            rule_severity, rule_family = _sarif_rules(value)
+            yield from map(finding, pending)
+            pending.clear()
+        elif scanner is None:
+            pending.append(value)
+        else:
+            yield finding(value)
+    yield from map(finding, pending)
+
+
+def discover(artifact_dir, loaders: Optional[Iterable[str]] = None) -> List[Tuple[str, str]]:
+    """``(loader name, path)`` for every artifact under ``artifact_dir`` that a loader recognises."""
+    root = Path(artifact_dir)
+    selected = [LOADERS[name] for name in (loaders or LOADERS)]
+    # SARIF first: "semgrep.sarif.json" also matches the native "*semgrep*.json" pattern
+    selected.sort(key=lambda loader: loader.name != "sarif")
+    jobs = []
+    paths = sorted(p for p in root.rglob("*") if p.is_file()) if root.is_dir() else []
+    names = {p.as_posix() for p in paths}
+    for path in paths:
+        relative = path.relative_to(root).as_posix().lower()
+        if path.suffix == ".sarif" and path.with_suffix(".json").as_posix() in names:
+            continue
+        for loader in selected:
+            if any(fnmatch.fnmatch(relative, pattern) for pattern in loader.patterns):
+                jobs.append((loader.name, str(path)))
+                break
+    return jobs
+
+
+def parse_artifact(loader_name: str, path: str) -> Optional[List[Finding]]:
+    """Parse one artifact (runs in a pool worker); exact repeats within the file are dropped. None if it failed."""
+    try:
+        return list(dict.fromkeys(LOADERS[loader_name].parse(path)))
+    except (OSError, ValueError, AttributeError, TypeError) as e:
+        logger.error(f"Failed to parse {loader_name} artifact {path}: {e}")
+        return None
+
+
+def load_artifacts(
+    jobs: Sequence[Tuple[str, str]], workers: Optional[int] = None
+) -> Iterator[Tuple[str, Optional[List[Finding]]]]:
+    """Yield ``(path, findings)`` per artifact, parsing up to ``workers`` files at once; findings is None on failure."""
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        for loader_name, path in jobs:
+            yield path, parse_artifact(loader_name, path)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        names, paths = zip(*jobs)
+        yield from zip(paths, pool.map(parse_artifact, names, paths))
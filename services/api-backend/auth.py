@@ -0,0 +1,106 @@
+"""
+Local verification of oauth2-service access tokens.
+
+Tokens are checked in-process instead of calling oauth2-service ``/me`` on
+every request, using either
+ - the shared HS256 secret (JWT_SECRET_KEY, same value as oauth2-service's SECRET_KEY), or
+ - the RS256 public keys published at OAUTH2_JWKS_URL (fetched once, refetched on rotation).
+
+Validated claims are kept in a bounded LRU keyed by the token's SHA-256 and
+dropped once the token's ``exp`` has passed, so repeat requests with the same
+bearer token skip signature verification entirely.
+"""
+import hashlib
+import time
+from typing import Callable, Dict, Optional
+
+import httpx
+from jose import JWTError, jwt
+
+from ttl_cache import TTLCache
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class ClaimsCache(TTLCache):
+    """Bounded LRU of token hash -> claims; entries expire at the token's ``exp``."""
+
+    def __init__(self, max_entries: int = 10000, clock: Callable[[], float] = time.time):
+        super().__init__(max_entries, clock=clock)
+
+    @staticmethod
+    def key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[dict]:
+        return super().get(self.key(token))
+
+    def set(self, token: str, claims: dict) -> None:
+        super().set(self.key(token), claims, expires_at=float(claims["exp"]))
+
+
+class TokenVerifier:
+    """Verify access tokens locally and map their claims to the ``/me`` user shape."""
+
+    def __init__(
+        self,
+        secret: str = "",
+        jwks_url: str = "",
+        cache: Optional[ClaimsCache] = None,
+        jwks_refresh_interval: float = 60.0,
+        clock: Callable[[], float] = time.time,
+        http_client: Optional[httpx.AsyncClient] = None,
+    ):
+        if not secret and not jwks_url:
+            raise ValueError("Either a shared secret or a JWKS URL is required")
+        self.secret = secret
+        self.jwks_url = jwks_url
+        self.cache = cache if cache is not None else ClaimsCache(clock=clock)
+        self.jwks_refresh_interval = jwks_refresh_interval
+        self.clock = clock
+        self.http_client = http_client
+        self._jwks: Optional[Dict] = None
+        self._jwks_fetched_at = float("-inf")
+
+    async def fetch_jwks(self) -> Dict:
+        if self.http_client is not None:
+            response = await self.http_client.get(self.jwks_url, timeout=5.0)
+        else:
+            async with httpx.AsyncClient() as client:
+                response = await client.get(self.jwks_url, timeout=5.0)
+        response.raise_for_status()
+        self._jwks = response.json()
+        self._jwks_fetched_at = self.clock()
+        return self._jwks
+
+    def _decode(self, token: str, key) -> dict:
+        algorithms = ["RS256"] if self.jwks_url else ["HS256"]
+        return jwt.decode(token, key, algorithms=algorithms)
+
+    async def _verify_signature(self, token: str) -> dict:
+        if not self.jwks_url:
+            return self._decode(token, self.secret)
+        if self._jwks is None:
+            await self.fetch_jwks()
+        try:
+            return self._decode(token, self._jwks)
+        except JWTError:
+            # Keys may have been rotated; refetch, but not more often than jwks_refresh_interval
+            if self.clock() - self._jwks_fetched_at < self.jwks_refresh_interval:
+                raise
+            return self._decode(token, await self.fetch_jwks())
+
+    async def verify(self, token: str) -> dict:
+        """Return ``{"id", "username"}`` for a valid token, or raise InvalidToken."""
+        claims = self.cache.get(token)
+        if claims is None:
+            try:
+                claims = await self._verify_signature(token)
+            except (JWTError, httpx.HTTPError) as e:
+                raise InvalidToken(str(e))
+            if "uid" not in claims or "sub" not in claims or "exp" not in claims:
+                raise InvalidToken("Token lacks the uid/sub/exp claims")
+            self.cache.set(token, claims)
+        return {"id": claims["uid"], "username": claims["sub"]}
@@ -0,0 +1,141 @@
+"""
+Bulk product import for POST /products/bulk.
+
+Rows arrive as a JSON array or as NDJSON (one object per line, read
+incrementally from the request stream). Each row is validated with
+ProductSchema; valid rows are inserted in chunks, one multi-row
+INSERT ... RETURNING and one commit per chunk, so a failing chunk is rolled
+back on its own and earlier chunks stay imported.
+"""
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Product, ProductSchema
+
+
+class LineTooLong(ValueError):
+    """An NDJSON line exceeded ``max_line_bytes``; maps to 413."""
+
+    def __init__(self, row: int, max_line_bytes: int):
+        super().__init__(f"Row {row} exceeds {max_line_bytes} bytes")
+        self.row = row
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes], max_line_bytes: int = 1 << 20) -> AsyncIterator[Tuple[int, bytes]]:
+    """
+    Yield ``(line_number, line)`` for every non-blank line of a chunked body.
+
+    At most one line is buffered, and only each new chunk is searched for
+    newlines; a line longer than ``max_line_bytes`` raises LineTooLong.
+    """
+    buffer = bytearray()
+    line_number = 0
+    async for chunk in chunks:
+        start = 0
+        newline = chunk.find(b"\n")
+        while newline >= 0:
+            buffer += chunk[start:newline]
+            line_number += 1
+            if len(buffer) > max_line_bytes:
+                raise LineTooLong(line_number, max_line_bytes)
+            if buffer.strip():
+                yield line_number, bytes(buffer)
+            buffer.clear()
+            start = newline + 1
+            newline = chunk.find(b"\n", start)
+        buffer += chunk[start:]
+        if len(buffer) > max_line_bytes:
+            raise LineTooLong(line_number + 1, max_line_bytes)
+    if buffer.strip():
+        yield line_number + 1, bytes(buffer)
+
+
+def parse_json_array(body: bytes) -> List[Any]:
+    try:
+        items = json.loads(body)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON: {e}")
+    if not isinstance(items, list):
+        raise ValueError("Expected a JSON array of products")
+    return items
+
+
+async def iter_items(items: List[Any]) -> AsyncIterator[Tuple[int, Any]]:
+    """Yield ``(index, item)`` for a parsed JSON array (rows numbered from 1)."""
+    for index, item in enumerate(items, start=1):
+        yield index, item
+
+
+def validate_row(raw: Any, owner_id: int) -> Dict[str, Any]:
+    """Parse (NDJSON lines) and validate one row; raises ValueError with a readable message."""
+    if isinstance(raw, bytes):
+        try:
+            raw = json.loads(raw)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON: {e}")
+    try:
+        product = ProductSchema.model_validate(raw)
+    except ValidationError as e:
+        raise ValueError(
+            "; ".join(f"{'.'.join(map(str, error['loc'])) or 'row'}: {error['msg']}" for error in e.errors())
+        )
+    return {**product.model_dump(), "owner_id": owner_id}
+
+
+async def insert_chunk(db: AsyncSession, rows: List[Dict[str, Any]]) -> List[int]:
+    """Insert ``rows`` in one statement (batched multi-row VALUES) and commit; returns their ids in order."""
+    statement = insert(Product).returning(Product.id, sort_by_parameter_order=True)
+    result = await db.execute(statement, rows)
+    ids = list(result.scalars())
+    await db.commit()
+    return ids
+
+
+async def import_products(
+    db: AsyncSession,
+    records: AsyncIterator[Tuple[int, Any]],
+    owner_id: int,
+    chunk_size: int,
+    on_commit: Optional[Callable[[], Awaitable[None]]] = None,
+) -> Dict[str, Any]:
+    """
+    Validate and insert ``records``; returns per-row errors and per-chunk results.
+
+    ``on_commit`` is awaited after every committed chunk (e.g. to invalidate caches).
+    """
+    summary: Dict[str, Any] = {"received": 0, "inserted": 0, "failed": 0, "chunks": [], "errors": []}
+    pending: List[Tuple[int, Dict[str, Any]]] = []
+
+    async def flush() -> None:
+        chunk = {"chunk": len(summary["chunks"]), "first_row": pending[0][0], "last_row": pending[-1][0]}
+        try:
+            chunk["ids"] = await insert_chunk(db, [row for _, row in pending])
+            chunk["inserted"] = len(chunk["ids"])
+            summary["inserted"] += chunk["inserted"]
+            if on_commit is not None:
+                await on_commit()
+        except SQLAlchemyError as e:
+            await db.rollback()
+            chunk.update(inserted=0, ids=[], error=str(e.orig if getattr(e, "orig", None) else e))
+            summary["failed"] += len(pending)
+        summary["chunks"].append(chunk)
+        pending.clear()
+
+    async for row_number, raw in records:
+        summary["received"] += 1
+        try:
+            pending.append((row_number, validate_row(raw, owner_id)))
+        except ValueError as e:
+            summary["failed"] += 1
+            summary["errors"].append({"row": row_number, "error": str(e)})
+            continue
+        if len(pending) >= chunk_size:
+            await flush()
+    if pending:
+        await flush()
+    return summary
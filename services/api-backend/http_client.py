@@ -0,0 +1,68 @@
+"""
+Shared outbound HTTP client and request coalescing for service-to-service calls.
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+import httpx
+
+T = TypeVar("T")
+
+
+def http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def build_client(
+    max_connections: int = 100,
+    max_keepalive_connections: int = 20,
+    keepalive_expiry: float = 30.0,
+    connect_timeout: float = 2.0,
+    read_timeout: float = 5.0,
+    pool_timeout: float = 2.0,
+    http2: bool = True,
+) -> httpx.AsyncClient:
+    """
+    One long-lived pooled client for the whole app (create in lifespan, close on shutdown).
+
+    Connections are kept alive between requests. HTTP/2 is offered when the
+    ``h2`` package is installed (``httpx[http2]``) and negotiated via ALPN on
+    https URLs; plain http upstreams stay on keep-alive HTTP/1.1.
+    """
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(read_timeout, connect=connect_timeout, pool=pool_timeout),
+        http2=http2 and http2_available(),
+    )
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into one execution.
+
+    Callers arriving while a call for ``key`` is in flight await its result (or
+    exception) instead of starting their own; nothing is cached afterwards.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            call = asyncio.ensure_future(fn())
+            self._calls[key] = call
+            call.add_done_callback(lambda _: self._calls.pop(key, None))
+        # A cancelled waiter must not cancel the call the other waiters share
+        return await asyncio.shield(call)
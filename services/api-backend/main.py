@@ -1,32 +1,177 @@
-from fastapi import FastAPI, Depends, HTTPException, Header
-from sqlalchemy.orm import Session
-from typing import Optional
-import httpx
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Header, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import json
 import os
 
-from models import Product
-from database import get_db, engine, Base
+from auth import ClaimsCache, InvalidToken, TokenVerifier
+from bulk import LineTooLong, import_products, iter_items, iter_ndjson, parse_json_array
+from http_client import SingleFlight, build_client
+from models import PRODUCT_FIELDS, Product
+from product_cache import LRUBackend, ProductCache, RedisBackend
+from database import get_db, engine, init_db
 
-Base.metadata.create_all(bind=engine)
+OAUTH2_URL = os.getenv("OAUTH2_URL", "http://localhost:8001")
 
-app = FastAPI(title="API Backend", version="1.0.0")
+# Local token verification: shared HS256 secret, or RS256 keys from oauth2-service's JWKS endpoint
+JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "dev-secret-key-change-in-prod")
+OAUTH2_JWKS_URL = os.getenv("OAUTH2_JWKS_URL", "")
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+# Opt-in: ask oauth2-service /me about tokens that fail local verification
+AUTH_REMOTE_FALLBACK = os.getenv("AUTH_REMOTE_FALLBACK", "false").lower() in ("1", "true", "yes")
 
-OAUTH2_URL = os.getenv("OAUTH2_URL", "http://localhost:8001")
+token_verifier = TokenVerifier(
+    secret="" if OAUTH2_JWKS_URL else JWT_SECRET_KEY,
+    jwks_url=OAUTH2_JWKS_URL,
+    cache=ClaimsCache(max_entries=AUTH_CACHE_MAX_ENTRIES),
+)
+
+# GET /products page size
+PRODUCTS_DEFAULT_LIMIT = int(os.getenv("PRODUCTS_DEFAULT_LIMIT", "100"))
+PRODUCTS_MAX_LIMIT = int(os.getenv("PRODUCTS_MAX_LIMIT", "1000"))
+# POST /products/bulk: rows per INSERT ... RETURNING / commit
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "1000"))
+# Longest NDJSON line accepted by POST /products/bulk before answering 413
+BULK_MAX_LINE_BYTES = int(os.getenv("BULK_MAX_LINE_BYTES", str(1 << 20)))
+
+# Read cache for GET /products and /products/{id} (shared via Redis when PRODUCT_CACHE_REDIS_URL is set)
+PRODUCT_CACHE_ENABLED = os.getenv("PRODUCT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+PRODUCT_CACHE_MAX_ENTRIES = int(os.getenv("PRODUCT_CACHE_MAX_ENTRIES", "10000"))
+PRODUCT_CACHE_TTL_SECONDS = float(os.getenv("PRODUCT_CACHE_TTL_SECONDS", "300"))
+PRODUCT_CACHE_REDIS_URL = os.getenv("PRODUCT_CACHE_REDIS_URL", "")
+# Replicas (processes) serving api-backend; the in-process cache can't see other replicas' writes
+API_REPLICAS = int(os.getenv("API_REPLICAS", "1"))
+
+
+def build_product_cache() -> Optional[ProductCache]:
+    if not PRODUCT_CACHE_ENABLED:
+        return None
+    if PRODUCT_CACHE_REDIS_URL:
+        backend = RedisBackend.from_url(PRODUCT_CACHE_REDIS_URL, ttl_seconds=PRODUCT_CACHE_TTL_SECONDS)
+    elif API_REPLICAS > 1:
+        print("Product cache disabled: API_REPLICAS > 1 requires PRODUCT_CACHE_REDIS_URL")
+        return None
+    else:
+        backend = LRUBackend(max_entries=PRODUCT_CACHE_MAX_ENTRIES, ttl_seconds=PRODUCT_CACHE_TTL_SECONDS)
+    return ProductCache(backend)
+
+
+product_cache = build_product_cache()
+
+# Pooled client for calls to oauth2-service (JWKS, /me fallback)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "2"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "5"))
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "2"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Concurrent checks of the same token share one verification / upstream call
+token_checks = SingleFlight()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await init_db()
+    client = build_client(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        connect_timeout=HTTP_CONNECT_TIMEOUT,
+        read_timeout=HTTP_READ_TIMEOUT,
+        pool_timeout=HTTP_POOL_TIMEOUT,
+        http2=HTTP2_ENABLED,
+    )
+    app.state.http_client = client
+    token_verifier.http_client = client
+    yield
+    token_verifier.http_client = None
+    await client.aclose()
+    await engine.dispose()
+
+
+app = FastAPI(title="API Backend", version="1.0.0", lifespan=lifespan)
 
 
 async def verify_oauth_token(authorization: Optional[str] = Header(None)) -> dict:
-    """Verify token with OAuth2 service"""
+    """Verify the bearer token locally (signature + exp), optionally falling back to OAuth2 /me"""
     if not authorization:
         raise HTTPException(status_code=401, detail="Missing authorization header")
 
     token = authorization.replace("Bearer ", "")
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{OAUTH2_URL}/me", headers={"Authorization": f"Bearer {token}"}
-        )
-        if response.status_code != 200:
+    return await token_checks.do(ClaimsCache.key(token), lambda: check_token(token))
+
+
+async def check_token(token: str) -> dict:
+    try:
+        return await token_verifier.verify(token)
+    except InvalidToken:
+        if not AUTH_REMOTE_FALLBACK:
             raise HTTPException(status_code=401, detail="Invalid token")
-        return response.json()
+    return await verify_remote(token)
+
+
+async def verify_remote(token: str) -> dict:
+    """Verify token with OAuth2 service"""
+    response = await app.state.http_client.get(
+        f"{OAUTH2_URL}/me", headers={"Authorization": f"Bearer {token}"}
+    )
+    if response.status_code != 200:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return response.json()
+
+
+async def invalidate_products(owner_id: int) -> None:
+    if product_cache is not None:
+        await product_cache.invalidate(owner_id)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str, exists: bool = False) -> bool:
+    """``*`` matches any current representation, so it only counts once the resource is known to exist."""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return (exists and "*" in candidates) or any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+async def cached_read(
+    request: Request, owner_id: int, load: Callable[[], Awaitable[Tuple[Any, Dict[str, str]]]]
+) -> Response:
+    """
+    Serve a product read through the owner's cache.
+
+    A matching If-None-Match returns 304 before any database work; a cached
+    body is returned as is; otherwise ``load()`` runs the query and returns
+    ``(content, extra_headers)``, which are cached for the owner's current generation.
+    ``If-None-Match: *`` gets a 304 only once a cached body or ``load()`` shows the resource exists.
+    """
+    generation = await product_cache.generation(owner_id) if product_cache is not None else None
+    if generation is None:
+        content, headers = await load()
+        return Response(json.dumps(jsonable_encoder(content)), media_type="application/json", headers=headers)
+
+    view = f"{request.url.path}?{'&'.join(sorted(f'{k}={v}' for k, v in request.query_params.multi_items()))}"
+    etag = product_cache.etag(owner_id, generation, view)
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        product_cache.not_modified += 1
+        return Response(status_code=304, headers=cache_headers)
+
+    cached = await product_cache.get(owner_id, generation, view)
+    if cached is not None:
+        body, headers = cached
+    else:
+        content, headers = await load()
+        body = json.dumps(jsonable_encoder(content)).encode("utf-8")
+        await product_cache.set(owner_id, generation, view, body, headers)
+    if etag_matches(request.headers.get("if-none-match"), etag, exists=True):
+        product_cache.not_modified += 1
+        return Response(status_code=304, headers=cache_headers)
+    return Response(body, media_type="application/json", headers={**headers, **cache_headers})
 
 
 @app.get("/health")
@@ -40,34 +185,122 @@ async def create_product(
     description: str,
     price: float,
     user: dict = Depends(verify_oauth_token),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     product = Product(name=name, description=description, price=price, owner_id=user["id"])
     db.add(product)
-    db.commit()
-    db.refresh(product)
+    await db.commit()
+    await db.refresh(product)
+    await invalidate_products(user["id"])
     return product
 
 
+@app.post("/products/bulk")
+async def create_products_bulk(
+    request: Request,
+    user: dict = Depends(verify_oauth_token),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Import many products at once.
+
+    Body: a JSON array of {"name", "description", "price"} objects, or NDJSON
+    (Content-Type application/x-ndjson, one object per line, streamed).
+    Rows are committed in chunks of BULK_CHUNK_SIZE; invalid rows and failed
+    chunks are reported without undoing the rest of the import. An NDJSON line
+    over BULK_MAX_LINE_BYTES stops the import with 413 (chunks committed
+    before it stay imported).
+    """
+    if "ndjson" in request.headers.get("content-type", ""):
+        records = iter_ndjson(request.stream(), max_line_bytes=BULK_MAX_LINE_BYTES)
+    else:
+        try:
+            records = iter_items(parse_json_array(await request.body()))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    try:
+        return await import_products(
+            db,
+            records,
+            owner_id=user["id"],
+            chunk_size=BULK_CHUNK_SIZE,
+            on_commit=lambda: invalidate_products(user["id"]),
+        )
+    except LineTooLong as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    if not fields:
+        return list(PRODUCT_FIELDS)
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = sorted(set(requested) - set(PRODUCT_FIELDS))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys(requested))
+
+
 @app.get("/products")
 async def list_products(
-    user: dict = Depends(verify_oauth_token), db: Session = Depends(get_db)
+    request: Request,
+    limit: int = Query(PRODUCTS_DEFAULT_LIMIT, ge=1, le=PRODUCTS_MAX_LIMIT),
+    cursor: Optional[int] = Query(None, description="X-Next-Cursor value from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
+    name_prefix: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    user: dict = Depends(verify_oauth_token),
+    db: AsyncSession = Depends(get_db),
 ):
-    products = db.query(Product).filter(Product.owner_id == user["id"]).all()
-    return products
+    """
+    One page of the caller's products, ordered by id.
+
+    Keyset pagination over the (owner_id, id) index: pass the X-Next-Cursor
+    response header back as ``cursor`` to get the next page; the header is
+    absent on the last page. Responses carry an ETag; If-None-Match
+    returns 304 until one of the caller's products changes.
+    """
+    columns = parse_fields(fields)
+
+    async def load():
+        # id is always read for the cursor, even if it isn't returned
+        query = select(*(getattr(Product, column) for column in dict.fromkeys(["id", *columns])))
+        query = query.where(Product.owner_id == user["id"])
+        if cursor is not None:
+            query = query.where(Product.id > cursor)
+        if name_prefix:
+            query = query.where(Product.name.startswith(name_prefix, autoescape=True))
+        if min_price is not None:
+            query = query.where(Product.price >= min_price)
+        if max_price is not None:
+            query = query.where(Product.price <= max_price)
+        query = query.order_by(Product.id).limit(limit + 1)
+
+        rows = (await db.execute(query)).mappings().all()
+        headers = {}
+        if len(rows) > limit:
+            rows = rows[:limit]
+            headers["X-Next-Cursor"] = str(rows[-1]["id"])
+        return [{column: row[column] for column in columns} for row in rows], headers
+
+    return await cached_read(request, user["id"], load)
 
 
 @app.get("/products/{product_id}")
 async def get_product(
     product_id: int,
+    request: Request,
     user: dict = Depends(verify_oauth_token),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    product = (
-        db.query(Product)
-        .filter(Product.id == product_id, Product.owner_id == user["id"])
-        .first()
-    )
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    return product
+    async def load():
+        columns = [getattr(Product, column) for column in PRODUCT_FIELDS]
+        result = await db.execute(
+            select(*columns).where(Product.id == product_id, Product.owner_id == user["id"])
+        )
+        product = result.mappings().first()
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
+        return dict(product), {}
+
+    return await cached_read(request, user["id"], load)
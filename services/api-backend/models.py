@@ -1,13 +1,14 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index
 from datetime import datetime
 from pydantic import BaseModel
 
-Base = declarative_base()
+from database import Base
 
 
 class Product(Base):
     __tablename__ = "products"
+    # Keyset pagination walks (owner_id, id) in order
+    __table_args__ = (Index("ix_products_owner_id_id", "owner_id", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
@@ -17,6 +18,10 @@ class Product(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+# Columns selectable with GET /products?fields=...
+PRODUCT_FIELDS = ("id", "name", "description", "price", "owner_id", "created_at")
+
+
 class ProductSchema(BaseModel):
     name: str
     description: str
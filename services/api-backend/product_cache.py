@@ -0,0 +1,179 @@
+"""
+Per-owner read-through cache for product reads, with ETags.
+
+Every owner has a *generation*: a random token replaced whenever one of the
+owner's products is written. Cache keys and ETags both include it, so a
+write invalidates all of the owner's cached pages at once (stale entries
+are simply never looked up again and age out), and a client's
+``If-None-Match`` can be answered with 304 by comparing ETags, without a
+database query.
+
+Generations are random rather than counters so that a restarted process or a
+flushed Redis can never reissue an old ETag for different data.
+
+Pages are stored as ``<headers JSON>\n<body>`` so a hit is served without
+re-serializing. LRUBackend keeps pages and generations in this process only:
+a write on one replica reaches the others once their copy of the owner's
+generation expires (``ttl_seconds`` after issue), so multi-replica
+deployments set PRODUCT_CACHE_REDIS_URL and use RedisBackend, where
+generations live next to the pages.
+"""
+import hashlib
+import json
+import logging
+import time
+import uuid
+from typing import Callable, Dict, Optional, Tuple
+
+from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+def new_generation() -> str:
+    return uuid.uuid4().hex
+
+
+class LRUBackend:
+    """
+    Pages and owner generations held in two ttl_cache.TTLCache instances.
+
+    A generation expires ``ttl_seconds`` after it was issued however often it
+    is read; an evicted or expired one just means a fresh token and misses.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        ttl_seconds: float = 300,
+        clock: Callable[[], float] = time.monotonic,
+        max_generations: Optional[int] = None,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self._entries = TTLCache(max_entries, ttl_seconds, clock)
+        self._generations = TTLCache(max_generations or max_entries, ttl_seconds, clock)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self._entries.get(key)
+
+    async def set(self, key: str, value: bytes) -> None:
+        self._entries.set(key, value)
+
+    async def get_generation(self, owner_id: int) -> Optional[str]:
+        generation = self._generations.get(owner_id)
+        if generation is None:
+            generation = self._issue_generation(owner_id)
+        return generation
+
+    async def bump_generation(self, owner_id: int) -> None:
+        self._issue_generation(owner_id)
+
+    def _issue_generation(self, owner_id: int) -> str:
+        generation = new_generation()
+        self._generations.set(owner_id, generation)
+        return generation
+
+
+class RedisBackend:
+    """Shared backend on a Redis-compatible server; read errors bypass the cache."""
+
+    def __init__(self, client, ttl_seconds: float = 300, prefix: str = "products:"):
+        self.client = client
+        self.ttl_ms = int(ttl_seconds * 1000)
+        if self.ttl_ms <= 0:
+            raise ValueError(f"PRODUCT_CACHE_TTL_SECONDS must be at least 0.001, got {ttl_seconds}")
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisBackend":
+        import redis.asyncio as redis
+
+        return cls(redis.from_url(url), **kwargs)
+
+    def _generation_key(self, owner_id: int) -> str:
+        return f"{self.prefix}generation:{owner_id}"
+
+    async def get(self, key: str) -> Optional[bytes]:
+        try:
+            return await self.client.get(self.prefix + key)
+        except Exception as e:
+            logger.warning(f"Product cache read failed: {e}")
+            return None
+
+    async def set(self, key: str, value: bytes) -> None:
+        try:
+            await self.client.set(self.prefix + key, value, px=self.ttl_ms)
+        except Exception as e:
+            logger.warning(f"Product cache write failed: {e}")
+
+    async def get_generation(self, owner_id: int) -> Optional[str]:
+        key = self._generation_key(owner_id)
+        try:
+            generation = await self.client.get(key)
+            if generation is None:
+                # First reader for this owner; concurrent readers agree on whichever SET NX won
+                await self.client.set(key, new_generation(), nx=True)
+                generation = await self.client.get(key)
+        except Exception as e:
+            logger.warning(f"Product cache read failed: {e}")
+            return None
+        return generation.decode() if isinstance(generation, bytes) else generation
+
+    async def bump_generation(self, owner_id: int) -> None:
+        try:
+            await self.client.set(self._generation_key(owner_id), new_generation())
+        except Exception as e:
+            # Cached pages for this owner stay visible until their TTL expires
+            logger.error(f"Product cache invalidation failed for owner {owner_id}: {e}")
+
+
+class ProductCache:
+    """Owner-scoped cache of serialized product responses with hit/miss counters."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    @staticmethod
+    def _digest(owner_id: int, generation: str, view: str) -> str:
+        return hashlib.sha256(f"{owner_id}\0{generation}\0{view}".encode("utf-8")).hexdigest()
+
+    async def generation(self, owner_id: int) -> Optional[str]:
+        """Current generation, or None if the backend is unavailable (serve uncached)."""
+        return await self.backend.get_generation(owner_id)
+
+    def etag(self, owner_id: int, generation: str, view: str) -> str:
+        return f'"{self._digest(owner_id, generation, view)[:32]}"'
+
+    async def get(self, owner_id: int, generation: str, view: str) -> Optional[Tuple[bytes, Dict[str, str]]]:
+        """Cached ``(body, headers)`` for ``view`` (path + canonical query) at ``generation``."""
+        value = await self.backend.get(f"{owner_id}:{self._digest(owner_id, generation, view)}")
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        header_line, body = value.split(b"\n", 1)
+        return body, json.loads(header_line)
+
+    async def set(self, owner_id: int, generation: str, view: str, body: bytes, headers: Dict[str, str]) -> None:
+        value = json.dumps(headers).encode("utf-8") + b"\n" + body
+        await self.backend.set(f"{owner_id}:{self._digest(owner_id, generation, view)}", value)
+
+    async def invalidate(self, owner_id: int) -> None:
+        """Call after committing a write to any of the owner's products."""
+        await self.backend.bump_generation(owner_id)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,60 @@
+"""
+Bounded LRU with per-entry deadlines, shared by api-backend's caches.
+
+Backs the token claims cache (auth.ClaimsCache, deadline = the token's
+``exp``) and the in-process product cache (product_cache.LRUBackend, both
+its cached pages and its owner generations). Each service is built from its
+own directory, so oauth2-service and llm-nlp-service keep their own small
+equivalents instead of importing this one.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterator, Optional
+
+
+class TTLCache:
+    """
+    At most ``max_entries`` values, least recently used evicted first.
+
+    An entry expires ``ttl_seconds`` after it was set (or at ``expires_at``,
+    if given and sooner); reads move it to the front but never extend it.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] is not None and entry[0] <= self.clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, expires_at: Optional[float] = None) -> None:
+        if self.max_entries <= 0:
+            return
+        deadline = expires_at
+        if self.ttl_seconds is not None:
+            ttl_deadline = self.clock() + self.ttl_seconds
+            deadline = ttl_deadline if deadline is None else min(deadline, ttl_deadline)
+        self._entries[key] = (deadline, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,150 @@
+"""
+CPU inference backends for the threat classifier.
+
+INFERENCE_BACKEND selects one of:
+ - ``torch``      float32 eager PyTorch (default)
+ - ``torch-int8`` dynamic INT8 quantization of every nn.Linear layer
+ - ``onnx``       ONNX Runtime session over a graph written by export_onnx.py
+
+Every backend exposes ``logits(inputs)`` taking the tokenizer's ``pt`` tensors
+and returning a float tensor of shape (batch, num_labels), plus
+``parameter_bytes()`` for the memory held by its weights.
+"""
+import json
+import os
+from typing import Dict, List
+
+import torch
+
+BACKENDS = ("torch", "torch-int8", "onnx")
+ONNX_REFERENCE_FILE = "reference.json"
+REFERENCE_TEXTS = [
+    "show me the products",
+    "'; DROP TABLE users; --",
+    "<script>alert(document.cookie)</script>",
+    "GET /../../etc/passwd HTTP/1.1",
+]
+
+
+def _tensor_bytes(value) -> int:
+    if isinstance(value, torch.Tensor):
+        return value.numel() * value.element_size()
+    if isinstance(value, (tuple, list)):
+        # Quantized linear layers store packed (weight, bias) tuples in the state dict
+        return sum(_tensor_bytes(item) for item in value)
+    return 0
+
+
+class TorchBackend:
+    """Eager PyTorch model (optionally quantized)."""
+
+    framework = "PyTorch"
+
+    def __init__(self, model, name: str = "torch"):
+        self.model = model
+        self.name = name
+
+    def logits(self, inputs: Dict[str, torch.Tensor]) -> torch.Tensor:
+        return self.model(**inputs).logits
+
+    def parameter_bytes(self) -> int:
+        return sum(_tensor_bytes(value) for value in self.model.state_dict().values())
+
+
+class OnnxBackend:
+    """ONNX Runtime session; inputs the graph doesn't declare are dropped."""
+
+    name = "onnx"
+    framework = "ONNX Runtime"
+
+    def __init__(self, session, path: str = ""):
+        self.session = session
+        self.path = path
+        self.input_names = {node.name for node in session.get_inputs()}
+
+    @classmethod
+    def from_path(cls, path: str, intra_op_threads: int = 0) -> "OnnxBackend":
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        return cls(ort.InferenceSession(path, options, providers=["CPUExecutionProvider"]), path=path)
+
+    def logits(self, inputs: Dict[str, torch.Tensor]) -> torch.Tensor:
+        feeds = {name: tensor.numpy() for name, tensor in inputs.items() if name in self.input_names}
+        return torch.from_numpy(self.session.run(["logits"], feeds)[0])
+
+    def parameter_bytes(self) -> int:
+        # The session doesn't expose its initializers; the graph file is almost entirely weights
+        return os.path.getsize(self.path) if self.path else 0
+
+
+def quantize_int8(model):
+    """Dynamic INT8 quantization of the linear layers (weights int8, activations fp32)."""
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def reference_logits(tokenizer, backend, texts: List[str]) -> List[List[float]]:
+    inputs = tokenizer(texts, return_tensors="pt", truncation=True, max_length=512, padding=True)
+    with torch.no_grad():
+        return backend.logits(inputs).tolist()
+
+
+def export_onnx(tokenizer, model, output_dir: str, opset: int = 17) -> str:
+    """Write ``model.onnx`` plus reference logits used to verify it at load time."""
+    os.makedirs(output_dir, exist_ok=True)
+    onnx_path = os.path.join(output_dir, "model.onnx")
+    model.eval()
+    sample = tokenizer(REFERENCE_TEXTS, return_tensors="pt", padding=True)
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (dict(sample),),
+            onnx_path,
+            input_names=input_names,
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            dynamo=False,
+        )
+    with open(os.path.join(output_dir, ONNX_REFERENCE_FILE), "w") as f:
+        json.dump(
+            {"texts": REFERENCE_TEXTS, "logits": reference_logits(tokenizer, TorchBackend(model), REFERENCE_TEXTS)},
+            f,
+            indent=2,
+        )
+    return onnx_path
+
+
+def verify_onnx(tokenizer, backend: OnnxBackend, reference_path: str, tolerance: float) -> float:
+    """Compare the session against the export-time reference; raise if it drifts."""
+    with open(reference_path) as f:
+        reference = json.load(f)
+    expected = torch.tensor(reference["logits"])
+    actual = torch.tensor(reference_logits(tokenizer, backend, reference["texts"]))
+    max_error = (expected - actual).abs().max().item()
+    if max_error > tolerance:
+        raise RuntimeError(f"ONNX graph deviates from reference logits ({max_error:.2e} > {tolerance:.0e})")
+    return max_error
+
+
+def load_backend(
+    kind: str, tokenizer, model=None, onnx_path: str = "", tolerance: float = 1e-3, threads: int = 0
+):
+    """Build the requested backend from an already loaded tokenizer (and model for torch backends)."""
+    if kind == "torch":
+        return TorchBackend(model)
+    if kind == "torch-int8":
+        return TorchBackend(quantize_int8(model), name="torch-int8")
+    if kind == "onnx":
+        backend = OnnxBackend.from_path(onnx_path, intra_op_threads=threads)
+        reference_path = os.path.join(os.path.dirname(onnx_path), ONNX_REFERENCE_FILE)
+        if not os.path.exists(reference_path):
+            raise RuntimeError(f"Missing ONNX reference outputs: {reference_path}")
+        verify_onnx(tokenizer, backend, reference_path, tolerance)
+        return backend
+    raise ValueError(f"Unknown INFERENCE_BACKEND {kind!r}, expected one of {', '.join(BACKENDS)}")
@@ -0,0 +1,156 @@
+"""
+Request-coalescing scheduler for single-text threat detection.
+
+Concurrent callers submit one text each; a background worker gathers them
+into a batch (up to ``max_batch_size`` texts or ``max_wait_ms`` after the
+first one arrived), runs a single padded forward pass and resolves every
+caller's future with its own score.
+
+``predict_fn`` may be a plain function or return an awaitable (e.g. a job on
+the inference pool). Up to ``max_concurrency`` batches run at once; while
+they do, new requests keep accumulating so the next batch is larger.
+
+``on_queue_wait`` (optional) receives, per text, the seconds it spent
+queued before its batch was dispatched.
+"""
+import asyncio
+import inspect
+from collections import Counter
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+from inference_pool import InferenceOverloaded
+
+
+class MicroBatcher:
+    """Coalesce single-text inference requests into batched forward passes."""
+
+    def __init__(
+        self,
+        predict_fn: Callable[[List[str]], Union[Sequence[float], Awaitable[Sequence[float]]]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        max_queue: int = 0,
+        max_concurrency: int = 1,
+        retry_after: int = 1,
+        on_queue_wait: Optional[Callable[[float], None]] = None,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max(max_wait_ms, 0.0) / 1000.0
+        self.max_queue = max_queue
+        self.max_concurrency = max(max_concurrency, 1)
+        self.retry_after = retry_after
+        self.on_queue_wait = on_queue_wait
+        self.batch_sizes: Counter = Counter()
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._inflight: Set[asyncio.Task] = set()
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    def start(self) -> None:
+        """Start the background worker on the running event loop."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the worker and fail any request still waiting in the queue."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        for task in list(self._inflight):
+            task.cancel()
+        while self._queue is not None and not self._queue.empty():
+            _, future, _ = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Batcher stopped"))
+
+    async def submit(self, text: str) -> float:
+        """Queue one text and wait for its threat probability."""
+        if not self.running:
+            raise RuntimeError("Batcher is not running")
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        try:
+            self._queue.put_nowait((text, future, loop.time()))
+        except asyncio.QueueFull:
+            raise InferenceOverloaded(self.retry_after)
+        return await future
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def histogram(self) -> Dict[int, int]:
+        """Observed batch sizes -> number of forward passes run at that size."""
+        return dict(sorted(self.batch_sizes.items()))
+
+    async def _collect(self) -> List[Tuple[str, asyncio.Future, float]]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        # Callers that went away (client disconnect, timeout) don't need a slot
+        return [item for item in batch if not item[1].done()]
+
+    async def _run(self) -> None:
+        while True:
+            # Wait for a free slot first so requests pile up while workers are busy
+            await self._slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+            if not batch:
+                self._slots.release()
+                continue
+            self.batch_sizes[len(batch)] += 1
+            if self.on_queue_wait is not None:
+                now = asyncio.get_running_loop().time()
+                for _, _, enqueued in batch:
+                    self.on_queue_wait(now - enqueued)
+            task = asyncio.get_running_loop().create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch: List[Tuple[str, asyncio.Future, float]]) -> None:
+        try:
+            scores = self.predict_fn([text for text, _, _ in batch])
+            if inspect.isawaitable(scores):
+                scores = await scores
+        except BaseException as e:
+            error = e if isinstance(e, Exception) else RuntimeError("Batcher stopped")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(error)
+            if error is not e:
+                raise
+            return
+        finally:
+            self._slots.release()
+        for (_, future, _), score in zip(batch, scores):
+            if not future.done():
+                future.set_result(score)
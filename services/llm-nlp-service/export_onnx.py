@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Export the threat classifier to ONNX for INFERENCE_BACKEND=onnx.
+Usage: python export_onnx.py --model /app/models/bert_model --output /app/models/onnx
+"""
+import argparse
+
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+from backends import export_onnx
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="bert-base-uncased", help="Hub id or local model directory")
+    parser.add_argument("--output", default="/app/models/onnx", help="Directory for model.onnx + reference.json")
+    parser.add_argument("--opset", type=int, default=17)
+    args = parser.parse_args()
+
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+    model = AutoModelForSequenceClassification.from_pretrained(args.model, num_labels=2)
+    path = export_onnx(tokenizer, model, args.output, opset=args.opset)
+    print(f"✅ ONNX model written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Batched BERT inference helpers.
+
+The scoring functions take an optional ``observe(stage, seconds)`` callback
+that receives the time spent in "tokenization" (tokenizer call and padding)
+and "forward" (model forward pass and softmax).
+"""
+import time
+from typing import Callable, Iterator, List, Optional, Sequence
+
+import torch
+
+MODEL_INPUTS = ("input_ids", "attention_mask", "token_type_ids")
+
+Observer = Callable[[str, float], None]
+
+
+def _ignore(stage: str, seconds: float) -> None:
+    pass
+
+
+def _forward(tokenizer, backend, features: List[dict], observe: Observer = _ignore) -> List[float]:
+    """Pad ``features`` to their longest member and return the threat probabilities."""
+    started = time.perf_counter()
+    inputs = tokenizer.pad(features, padding=True, return_tensors="pt")
+    padded = time.perf_counter()
+    observe("tokenization", padded - started)
+    scores = torch.softmax(backend.logits(inputs), dim=1)[:, 1].tolist()
+    observe("forward", time.perf_counter() - padded)
+    return scores
+
+
+def _segments(text: str, size: int, overlap: int) -> Iterator[str]:
+    """Split ``text`` into overlapping character blocks so tokenization stays bounded."""
+    start = 0
+    while True:
+        yield text[start:start + size]
+        if start + size >= len(text):
+            return
+        start += size - overlap
+
+
+def score_long_text(
+    tokenizer,
+    backend,
+    text: str,
+    max_length: int = 512,
+    stride: int = 128,
+    aggregation: str = "max",
+    window_batch_size: int = 16,
+    segment_chars: int = 32_768,
+    observe: Optional[Observer] = None,
+) -> float:
+    """
+    Score a text longer than ``max_length`` tokens with overlapping windows.
+
+    The text is tokenized in character segments, each segment is split into
+    ``max_length`` windows sharing ``stride`` tokens, and windows are scored
+    ``window_batch_size`` at a time. Only running max/sum are kept, so memory
+    stays flat however long the input is.
+    """
+    observe = observe or _ignore
+    best, total, count = 0.0, 0.0, 0
+    with torch.no_grad():
+        for segment in _segments(text, segment_chars, overlap=segment_chars // 16):
+            started = time.perf_counter()
+            windows = tokenizer(
+                segment,
+                truncation=True,
+                max_length=max_length,
+                stride=stride,
+                return_overflowing_tokens=True,
+            )
+            observe("tokenization", time.perf_counter() - started)
+            keys = [key for key in MODEL_INPUTS if key in windows]
+            for start in range(0, len(windows["input_ids"]), window_batch_size):
+                end = min(start + window_batch_size, len(windows["input_ids"]))
+                features = [{key: windows[key][i] for key in keys} for i in range(start, end)]
+                for score in _forward(tokenizer, backend, features, observe):
+                    best = max(best, score)
+                    total += score
+                    count += 1
+    if aggregation == "mean":
+        return total / count if count else 0.0
+    return best
+
+
+def score_texts(
+    tokenizer,
+    backend,
+    texts: Sequence[str],
+    bucket_size: int = 64,
+    max_length: int = 512,
+    long_text: bool = False,
+    stride: int = 128,
+    aggregation: str = "max",
+    window_batch_size: int = 16,
+    observe: Optional[Observer] = None,
+) -> List[float]:
+    """
+    Return the threat probability of every text, in input order.
+
+    The whole list is tokenized in one call, then sorted by token length and
+    split into sub-batches of ``bucket_size`` so each forward pass only pads
+    to the longest sequence of similarly sized texts. ``backend`` is any object
+    from backends.py (``logits(inputs)`` over the tokenizer's tensors).
+
+    With ``long_text`` enabled, texts that fill ``max_length`` are scored over
+    sliding windows (see score_long_text) instead of being cut at the limit.
+    """
+    if not texts:
+        return []
+    observe = observe or _ignore
+
+    started = time.perf_counter()
+    encodings = tokenizer(list(texts), truncation=True, max_length=max_length)
+    observe("tokenization", time.perf_counter() - started)
+    keys = [key for key in MODEL_INPUTS if key in encodings]
+    lengths = [len(ids) for ids in encodings["input_ids"]]
+
+    scores = [0.0] * len(texts)
+    short = [i for i in range(len(texts)) if not long_text or lengths[i] < max_length]
+    short.sort(key=lambda i: lengths[i])
+    with torch.no_grad():
+        for start in range(0, len(short), bucket_size):
+            bucket = short[start:start + bucket_size]
+            features = [{key: encodings[key][i] for key in keys} for i in bucket]
+            for i, score in zip(bucket, _forward(tokenizer, backend, features, observe)):
+                scores[i] = score
+
+    if long_text:
+        for i in range(len(texts)):
+            if lengths[i] >= max_length:
+                scores[i] = score_long_text(
+                    tokenizer,
+                    backend,
+                    texts[i],
+                    max_length=max_length,
+                    stride=stride,
+                    aggregation=aggregation,
+                    window_batch_size=window_batch_size,
+                    observe=observe,
+                )
+    return scores
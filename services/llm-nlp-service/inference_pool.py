@@ -0,0 +1,84 @@
+"""
+Bounded worker pool that keeps blocking inference off the asyncio event loop.
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Cores per worker when INFERENCE_WORKERS isn't set: fewer, wider workers keep single-batch latency low,
+# more, narrower ones raise throughput under concurrent load
+CORES_PER_WORKER = 4
+
+
+def default_workers(cpu_count: Optional[int] = None) -> int:
+    return max(1, (cpu_count or os.cpu_count() or 1) // CORES_PER_WORKER)
+
+
+class InferenceOverloaded(Exception):
+    """Raised when inference can't be accepted right now; maps to 503 + Retry-After."""
+
+    def __init__(self, retry_after: int = 1, message: str = "Inference queue is full"):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class InferencePool:
+    """
+    Thread pool for tokenizer/forward-pass calls.
+
+    torch's intra-op thread count is process-wide, so ``configure_torch()``
+    sets it once at startup to the per-worker share of the cores
+    (``threads_per_worker``); ``workers`` concurrent forward passes then don't
+    oversubscribe the node.
+    At most ``max_pending`` jobs may be queued or running; beyond that ``run``
+    raises InferenceOverloaded instead of letting latency grow unbounded.
+    ``on_queue_wait`` (optional) receives the seconds each job waited for a worker.
+    """
+
+    def __init__(
+        self,
+        workers: int = 1,
+        threads_per_worker: Optional[int] = None,
+        max_pending: int = 64,
+        retry_after: int = 1,
+        on_queue_wait: Optional[Callable[[float], None]] = None,
+    ):
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+        self.max_pending = max_pending
+        self.retry_after = retry_after
+        self.on_queue_wait = on_queue_wait
+        self.pending = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+
+    def configure_torch(self) -> None:
+        """Call once before the first forward pass."""
+        import torch
+
+        torch.set_num_threads(self.threads_per_worker)
+
+    async def run(self, fn: Callable[..., T], *args) -> T:
+        """Run ``fn(*args)`` on a worker thread, rejecting it if the pool is saturated."""
+        if self.pending >= self.max_pending:
+            raise InferenceOverloaded(self.retry_after)
+        self.pending += 1
+        submitted = time.perf_counter()
+
+        def job() -> T:
+            if self.on_queue_wait is not None:
+                self.on_queue_wait(time.perf_counter() - submitted)
+            return fn(*args)
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, job)
+        finally:
+            self.pending -= 1
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
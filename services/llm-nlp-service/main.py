@@ -1,53 +1,280 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
-from typing import List
-import torch
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
+from typing import Awaitable, Callable, List, Optional
+import asyncio
+import json
 import os
-import sys
+import time
+
+from batching import MicroBatcher
+from inference_pool import InferenceOverloaded, InferencePool, default_workers
+from metrics import CONTENT_TYPE_LATEST, InferenceMetrics
+from model_loader import MODEL_PATH, load_model_safe, path_allowed
+from result_cache import LRUBackend, RedisBackend, ResultCache
+from streaming import DuplexStreamingResponse, iter_batches, iter_lines
+from threat_matcher import load_matcher
+
+# Startup: "background" binds immediately and loads the model in a lifespan task,
+# "eager" finishes loading (and warmup) before the app accepts traffic
+MODEL_LOAD_MODE = os.getenv("MODEL_LOAD_MODE", "background").lower()
+WARMUP_BATCHES = int(os.getenv("WARMUP_BATCHES", "3"))
+MODEL_RETRY_AFTER = int(os.getenv("MODEL_RETRY_AFTER", "5"))
+
+# Micro-batching: trade up to BATCH_MAX_WAIT_MS of latency for larger forward passes
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "32"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "5"))
+# Texts per length-sorted sub-batch in /detect-threats-batch
+BULK_BUCKET_SIZE = int(os.getenv("BULK_BUCKET_SIZE", "64"))
+BATCH_MAX_QUEUE = int(os.getenv("BATCH_MAX_QUEUE", "1024"))
+
+# Inference worker pool (keeps forward passes off the event loop)
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0")) or default_workers()
+INFERENCE_THREADS_PER_WORKER = int(os.getenv("INFERENCE_THREADS_PER_WORKER", "0")) or None
+INFERENCE_MAX_PENDING = int(os.getenv("INFERENCE_MAX_PENDING", "64"))
+INFERENCE_RETRY_AFTER = int(os.getenv("INFERENCE_RETRY_AFTER", "1"))
+
+# Threat probability cache (shared via Redis when RESULT_CACHE_REDIS_URL is set)
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "100000"))
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "3600"))
+RESULT_CACHE_REDIS_URL = os.getenv("RESULT_CACHE_REDIS_URL", "")
+
+# CPU inference backend: torch | torch-int8 | onnx (see export_onnx.py)
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch").lower()
+ONNX_MODEL_PATH = os.getenv("ONNX_MODEL_PATH", "/app/models/onnx/model.onnx")
+ONNX_TOLERANCE = float(os.getenv("ONNX_TOLERANCE", "1e-3"))
+
+# Streaming endpoint: lines per rolling batch and max accepted line size
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "256"))
+STREAM_MAX_LINE_BYTES = int(os.getenv("STREAM_MAX_LINE_BYTES", str(1 << 20)))
+
+# Long inputs: score overlapping 512-token windows instead of truncating
+LONG_TEXT_MODE = os.getenv("LONG_TEXT_MODE", "true").lower() in ("1", "true", "yes")
+LONG_TEXT_STRIDE = int(os.getenv("LONG_TEXT_STRIDE", "128"))
+LONG_TEXT_AGGREGATION = os.getenv("LONG_TEXT_AGGREGATION", "max").lower()  # max | mean
+LONG_TEXT_WINDOW_BATCH = int(os.getenv("LONG_TEXT_WINDOW_BATCH", "16"))
+
+# Keyword heuristics for threat_type (falls back to built-in defaults if missing)
+THREAT_KEYWORDS_FILE = os.getenv(
+    "THREAT_KEYWORDS_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "configs", "threat_keywords.yaml"),
+)
+
+metrics = InferenceMetrics()
+
+threat_matcher = load_matcher(THREAT_KEYWORDS_FILE)
+
+inference_pool = InferencePool(
+    workers=INFERENCE_WORKERS,
+    threads_per_worker=INFERENCE_THREADS_PER_WORKER,
+    max_pending=INFERENCE_MAX_PENDING,
+    retry_after=INFERENCE_RETRY_AFTER,
+    on_queue_wait=metrics.stage_observer("queue_wait"),
+)
+
+MODEL_NAME = MODEL_PATH or os.getenv("MODEL_NAME", "bert-base-uncased")
+
+# Identifies the scoring configuration in result-cache keys
+MODEL_ID = ":".join(
+    [
+        MODEL_NAME,
+        INFERENCE_BACKEND,
+        f"window-{LONG_TEXT_AGGREGATION}" if LONG_TEXT_MODE else "truncate",
+    ]
+)
+
+
+class ModelState:
+    """Readiness of the lazily loaded model (the app is live before it is ready)."""
+
+    def __init__(self):
+        self.status = "loading"  # loading -> warming_up -> ready | failed
+        self.error: Optional[str] = None
+        self.tokenizer = None
+        self.backend = None
+        self.score_texts = None
+        self.load_seconds: Optional[float] = None
+        self.parameter_bytes: Optional[int] = None
+        self.num_labels = 2
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+
+model_state = ModelState()
+
+
+def load_model() -> None:
+    """Blocking model load + warmup; runs off the event loop."""
+    started = time.perf_counter()
+    if LONG_TEXT_AGGREGATION not in ("max", "mean"):
+        raise RuntimeError(f"Unknown LONG_TEXT_AGGREGATION {LONG_TEXT_AGGREGATION!r}")
+    if INFERENCE_BACKEND == "onnx" and not path_allowed(ONNX_MODEL_PATH):
+        raise RuntimeError("ONNX model path not in allowlist")
+
+    # torch/transformers are only imported here, not when the module is imported
+    from backends import load_backend
+    from inference import score_texts
+
+    inference_pool.configure_torch()
+    tokenizer, model = load_model_safe(
+        os.getenv("MODEL_NAME", "bert-base-uncased"), load_weights=INFERENCE_BACKEND != "onnx"
+    )
+    if model is not None:
+        model.eval()
+        model_state.num_labels = model.config.num_labels
+    model_state.backend = load_backend(
+        INFERENCE_BACKEND,
+        tokenizer,
+        model,
+        onnx_path=ONNX_MODEL_PATH,
+        tolerance=ONNX_TOLERANCE,
+        threads=inference_pool.threads_per_worker,
+    )
+    model_state.tokenizer = tokenizer
+    model_state.score_texts = score_texts
+    model_state.parameter_bytes = model_state.backend.parameter_bytes()
 
-app = FastAPI(title="LLM/NLP Threat Detector", version="1.0.0")
+    # Warmup: pay for lazy allocations and kernel selection before real traffic (kept out of /metrics)
+    model_state.status = "warming_up"
+    for i in range(WARMUP_BATCHES):
+        predict_threat_scores(["warmup request " * (4 ** i)] * BATCH_MAX_SIZE, record_metrics=False)
+    model_state.load_seconds = time.perf_counter() - started
 
-# Prevent unsafe local model deserialization by default
-DISABLE_LOCAL_MODEL = os.getenv("DISABLE_LOCAL_MODEL", "true").lower() in ("1", "true", "yes")
-MODEL_PATH = os.getenv("MODEL_PATH", "")  # allowed only if explicitly enabled
-ALLOWED_MODEL_PREFIX = os.getenv("ALLOWED_MODEL_PREFIX", "/app/models/")  # optional allowlist
 
+async def load_model_in_background() -> None:
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, load_model)
+        model_state.status = "ready"
+        print(f"✅ Model ready ({INFERENCE_BACKEND}) in {model_state.load_seconds:.1f}s")
+    except Exception as e:
+        model_state.status = "failed"
+        model_state.error = str(e)
+        print(f"Model load failed: {e}")
+
+
+def predict_threat_scores(texts: List[str], record_metrics: bool = True) -> List[float]:
+    """Return the threat probability per text using length-bucketed forward passes."""
+    if record_metrics:
+        metrics.batch_size.observe(len(texts))
+    return model_state.score_texts(
+        model_state.tokenizer,
+        model_state.backend,
+        texts,
+        bucket_size=BULK_BUCKET_SIZE,
+        max_length=512,
+        long_text=LONG_TEXT_MODE,
+        stride=LONG_TEXT_STRIDE,
+        aggregation=LONG_TEXT_AGGREGATION,
+        window_batch_size=LONG_TEXT_WINDOW_BATCH,
+        observe=metrics.observe_stage if record_metrics else None,
+    )
 
-def load_model_safe(model_identifier: str = "bert-base-uncased"):
-    """
-    Safe model loading:
-     - prefer hub models (hf) via AutoModel.from_pretrained
-     - disallow arbitrary local torch.load unless explicitly enabled and within ALLOWED_MODEL_PREFIX
-    """
-    if DISABLE_LOCAL_MODEL and MODEL_PATH:
-        print("⚠️ Local model loading disabled by policy. Set DISABLE_LOCAL_MODEL=false to override (not recommended).")
-        raise RuntimeError("Local model loading disabled for security")
-    if MODEL_PATH:
-        # Only allow local models from trusted folder
-        if not os.path.abspath(MODEL_PATH).startswith(os.path.abspath(ALLOWED_MODEL_PREFIX)):
-            raise RuntimeError("Local model path not in allowlist")
-        # safe loading via transformers API if possible (avoid torch.load)
-        try:
-            tokenizer = AutoTokenizer.from_pretrained(MODEL_PATH)
-            model = AutoModelForSequenceClassification.from_pretrained(MODEL_PATH, num_labels=2)
-            return tokenizer, model
-        except Exception as e:
-            print(f"❌ Failed to load local model safely: {e}")
-            raise
-    # Default: load from Hugging Face hub (safe path)
-    tokenizer = AutoTokenizer.from_pretrained(model_identifier)
-    model = AutoModelForSequenceClassification.from_pretrained(model_identifier, num_labels=2)
-    return tokenizer, model
-
-
-# Replace previous direct loads with safe loader
-try:
-    tokenizer, model = load_model_safe(os.getenv("MODEL_NAME", "bert-base-uncased"))
-    model.eval()
-except Exception as e:
-    print(f"Model load failed: {e}")
-    sys.exit(1)
+
+batcher = MicroBatcher(
+    lambda texts: inference_pool.run(predict_threat_scores, texts),
+    max_batch_size=BATCH_MAX_SIZE,
+    max_wait_ms=BATCH_MAX_WAIT_MS,
+    max_queue=BATCH_MAX_QUEUE,
+    max_concurrency=INFERENCE_WORKERS,
+    retry_after=INFERENCE_RETRY_AFTER,
+    on_queue_wait=metrics.stage_observer("batch_wait"),
+)
+
+
+def build_result_cache():
+    if not RESULT_CACHE_ENABLED:
+        return None
+    if RESULT_CACHE_REDIS_URL:
+        backend = RedisBackend.from_url(RESULT_CACHE_REDIS_URL, ttl_seconds=RESULT_CACHE_TTL_SECONDS)
+    else:
+        backend = LRUBackend(max_entries=RESULT_CACHE_MAX_ENTRIES, ttl_seconds=RESULT_CACHE_TTL_SECONDS)
+    return ResultCache(backend, model_id=MODEL_ID)
+
+
+result_cache = build_result_cache()
+
+metrics.gauge("batch_queue_depth", "Single-text requests waiting to be batched", lambda: batcher.queue_depth)
+metrics.gauge("inference_pending", "Jobs queued or running on the inference pool", lambda: inference_pool.pending)
+metrics.gauge("model_ready", "1 once the model is loaded and warmed up", lambda: float(model_state.ready))
+metrics.gauge("model_parameter_bytes", "Memory held by the model weights", lambda: model_state.parameter_bytes)
+metrics.gauge(
+    "result_cache_hit_ratio",
+    "Result cache hits / lookups since start",
+    lambda: result_cache.stats()["hit_rate"] if result_cache is not None else None,
+)
+
+
+async def cached_scores(
+    texts: List[str], compute: Callable[[List[str]], Awaitable[List[float]]]
+) -> List[float]:
+    """Serve threat probabilities from the result cache; only misses reach ``compute``."""
+    if result_cache is None:
+        scores = await compute(texts)
+        metrics.texts.labels("model").inc(len(texts))
+        return scores
+    scores = await result_cache.get_many(texts)
+    misses = sum(score is None for score in scores)
+    missing = list(dict.fromkeys(text for text, score in zip(texts, scores) if score is None))
+    if missing:
+        computed = dict(zip(missing, await compute(missing)))
+        await result_cache.set_many(missing, [computed[text] for text in missing])
+        scores = [computed[text] if score is None else score for text, score in zip(texts, scores)]
+    metrics.texts.labels("cache").inc(len(texts) - misses)
+    metrics.texts.labels("model").inc(misses)
+    return scores
+
+
+def require_model() -> None:
+    if model_state.status == "failed":
+        raise RuntimeError(f"Model failed to load: {model_state.error}")
+    if not model_state.ready:
+        raise InferenceOverloaded(MODEL_RETRY_AFTER, "Model is not ready yet")
+
+
+async def submit_single(texts: List[str]) -> List[float]:
+    require_model()
+    return [await batcher.submit(texts[0])]
+
+
+async def submit_bulk(texts: List[str]) -> List[float]:
+    require_model()
+    return await inference_pool.run(predict_threat_scores, texts)
+
+
+def json_response(body: BaseModel) -> Response:
+    """Serialize ``body`` ourselves so the encoding time shows up in the metrics."""
+    with metrics.time_stage("serialization"):
+        content = body.model_dump_json()
+    return Response(content=content, media_type="application/json")
+
+
+def overloaded_error(e: InferenceOverloaded) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=f"{e}, retry later",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    batcher.start()
+    loader = asyncio.get_running_loop().create_task(load_model_in_background())
+    if MODEL_LOAD_MODE == "eager":
+        await loader
+        if model_state.status == "failed":
+            raise RuntimeError(f"Model load failed: {model_state.error}")
+    yield
+    loader.cancel()
+    await batcher.stop()
+    inference_pool.shutdown()
+
+
+app = FastAPI(title="LLM/NLP Threat Detector", version="1.0.0", lifespan=lifespan)
 
 
 class ThreatDetectionRequest(BaseModel):
@@ -55,11 +282,20 @@ class ThreatDetectionRequest(BaseModel):
     threshold: float = 0.7
 
 
+class KeywordMatch(BaseModel):
+    category: str
+    keyword: str
+    start: int
+    end: int
+
+
 class ThreatDetectionResponse(BaseModel):
     text: str
     is_threat: bool
     confidence: float
     threat_type: str
+    threat_categories: List[str] = []
+    matches: List[KeywordMatch] = []
 
 
 class BulkThreatDetectionRequest(BaseModel):
@@ -75,11 +311,27 @@ class BulkThreatDetectionResponse(BaseModel):
 
 @app.get("/health")
 async def health_check():
-    return {
-        "status": "healthy",
+    """Liveness: the process serves requests; only a failed model load is unhealthy."""
+    body = {
+        "status": "unhealthy" if model_state.status == "failed" else "healthy",
         "service": "llm-nlp-service",
         "model": "BERT-base-uncased",
+        "model_status": model_state.status,
+        "ready": model_state.ready,
     }
+    if model_state.status == "failed":
+        body["error"] = model_state.error
+        return JSONResponse(status_code=503, content=body)
+    return body
+
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness: 200 once the model is loaded and warmed up."""
+    body = {"ready": model_state.ready, "model_status": model_state.status}
+    if not model_state.ready:
+        return JSONResponse(status_code=503, content=body, headers={"Retry-After": str(MODEL_RETRY_AFTER)})
+    return body
 
 
 @app.post("/detect-threat", response_model=ThreatDetectionResponse)
@@ -89,81 +341,134 @@ async def detect_threat(request: ThreatDetectionRequest):
     Returns threat probability and classification
     """
     try:
-        # Tokenize input
-        inputs = tokenizer(
-            request.text,
-            return_tensors="pt",
-            truncation=True,
-            max_length=512,
-            padding=True,
-        )
-
-        # Inference
-        with torch.no_grad():
-            outputs = model(**inputs)
-            logits = outputs.logits
-            probabilities = torch.softmax(logits, dim=1)
-
-        threat_score = probabilities[0][1].item()
-        is_threat = threat_score >= request.threshold
-
-        threat_type = classify_threat(request.text)
-
-        return ThreatDetectionResponse(
-            text=request.text[:100],
-            is_threat=is_threat,
-            confidence=threat_score,
-            threat_type=threat_type,
-        )
+        # Coalesced with concurrent requests into one forward pass
+        threat_score = (await cached_scores([request.text], submit_single))[0]
+        return json_response(build_response(request.text, threat_score, request.threshold))
 
+    except InferenceOverloaded as e:
+        raise overloaded_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
 
 @app.post("/detect-threats-batch", response_model=BulkThreatDetectionResponse)
 async def detect_threats_batch(request: BulkThreatDetectionRequest):
-    """Batch threat detection"""
-    results = []
-    threats_count = 0
-
-    for text in request.texts:
-        single_request = ThreatDetectionRequest(text=text, threshold=request.threshold)
-        result = await detect_threat(single_request)
-        results.append(result)
-        if result.is_threat:
-            threats_count += 1
-
-    return BulkThreatDetectionResponse(
-        results=results, total_processed=len(request.texts), threats_detected=threats_count
+    """Batch threat detection (one tokenizer call, one forward pass per length bucket)"""
+    try:
+        scores = await cached_scores(request.texts, submit_bulk)
+    except InferenceOverloaded as e:
+        raise overloaded_error(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+    results = [
+        build_response(text, score, request.threshold) for text, score in zip(request.texts, scores)
+    ]
+    threats_count = sum(1 for result in results if result.is_threat)
+
+    return json_response(
+        BulkThreatDetectionResponse(
+            results=results, total_processed=len(request.texts), threats_detected=threats_count
+        )
     )
 
 
-def classify_threat(text: str) -> str:
-    """Simple heuristic threat classification"""
-    threat_keywords = {
-        "injection": ["sql", "injection", "exploit", "payload"],
-        "xss": ["script", "alert", "<>", "javascript"],
-        "privilege_escalation": ["sudo", "admin", "privilege", "root"],
-        "path_traversal": ["../", "..\\", "etc/passwd"],
-        "malware": ["malware", "trojan", "virus", "ransomware"],
-        "other": [],
-    }
+@app.post("/detect-threats-stream")
+async def detect_threats_stream(request: Request, threshold: float = 0.7):
+    """
+    Streaming batch detection.
+    Upload NDJSON (one {"text": ...} object or JSON string per line, Content-Type
+    application/x-ndjson) or plain text lines as a chunked body; results are
+    streamed back as NDJSON after every rolling batch of STREAM_BATCH_SIZE lines,
+    followed by a summary line. Memory use does not depend on the input size.
+    """
+    ndjson = "json" in request.headers.get("content-type", "")
+
+    async def scores_for(texts: List[str]) -> List[float]:
+        # Headers are already sent, so wait out a full queue instead of failing with 503
+        while True:
+            try:
+                return await cached_scores(texts, submit_bulk)
+            except InferenceOverloaded as e:
+                await asyncio.sleep(e.retry_after)
+
+    async def results():
+        processed = 0
+        threats_count = 0
+        lines = iter_lines(request.stream(), max_line_bytes=STREAM_MAX_LINE_BYTES)
+        async for batch, errors in iter_batches(lines, ndjson=ndjson, batch_size=STREAM_BATCH_SIZE):
+            output = [{"line": line, "error": error} for line, error in errors]
+            if batch:
+                try:
+                    scores = await scores_for([text for _, text in batch])
+                except Exception as e:
+                    scores = None
+                    output += [{"line": line, "error": f"Error: {str(e)}"} for line, _ in batch]
+                for (line, text), score in zip(batch, scores or []):
+                    result = build_response(text, score, threshold)
+                    processed += 1
+                    threats_count += result.is_threat
+                    output.append({"line": line, **result.model_dump()})
+            with metrics.time_stage("serialization"):
+                chunk = "".join(json.dumps(item) + "\n" for item in output)
+            yield chunk
+        yield json.dumps({"total_processed": processed, "threats_detected": threats_count}) + "\n"
+
+    return DuplexStreamingResponse(results(), media_type="application/x-ndjson")
+
+
+def build_response(text: str, score: float, threshold: float) -> ThreatDetectionResponse:
+    with metrics.time_stage("classify"):
+        matches = threat_matcher.match(text)
+        categories = threat_matcher.matched_categories(matches)
+    return ThreatDetectionResponse(
+        text=text[:100],
+        is_threat=score >= threshold,
+        confidence=score,
+        threat_type=categories[0] if categories else "other",
+        threat_categories=categories,
+        matches=[KeywordMatch(**match._asdict()) for match in matches],
+    )
 
-    text_lower = text.lower()
-    for threat_type, keywords in threat_keywords.items():
-        if any(keyword in text_lower for keyword in keywords):
-            return threat_type
 
-    return "other"
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus scrape endpoint (stage latencies, batch sizes, texts/sec, cache, process RSS)"""
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE_LATEST)
 
 
 @app.post("/model-stats")
 async def model_stats():
     """Get model information"""
+    backend = model_state.backend
     return {
-        "model_name": "bert-base-uncased",
-        "num_labels": 2,
+        "model_name": MODEL_NAME,
+        "num_labels": model_state.num_labels,
         "labels": ["safe", "threat"],
         "max_length": 512,
-        "framework": "PyTorch",
+        "long_text": {
+            "enabled": LONG_TEXT_MODE,
+            "stride": LONG_TEXT_STRIDE,
+            "aggregation": LONG_TEXT_AGGREGATION,
+        },
+        "framework": backend.framework if backend is not None else None,
+        "backend": backend.name if backend is not None else INFERENCE_BACKEND,
+        "threads": inference_pool.workers * inference_pool.threads_per_worker,
+        "parameter_bytes": model_state.parameter_bytes,
+        "model_status": model_state.status,
+        "load_seconds": model_state.load_seconds,
+        "threat_keywords": len(threat_matcher),
+        "batching": {
+            "max_batch_size": batcher.max_batch_size,
+            "max_wait_ms": batcher.max_wait * 1000.0,
+            "batch_size_histogram": batcher.histogram(),
+            "queue_depth": batcher.queue_depth,
+        },
+        "inference_pool": {
+            "workers": inference_pool.workers,
+            "threads_per_worker": inference_pool.threads_per_worker,
+            "pending": inference_pool.pending,
+            "max_pending": inference_pool.max_pending,
+        },
+        "result_cache": result_cache.stats() if result_cache is not None else None,
     }
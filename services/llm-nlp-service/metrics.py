@@ -0,0 +1,107 @@
+"""
+Prometheus instrumentation for the threat detector.
+
+Every metric lives in the InferenceMetrics instance's own registry (rather
+than prometheus_client's global one), so the module can be imported more than
+once, e.g. by tests, without duplicate registration errors.
+
+Stages of ``threat_detector_stage_seconds``:
+ - ``batch_wait``    time a single-text request waited to be coalesced into a batch
+ - ``queue_wait``    time an inference job waited for a free worker thread
+ - ``tokenization``  tokenizer call and padding
+ - ``forward``       model forward pass and softmax
+ - ``classify``      keyword heuristics (threat type and categories)
+ - ``serialization`` JSON encoding of the response
+"""
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    ProcessCollector,
+    generate_latest,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+STAGES = ("batch_wait", "queue_wait", "tokenization", "forward", "classify", "serialization")
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+__all__ = ["CONTENT_TYPE_LATEST", "InferenceMetrics", "STAGES"]
+
+
+class _GaugeCollector:
+    """Gauges read from live service state at scrape time; None values are skipped."""
+
+    def __init__(self, gauges: Dict[str, Tuple[str, Callable[[], Optional[float]]]]):
+        self._gauges = gauges
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        for name, (documentation, read) in self._gauges.items():
+            value = read()
+            if value is None:
+                continue
+            family = GaugeMetricFamily(name, documentation)
+            family.add_metric([], value)
+            yield family
+
+
+class InferenceMetrics:
+    """Per-stage latencies, batch sizes, text throughput and process metrics."""
+
+    def __init__(self, namespace: str = "threat_detector"):
+        self.registry = CollectorRegistry()
+        # process_resident_memory_bytes, process_cpu_seconds_total, open fds, ...
+        ProcessCollector(registry=self.registry)
+        self.stage_seconds = Histogram(
+            f"{namespace}_stage_seconds",
+            "Latency of each request-handling stage",
+            ["stage"],
+            buckets=LATENCY_BUCKETS,
+            registry=self.registry,
+        )
+        for stage in STAGES:
+            self.stage_seconds.labels(stage)
+        self.batch_size = Histogram(
+            f"{namespace}_batch_size",
+            "Texts per model call",
+            buckets=BATCH_SIZE_BUCKETS,
+            registry=self.registry,
+        )
+        # rate() of this counter is texts/sec; the source label splits out cache hits
+        self.texts = Counter(
+            f"{namespace}_texts",
+            "Texts scored, by where the score came from",
+            ["source"],
+            registry=self.registry,
+        )
+        for source in ("model", "cache"):
+            self.texts.labels(source)
+        self._gauges: Dict[str, Tuple[str, Callable[[], Optional[float]]]] = {}
+        self.registry.register(_GaugeCollector(self._gauges))
+        self.namespace = namespace
+
+    def observe_stage(self, stage: str, seconds: float) -> None:
+        self.stage_seconds.labels(stage).observe(seconds)
+
+    @contextmanager
+    def time_stage(self, stage: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(stage, time.perf_counter() - started)
+
+    def stage_observer(self, stage: str) -> Callable[[float], None]:
+        return lambda seconds: self.observe_stage(stage, seconds)
+
+    def gauge(self, name: str, documentation: str, read: Callable[[], Optional[float]]) -> None:
+        """Expose ``read()`` as ``<namespace>_<name>``, evaluated on every scrape."""
+        self._gauges[f"{self.namespace}_{name}"] = (documentation, read)
+
+    def render(self) -> bytes:
+        return generate_latest(self.registry)
@@ -0,0 +1,92 @@
+"""
+Safe model loading for the threat detector.
+
+transformers (and torch) are imported only when a model is actually loaded,
+so importing the service stays cheap; main.py calls load_model_safe from a
+background task after the app is already accepting connections.
+"""
+import os
+import re
+
+# Prevent unsafe local model deserialization by default
+DISABLE_LOCAL_MODEL = os.getenv("DISABLE_LOCAL_MODEL", "true").lower() in ("1", "true", "yes")
+MODEL_PATH = os.getenv("MODEL_PATH", "")  # allowed only if explicitly enabled
+ALLOWED_MODEL_PREFIX = os.getenv("ALLOWED_MODEL_PREFIX", "/app/models/")  # optional allowlist
+# Local safetensors snapshot of the loaded model; later starts load from it (mmap) instead of the hub
+MODEL_CACHE_DIR = os.getenv("MODEL_CACHE_DIR", "")
+
+
+def path_allowed(path: str) -> bool:
+    return os.path.abspath(path).startswith(os.path.abspath(ALLOWED_MODEL_PREFIX))
+
+
+def cache_path_for(model_identifier: str) -> str:
+    return os.path.join(MODEL_CACHE_DIR, re.sub(r"[^A-Za-z0-9_.-]+", "--", model_identifier.strip("/")))
+
+
+def _from_pretrained(source: str, load_weights: bool, **kwargs):
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(source)
+    if not load_weights:
+        return tokenizer, None
+    model = AutoModelForSequenceClassification.from_pretrained(source, num_labels=2, **kwargs)
+    return tokenizer, model
+
+
+def _load_from_cache(model_identifier: str, load_weights: bool):
+    """Return the cached snapshot, or None if there is none (or caching is off)."""
+    if not MODEL_CACHE_DIR:
+        return None
+    if not path_allowed(MODEL_CACHE_DIR):
+        raise RuntimeError("Model cache directory not in allowlist")
+    cache_path = cache_path_for(model_identifier)
+    if not os.path.exists(os.path.join(cache_path, "model.safetensors")):
+        return None
+    # safetensors only: no pickle deserialization, weights are memory-mapped
+    return _from_pretrained(cache_path, load_weights, use_safetensors=True)
+
+
+def _save_to_cache(model_identifier: str, tokenizer, model) -> None:
+    if not MODEL_CACHE_DIR or model is None:
+        return
+    cache_path = cache_path_for(model_identifier)
+    try:
+        tokenizer.save_pretrained(cache_path)
+        model.save_pretrained(cache_path, safe_serialization=True)
+    except Exception as e:
+        print(f"⚠️ Could not write model cache {cache_path}: {e}")
+
+
+def load_model_safe(model_identifier: str = "bert-base-uncased", load_weights: bool = True):
+    """
+    Safe model loading:
+     - prefer hub models (hf) via AutoModel.from_pretrained
+     - disallow arbitrary local torch.load unless explicitly enabled and within ALLOWED_MODEL_PREFIX
+     - load_weights=False returns (tokenizer, None) for backends that don't need the torch model
+     - with MODEL_CACHE_DIR, reuse a local safetensors snapshot written by a previous start
+    """
+    if DISABLE_LOCAL_MODEL and MODEL_PATH:
+        print(
+            "⚠️ Local model loading disabled by policy. Set DISABLE_LOCAL_MODEL=false to override (not recommended)."
+        )
+        raise RuntimeError("Local model loading disabled for security")
+    source = MODEL_PATH or model_identifier
+    cached = _load_from_cache(source, load_weights)
+    if cached is not None:
+        return cached
+    if MODEL_PATH:
+        # Only allow local models from trusted folder
+        if not path_allowed(MODEL_PATH):
+            raise RuntimeError("Local model path not in allowlist")
+        # safe loading via transformers API if possible (avoid torch.load)
+        try:
+            tokenizer, model = _from_pretrained(MODEL_PATH, load_weights)
+        except Exception as e:
+            print(f"❌ Failed to load local model safely: {e}")
+            raise
+    else:
+        # Default: load from Hugging Face hub (safe path)
+        tokenizer, model = _from_pretrained(model_identifier, load_weights)
+    _save_to_cache(source, tokenizer, model)
+    return tokenizer, model
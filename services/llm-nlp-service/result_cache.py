@@ -0,0 +1,136 @@
+"""
+Content-addressed cache of threat probabilities.
+
+Entries are keyed by a hash of the model identifier and the normalized text
+and hold the raw probability, so requests with different thresholds share
+the same entry. Two backends are available: a bounded in-process LRU with
+TTL, and a shared Redis-compatible store (a ``redis.asyncio`` client or any
+object exposing the same async ``mget``/``pipeline`` calls).
+"""
+import hashlib
+import logging
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for cache keys (the tokenizer ignores these differences)."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class LRUBackend:
+    """
+    Bounded in-memory backend with least-recently-used eviction and TTL.
+
+    api-backend has the same structure in its ttl_cache module; services are
+    built from separate directories and share no code, hence this copy.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 100_000,
+        ttl_seconds: float = 3600,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[float]]:
+        now = self._clock()
+        values = []
+        for key in keys:
+            entry = self._entries.get(key)
+            if entry is None:
+                values.append(None)
+            elif entry[1] <= now:
+                del self._entries[key]
+                values.append(None)
+            else:
+                self._entries.move_to_end(key)
+                values.append(entry[0])
+        return values
+
+    async def set_many(self, items: Dict[str, float]) -> None:
+        expires_at = self._clock() + self.ttl_seconds
+        for key, value in items.items():
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class RedisBackend:
+    """Shared backend on a Redis-compatible server; errors degrade to cache misses."""
+
+    def __init__(self, client, ttl_seconds: float = 3600, prefix: str = "threat-score:"):
+        # Milliseconds (PX): sub-second TTLs would round down to EX 0, which Redis rejects
+        self.ttl_ms = int(ttl_seconds * 1000)
+        if self.ttl_ms <= 0:
+            raise ValueError("ttl_seconds must be at least 1 ms")
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisBackend":
+        import redis.asyncio as redis
+
+        return cls(redis.from_url(url), **kwargs)
+
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[float]]:
+        try:
+            raw = await self.client.mget([self.prefix + key for key in keys])
+        except Exception as e:
+            logger.warning(f"Result cache read failed: {e}")
+            return [None] * len(keys)
+        return [float(value) if value is not None else None for value in raw]
+
+    async def set_many(self, items: Dict[str, float]) -> None:
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for key, value in items.items():
+                    pipe.set(self.prefix + key, repr(value), px=self.ttl_ms)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Result cache write failed: {e}")
+
+
+class ResultCache:
+    """Hash-keyed threat probability cache with hit/miss counters."""
+
+    def __init__(self, backend, model_id: str):
+        self.backend = backend
+        self.model_id = model_id
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, text: str) -> str:
+        payload = f"{self.model_id}\0{normalize_text(text)}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    async def get_many(self, texts: Sequence[str]) -> List[Optional[float]]:
+        values = await self.backend.get_many([self.key(text) for text in texts])
+        hits = sum(1 for value in values if value is not None)
+        self.hits += hits
+        self.misses += len(values) - hits
+        return values
+
+    async def set_many(self, texts: Sequence[str], scores: Sequence[float]) -> None:
+        await self.backend.set_many({self.key(text): score for text, score in zip(texts, scores)})
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
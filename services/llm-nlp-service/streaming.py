@@ -0,0 +1,102 @@
+"""
+Helpers for the streaming NDJSON detection endpoint.
+"""
+import json
+from typing import AsyncIterator, List, Tuple, Union
+
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that doesn't listen for disconnects while streaming.
+
+    The stock implementation reads ``receive`` concurrently to detect client
+    disconnects, which would swallow request body chunks the endpoint is
+    still consuming. Here the body generator reads the request itself, and
+    a disconnect surfaces from ``request.stream()`` as ClientDisconnect.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+class LineTooLong(ValueError):
+    pass
+
+
+async def iter_lines(
+    chunks: AsyncIterator[bytes], max_line_bytes: int = 1 << 20
+) -> AsyncIterator[Union[bytes, LineTooLong]]:
+    """
+    Split a chunked byte stream into lines without buffering more than one line.
+
+    Lines longer than ``max_line_bytes`` are dropped and reported by yielding a
+    LineTooLong instance in their place, so line numbers stay aligned.
+    """
+    buffer = b""
+    skipping = False
+    async for chunk in chunks:
+        buffer += chunk
+        while True:
+            newline = buffer.find(b"\n")
+            if newline < 0:
+                break
+            line, buffer = buffer[:newline], buffer[newline + 1:]
+            if skipping:
+                skipping = False
+                continue
+            yield line.rstrip(b"\r")
+        if len(buffer) > max_line_bytes:
+            if not skipping:
+                yield LineTooLong(f"Line exceeds {max_line_bytes} bytes")
+            skipping = True
+            buffer = b""
+    if buffer and not skipping:
+        yield buffer.rstrip(b"\r")
+
+
+def parse_line(line: bytes, ndjson: bool) -> str:
+    """Extract the text from one input line (NDJSON object/string or plain text)."""
+    decoded = line.decode("utf-8")
+    if not ndjson:
+        return decoded
+    value = json.loads(decoded)
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict) and isinstance(value.get("text"), str):
+        return value["text"]
+    raise ValueError('Expected a JSON string or an object with a "text" field')
+
+
+async def iter_batches(
+    lines: AsyncIterator[Union[bytes, LineTooLong]], ndjson: bool, batch_size: int
+) -> AsyncIterator[Tuple[List[Tuple[int, str]], List[Tuple[int, str]]]]:
+    """
+    Group input lines into rolling batches.
+
+    Yields ``(texts, errors)`` where both are lists of ``(line_number, value)``;
+    blank lines are skipped, malformed ones become errors.
+    """
+    texts: List[Tuple[int, str]] = []
+    errors: List[Tuple[int, str]] = []
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if isinstance(line, LineTooLong):
+            errors.append((line_number, str(line)))
+            continue
+        if not line.strip():
+            continue
+        try:
+            texts.append((line_number, parse_line(line, ndjson)))
+        except ValueError as e:
+            errors.append((line_number, str(e)))
+        if len(texts) >= batch_size:
+            yield texts, errors
+            texts, errors = [], []
+    if texts or errors:
+        yield texts, errors
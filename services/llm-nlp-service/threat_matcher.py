@@ -0,0 +1,109 @@
+"""
+Precompiled keyword matcher for the heuristic threat classification.
+
+All keywords are compiled once into a single case-insensitive regex whose
+alternation is factored into a prefix trie, so a scan costs roughly one pass
+over the text regardless of how many IOC strings are configured. Matching is
+done in a lookahead, which reports every keyword at every offset (overlaps
+included) instead of stopping at the first hit.
+"""
+import os
+import re
+from typing import Dict, List, NamedTuple, Sequence
+
+import yaml
+
+DEFAULT_THREAT_KEYWORDS: Dict[str, List[str]] = {
+    "injection": ["sql", "injection", "exploit", "payload"],
+    "xss": ["script", "alert", "<>", "javascript"],
+    "privilege_escalation": ["sudo", "admin", "privilege", "root"],
+    "path_traversal": ["../", "..\\", "etc/passwd"],
+    "malware": ["malware", "trojan", "virus", "ransomware"],
+}
+
+
+class ThreatMatch(NamedTuple):
+    category: str
+    keyword: str
+    start: int
+    end: int
+
+
+def _trie_pattern(words: Sequence[str]) -> str:
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def emit(node: dict) -> str:
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # Greedy optional suffix: the longest keyword at an offset wins, shorter ones are recovered below
+        return f"(?:{body})?" if "" in node else body
+
+    return emit(trie)
+
+
+class ThreatMatcher:
+    """Keyword -> category matcher; categories keep their configured priority order."""
+
+    def __init__(self, keywords: Dict[str, Sequence[str]]):
+        self.categories = [category for category in keywords if category != "other"]
+        self._categories_by_keyword: Dict[str, List[str]] = {}
+        for category in self.categories:
+            for keyword in keywords[category] or []:
+                keyword = str(keyword).lower()
+                if keyword:
+                    self._categories_by_keyword.setdefault(keyword, []).append(category)
+
+        # Shorter keywords that are prefixes of a longer one start at the same offset
+        self._nested = {
+            keyword: [keyword[:i] for i in range(1, len(keyword)) if keyword[:i] in self._categories_by_keyword]
+            for keyword in self._categories_by_keyword
+        }
+        self._pattern = None
+        if self._categories_by_keyword:
+            trie = _trie_pattern(list(self._categories_by_keyword))
+            self._pattern = re.compile(f"(?=({trie}))", re.IGNORECASE)
+
+    def __len__(self) -> int:
+        return len(self._categories_by_keyword)
+
+    @classmethod
+    def from_yaml(cls, path: str) -> "ThreatMatcher":
+        with open(path) as f:
+            data = yaml.safe_load(f) or {}
+        return cls(data.get("threat_keywords", data))
+
+    def match(self, text: str) -> List[ThreatMatch]:
+        """Every keyword occurrence, ordered by offset."""
+        if self._pattern is None:
+            return []
+        matches = []
+        for found in self._pattern.finditer(text):
+            keyword = found.group(1).lower()
+            start = found.start()
+            for hit in self._nested.get(keyword, []) + [keyword]:
+                for category in self._categories_by_keyword.get(hit, ()):
+                    matches.append(ThreatMatch(category, hit, start, start + len(hit)))
+        return matches
+
+    def matched_categories(self, matches: Sequence[ThreatMatch]) -> List[str]:
+        """Distinct categories in ``matches``, in priority order."""
+        found = {match.category for match in matches}
+        return [category for category in self.categories if category in found]
+
+    def classify(self, text: str) -> str:
+        categories = self.matched_categories(self.match(text))
+        return categories[0] if categories else "other"
+
+
+def load_matcher(path: str) -> ThreatMatcher:
+    """Load keywords from ``path`` if it exists, otherwise use the built-in defaults."""
+    if path and os.path.exists(path):
+        return ThreatMatcher.from_yaml(path)
+    return ThreatMatcher(DEFAULT_THREAT_KEYWORDS)
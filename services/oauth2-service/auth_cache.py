@@ -0,0 +1,96 @@
+"""
+Bounded TTL caches for get_current_user.
+
+``/me`` is called by every api-backend request that can't verify a token
+locally, so oauth2-service keeps two small caches in front of it:
+ - token SHA-256 -> decoded claims, expiring no later than the token's ``exp``
+   (repeat calls skip signature verification), and
+ - username -> ``{"id", "username"}`` projection, for tokens issued before
+   ``uid`` was added to the claims.
+
+The user cache is invalidated from SQLAlchemy mapper events whenever a User
+row is inserted, updated or deleted (see ``invalidate_on_changes``); its TTL
+bounds staleness for changes made outside this process.
+"""
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from sqlalchemy import event, inspect
+
+
+class TTLCache:
+    """
+    LRU with a per-entry deadline and a maximum size.
+
+    Kept local rather than shared with api-backend's ttl_cache.TTLCache: each
+    service image is built from its own directory only.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 300, clock: Callable[[], float] = time.time):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= self.clock():
+            del self._entries[key]
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, expires_at: Optional[float] = None) -> None:
+        """Store ``value`` for ``ttl_seconds``, or until ``expires_at`` if that is sooner."""
+        if self.max_entries <= 0:
+            return
+        deadline = self.clock() + self.ttl_seconds
+        if expires_at is not None:
+            deadline = min(deadline, expires_at)
+        self._entries[key] = (deadline, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def invalidate_on_changes(model, cache: TTLCache) -> None:
+    """Drop cached projections of ``model`` rows (keyed by username) whenever one is written."""
+
+    def invalidate(mapper, connection, target) -> None:
+        history = inspect(target).attrs.username.history
+        # A rename leaves the old username in ``deleted``
+        for username in {target.username, *(history.deleted or ())}:
+            cache.pop(username)
+
+    for name in ("after_insert", "after_update", "after_delete"):
+        event.listen(model, name, invalidate)
@@ -1,36 +1,110 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from fastapi.security import HTTPBasic, HTTPBasicCredentials, OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
 from typing import Optional
+import hmac
 import os
 
-from models import User, TokenData
-from database import get_db, engine, Base
+from models import User, TokenData, IntrospectBatchRequest
+from database import get_db, engine, init_db
+from password_pool import PasswordHasher, PasswordPoolBusy
+from auth_cache import TTLCache, invalidate_on_changes, token_key
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# bcrypt cost; stored hashes with a different cost are re-hashed on the next successful login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Password hashing process pool (defaults: one worker per core, 8 queued jobs per worker)
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", "0")) or None
+PASSWORD_MAX_PENDING = int(os.getenv("PASSWORD_MAX_PENDING", "0")) or None
+PASSWORD_MAX_PENDING_PER_USER = int(os.getenv("PASSWORD_MAX_PENDING_PER_USER", "4"))
+PASSWORD_RETRY_AFTER = int(os.getenv("PASSWORD_RETRY_AFTER", "1"))
 
-app = FastAPI(title="OAuth2 Service", version="1.0.0")
+password_hasher = PasswordHasher(
+    rounds=BCRYPT_ROUNDS,
+    workers=PASSWORD_WORKERS,
+    max_pending=PASSWORD_MAX_PENDING,
+    max_pending_per_key=PASSWORD_MAX_PENDING_PER_USER,
+    retry_after=PASSWORD_RETRY_AFTER,
+)
+
+# get_current_user caches: token hash -> claims (capped at the token's exp), username -> {id, username}
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "300"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+
+# Largest token list accepted by POST /introspect/batch
+INTROSPECT_MAX_TOKENS = int(os.getenv("INTROSPECT_MAX_TOKENS", "1000"))
+# Resource servers allowed to introspect, as "client_id:secret,..." (none configured: every call gets 401)
+INTROSPECT_CLIENTS = dict(
+    pair.split(":", 1) for pair in os.getenv("INTROSPECT_CLIENTS", "").split(",") if ":" in pair
+)
+
+token_cache = TTLCache(TOKEN_CACHE_MAX_ENTRIES, TOKEN_CACHE_TTL)
+user_cache = TTLCache(USER_CACHE_MAX_ENTRIES, USER_CACHE_TTL)
+invalidate_on_changes(User, user_cache)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create tables
+    await init_db()
+    password_hasher.start()
+    yield
+    password_hasher.shutdown()
+    await engine.dispose()
+
+
+app = FastAPI(title="OAuth2 Service", version="1.0.0", lifespan=lifespan)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+introspect_basic = HTTPBasic(auto_error=False)
 
 SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key-change-in-prod")
-ALGORITHM = "HS256"
+# Optional RS256 signing key (PEM); its public half is served at /.well-known/jwks.json
+JWT_PRIVATE_KEY_FILE = os.getenv("JWT_PRIVATE_KEY_FILE", "")
+JWT_KEY_ID = os.getenv("JWT_KEY_ID", "oauth2-1")
+ALGORITHM = "RS256" if JWT_PRIVATE_KEY_FILE else "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from jose import JWTError, jwk, jwt
+
+
+def load_jwt_keys():
+    """Return (signing key, verification key, public JWK or None) for ALGORITHM."""
+    if not JWT_PRIVATE_KEY_FILE:
+        return SECRET_KEY, SECRET_KEY, None
+    with open(JWT_PRIVATE_KEY_FILE) as f:
+        private_pem = f.read()
+    public_key = jwk.construct(private_pem, ALGORITHM).public_key()
+    public_jwk = {**public_key.to_dict(), "kid": JWT_KEY_ID, "use": "sig"}
+    return private_pem, public_key.to_pem().decode(), public_jwk
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+SIGNING_KEY, VERIFY_KEY, PUBLIC_JWK = load_jwt_keys()
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+
+def busy_error(e: PasswordPoolBusy) -> HTTPException:
+    return HTTPException(
+        status_code=e.status_code, detail=f"{e}, retry later", headers={"Retry-After": str(e.retry_after)}
+    )
 
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+async def verify_password(plain_password: str, hashed_password: str, username: Optional[str] = None):
+    """Returns (valid, new_hash); runs bcrypt in the process pool"""
+    try:
+        return await password_hasher.verify(plain_password, hashed_password, key=username)
+    except PasswordPoolBusy as e:
+        raise busy_error(e)
+
+
+async def get_password_hash(password: str, username: Optional[str] = None) -> str:
+    try:
+        return await password_hasher.hash(password, key=username)
+    except PasswordPoolBusy as e:
+        raise busy_error(e)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -40,27 +114,69 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    headers = {"kid": JWT_KEY_ID} if PUBLIC_JWK else None
+    encoded_jwt = jwt.encode(to_encode, SIGNING_KEY, algorithm=ALGORITHM, headers=headers)
     return encoded_jwt
 
 
+async def get_user(db: AsyncSession, username: str) -> Optional[User]:
+    result = await db.execute(select(User).where(User.username == username))
+    return result.scalars().first()
+
+
+def decode_token(token: str) -> dict:
+    """Verified claims of ``token`` (cached until it expires); raises JWTError."""
+    key = token_key(token)
+    claims = token_cache.get(key)
+    if claims is None:
+        claims = jwt.decode(token, VERIFY_KEY, algorithms=[ALGORITHM])
+        token_cache.set(key, claims, expires_at=claims.get("exp"))
+    return claims
+
+
+async def get_user_projections(db: AsyncSession, usernames) -> dict:
+    """username -> ``{"id", "username"}`` for the existing users, with one ``IN (...)`` query for cache misses."""
+    found = {}
+    missing = []
+    for username in set(usernames):
+        projection = user_cache.get(username)
+        if projection is None:
+            missing.append(username)
+        else:
+            found[username] = projection
+    if missing:
+        result = await db.execute(select(User.id, User.username).where(User.username.in_(missing)))
+        for row in result:
+            found[row.username] = {"id": row.id, "username": row.username}
+            user_cache.set(row.username, found[row.username])
+    return found
+
+
+async def get_user_projection(db: AsyncSession, username: str) -> Optional[dict]:
+    return (await get_user_projections(db, [username])).get(username)
+
+
 async def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-) -> User:
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)
+) -> dict:
+    """``{"id", "username"}`` of the token's user; tokens carrying ``uid`` need no database query"""
     credential_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         username: str = payload.get("sub")
         if username is None:
             raise credential_exception
     except JWTError:
         raise credential_exception
 
-    user = db.query(User).filter(User.username == username).first()
+    if payload.get("uid") is not None:
+        return {"id": payload["uid"], "username": username}
+    # Tokens issued before uid was added
+    user = await get_user_projection(db, username)
     if user is None:
         raise credential_exception
     return user
@@ -72,36 +188,98 @@ async def health_check():
 
 
 @app.post("/register")
-async def register(username: str, password: str, db: Session = Depends(get_db)):
-    existing_user = db.query(User).filter(User.username == username).first()
+async def register(username: str, password: str, db: AsyncSession = Depends(get_db)):
+    existing_user = await get_user(db, username)
     if existing_user:
         raise HTTPException(status_code=400, detail="User already exists")
 
-    hashed_password = get_password_hash(password)
+    hashed_password = await get_password_hash(password, username)
     user = User(username=username, hashed_password=hashed_password)
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return {"id": user.id, "username": user.username}
 
 
 @app.post("/token")
 async def login(
-    form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
+    form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)
 ):
-    user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await get_user(db, form_data.username)
+    valid, new_hash = (False, None)
+    if user:
+        valid, new_hash = await verify_password(form_data.password, user.hashed_password, user.username)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials"
         )
+    if new_hash:
+        # Stored hash used a different BCRYPT_ROUNDS; upgrade it while we have the plaintext
+        user.hashed_password = new_hash
+        await db.commit()
 
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    # uid lets other services verify the token locally without a user lookup
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data={"sub": user.username, "uid": user.id}, expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
 
+@app.get("/.well-known/jwks.json")
+async def jwks():
+    """Public keys for local token verification (empty when tokens use the shared HS256 secret)"""
+    return {"keys": [PUBLIC_JWK] if PUBLIC_JWK else []}
+
+
+async def require_introspect_client(
+    credentials: Optional[HTTPBasicCredentials] = Depends(introspect_basic),
+) -> str:
+    """Client id of an INTROSPECT_CLIENTS resource server (RFC 7662 section 2.1); 401 for anyone else"""
+    expected = INTROSPECT_CLIENTS.get(credentials.username) if credentials else None
+    # Compare even for unknown ids so response time doesn't reveal which client ids exist
+    valid = hmac.compare_digest(
+        (credentials.password if credentials else "").encode(), (expected or "").encode()
+    )
+    if expected is None or not valid:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid client credentials",
+            headers={"WWW-Authenticate": 'Basic realm="introspect"'},
+        )
+    return credentials.username
+
+
+@app.post("/introspect/batch", dependencies=[Depends(require_introspect_client)])
+async def introspect_batch(request: IntrospectBatchRequest, db: AsyncSession = Depends(get_db)):
+    """Validate many tokens at once: one decode per token, one user lookup for the batch"""
+    if len(request.tokens) > INTROSPECT_MAX_TOKENS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {INTROSPECT_MAX_TOKENS} tokens per request",
+        )
+
+    decoded = []
+    for token in request.tokens:
+        try:
+            claims = decode_token(token)
+            decoded.append((claims, None if claims.get("sub") else "Token has no subject"))
+        except JWTError as e:
+            decoded.append((None, str(e)))
+
+    users = await get_user_projections(db, [claims["sub"] for claims, error in decoded if not error])
+    results = []
+    for claims, error in decoded:
+        user = users.get(claims["sub"]) if not error else None
+        if not error and user is None:
+            error = "User not found"
+        if error:
+            results.append({"active": False, "error": error})
+        else:
+            results.append({"active": True, "user_id": user["id"], "claims": claims})
+    return {"results": results}
+
+
 @app.get("/me")
-async def get_me(current_user: User = Depends(get_current_user)):
-    return {"id": current_user.id, "username": current_user.username}
+async def get_me(current_user: dict = Depends(get_current_user)):
+    return current_user
@@ -1,10 +1,9 @@
 from sqlalchemy import Column, Integer, String, DateTime
-from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
-Base = declarative_base()
+from database import Base
 
 
 class User(Base):
@@ -23,3 +22,7 @@ class TokenData(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+
+
+class IntrospectBatchRequest(BaseModel):
+    tokens: List[str]
@@ -0,0 +1,101 @@
+"""
+Bounded process pool for bcrypt hashing and verification.
+
+bcrypt is deliberately slow (~250 ms of CPU at cost 12), so running it in an
+``async def`` handler stalls every other request on the worker. Here each
+hash/verify runs in a separate process (bcrypt holds the GIL for part of its
+work, so threads would not scale across cores), and the number of queued or
+running jobs is capped: past ``max_pending`` new jobs fail fast with
+PasswordPoolBusy (503), and a single username may have at most
+``max_pending_per_key`` jobs in flight (429) so one account can't monopolise
+the pool.
+"""
+import asyncio
+import multiprocessing
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Hashable, Optional, Tuple
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when a password job can't be accepted; maps to 503 (or 429 per user) + Retry-After."""
+
+    def __init__(self, retry_after: int = 1, status_code: int = 503, message: str = "Password hashing queue is full"):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.status_code = status_code
+
+
+@lru_cache(maxsize=None)
+def _context(rounds: int):
+    from passlib.context import CryptContext
+
+    # Hashes with any other cost are reported as needing an update
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+
+def hash_password(password: str, rounds: int) -> str:
+    return _context(rounds).hash(password)
+
+
+def verify_and_update(password: str, hashed_password: str, rounds: int) -> Tuple[bool, Optional[str]]:
+    """``(valid, new_hash)``; new_hash is set when the stored hash used a different cost."""
+    return _context(rounds).verify_and_update(password, hashed_password)
+
+
+class PasswordHasher:
+    """Async front end to the bcrypt process pool."""
+
+    def __init__(
+        self,
+        rounds: int = 12,
+        workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        max_pending_per_key: int = 4,
+        retry_after: int = 1,
+    ):
+        self.rounds = rounds
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 8
+        self.max_pending_per_key = max_pending_per_key
+        self.retry_after = retry_after
+        self.pending = 0
+        self._pending_by_key: Counter = Counter()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def start(self) -> None:
+        if self._executor is None:
+            # spawn: forking a process that runs an event loop (and threads) is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, key: Hashable, fn, *args):
+        if self.pending >= self.max_pending:
+            raise PasswordPoolBusy(self.retry_after)
+        if key is not None and self._pending_by_key[key] >= self.max_pending_per_key:
+            raise PasswordPoolBusy(self.retry_after, 429, "Too many concurrent password attempts for this user")
+        self.start()
+        self.pending += 1
+        self._pending_by_key[key] += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.pending -= 1
+            self._pending_by_key[key] -= 1
+            if self._pending_by_key[key] <= 0:
+                del self._pending_by_key[key]
+
+    async def hash(self, password: str, key: Hashable = None) -> str:
+        return await self._run(key, hash_password, password, self.rounds)
+
+    async def verify(self, password: str, hashed_password: str, key: Hashable = None) -> Tuple[bool, Optional[str]]:
+        """Check ``password``; also returns a rehash at the configured cost if the stored one differs."""
+        return await self._run(key, verify_and_update, password, hashed_password, self.rounds)
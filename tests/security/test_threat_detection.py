@@ -23,3 +23,51 @@ def test_safe_keywords():
     test_text = "Show me the products"
     found = any(keyword in test_text.lower() for keyword in threat_keywords["injection"])
     assert found is False
+
+
+def _threat_matcher():
+    import sys
+    from pathlib import Path
+
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "services" / "llm-nlp-service"))
+    pytest.importorskip("yaml")
+    import threat_matcher
+
+    return threat_matcher
+
+
+def test_matcher_reports_every_category_with_offsets():
+    """All matched categories are returned, not just the first one."""
+    threat_matcher = _threat_matcher()
+    matcher = threat_matcher.ThreatMatcher(threat_matcher.DEFAULT_THREAT_KEYWORDS)
+
+    text = "SUDO cat ../etc/passwd"
+    matches = matcher.match(text)
+
+    assert matcher.matched_categories(matches) == ["privilege_escalation", "path_traversal"]
+    for match in matches:
+        assert text[match.start:match.end].lower() == match.keyword
+    assert matcher.classify(text) == "privilege_escalation"
+    assert matcher.classify("Show me the products") == "other"
+
+
+def test_matcher_finds_overlapping_keywords():
+    """Keywords nested inside or overlapping other keywords are all reported."""
+    threat_matcher = _threat_matcher()
+    matcher = threat_matcher.ThreatMatcher({"a": ["script", "javascript"], "b": ["java"]})
+
+    found = {(m.category, m.keyword, m.start) for m in matcher.match("javascript")}
+
+    assert found == {("a", "javascript", 0), ("b", "java", 0), ("a", "script", 4)}
+
+
+def test_keywords_file_matches_builtin_defaults():
+    """configs/threat_keywords.yaml stays in sync with the service fallback."""
+    from pathlib import Path
+
+    threat_matcher = _threat_matcher()
+    path = Path(__file__).resolve().parents[2] / "configs" / "threat_keywords.yaml"
+    matcher = threat_matcher.load_matcher(str(path))
+
+    assert matcher.categories == list(threat_matcher.DEFAULT_THREAT_KEYWORDS)
+    assert len(matcher) == sum(len(v) for v in threat_matcher.DEFAULT_THREAT_KEYWORDS.values())
@@ -0,0 +1,50 @@
+"""Shared fixtures for unit tests."""
+import importlib
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+SERVICES_DIR = Path(__file__).resolve().parents[2] / "services"
+SCRIPTS_DIR = SERVICES_DIR.parent / "scripts"
+
+
+def _purge_service_modules() -> None:
+    """Forget flat-imported service modules (main, models, database, ...) so services don't collide."""
+    for name, module in list(sys.modules.items()):
+        if str(getattr(module, "__file__", None) or "").startswith(str(SERVICES_DIR)):
+            del sys.modules[name]
+
+
+@pytest.fixture
+def service_app(monkeypatch, tmp_path):
+    """
+    Import ``services/<service>/main.py`` with the given env on a fresh SQLite database.
+
+    Returns the imported main module; use ``TestClient(module.app)`` to run its lifespan.
+    """
+
+    def load(service: str, **env):
+        pytest.importorskip("aiosqlite")
+        env.setdefault("DATABASE_URL", f"sqlite:///{tmp_path / service}.db")
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        _purge_service_modules()
+        monkeypatch.syspath_prepend(str(SERVICES_DIR / service))
+        return importlib.import_module("main")
+
+    yield load
+    _purge_service_modules()
+
+
+@pytest.fixture(scope="session")
+def tiny_bert_dir(tmp_path_factory):
+    """Randomly initialised 2-layer BERT + character-level tokenizer, built by scripts/benchmark.py."""
+    pytest.importorskip("torch")
+    pytest.importorskip("transformers")
+
+    spec = importlib.util.spec_from_file_location("benchmark_script", SCRIPTS_DIR / "benchmark.py")
+    benchmark = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(benchmark)
+    return benchmark.build_tiny_bert(tmp_path_factory.mktemp("models") / "tiny-bert")
@@ -0,0 +1,106 @@
+"""Tests for api-backend's local token verification."""
+import asyncio
+import importlib.util
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+jose_jwt = pytest.importorskip("jose.jwt")
+
+SERVICE_DIR = Path(__file__).resolve().parents[2] / "services" / "api-backend"
+
+
+def load(name, module_name):
+    spec = importlib.util.spec_from_file_location(module_name, SERVICE_DIR / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# auth does ``from ttl_cache import ...``; provide it without putting the service dir on sys.path
+sys.modules.setdefault("ttl_cache", load("ttl_cache", "ttl_cache"))
+auth = load("auth", "api_backend_auth")
+
+SECRET = "test-secret"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = time.time()
+
+    def __call__(self):
+        return self.now
+
+
+def make_token(key=SECRET, algorithm="HS256", exp=None, headers=None, **claims):
+    claims = {"sub": "alice", "uid": 7, "exp": exp or int(time.time()) + 600, **claims}
+    return jose_jwt.encode(claims, key, algorithm=algorithm, headers=headers)
+
+
+def test_shared_secret_token_is_verified_and_cached(monkeypatch):
+    clock = FakeClock()
+    verifier = auth.TokenVerifier(secret=SECRET, clock=clock, cache=auth.ClaimsCache(clock=clock))
+    token = make_token()
+
+    assert asyncio.run(verifier.verify(token)) == {"id": 7, "username": "alice"}
+    assert len(verifier.cache) == 1
+
+    # A cached token skips signature verification entirely
+    monkeypatch.setattr(auth.jwt, "decode", lambda *args, **kwargs: pytest.fail("decoded twice"))
+    assert asyncio.run(verifier.verify(token))["id"] == 7
+
+
+def test_cache_entries_expire_at_token_exp():
+    clock = FakeClock()
+    cache = auth.ClaimsCache(max_entries=2, clock=clock)
+    cache.set("a", {"exp": clock.now + 10})
+    cache.set("b", {"exp": clock.now + 100})
+    cache.set("c", {"exp": clock.now + 100})
+    assert cache.get("a") is None  # evicted as least recently used
+    clock.now += 200
+    assert cache.get("b") is None
+    assert len(cache) == 1
+
+
+def test_invalid_tokens_are_rejected():
+    verifier = auth.TokenVerifier(secret=SECRET)
+    with pytest.raises(auth.InvalidToken):
+        asyncio.run(verifier.verify(make_token(key="other-secret")))
+    with pytest.raises(auth.InvalidToken):
+        asyncio.run(verifier.verify(make_token(exp=1)))
+    with pytest.raises(auth.InvalidToken):
+        asyncio.run(verifier.verify(jose_jwt.encode({"sub": "alice", "exp": 4_000_000_000}, SECRET)))
+
+
+def test_rs256_tokens_are_verified_with_jwks():
+    pytest.importorskip("cryptography")
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from jose import jwk
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+    public_jwk = {**jwk.construct(private_pem, "RS256").public_key().to_dict(), "kid": "k1"}
+    fetches = []
+
+    def handler(request):
+        fetches.append(request.url.path)
+        return httpx.Response(200, json={"keys": [public_jwk]})
+
+    async def verify_twice():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            verifier = auth.TokenVerifier(jwks_url="http://oauth2/.well-known/jwks.json", http_client=client)
+            first = await verifier.verify(make_token(private_pem, "RS256", exp=4_000_000_000, headers={"kid": "k1"}))
+            second = await verifier.verify(make_token(private_pem, "RS256", exp=4_000_000_001, headers={"kid": "k1"}))
+            with pytest.raises(auth.InvalidToken):
+                await verifier.verify(make_token(SECRET, exp=4_000_000_000))
+            return first, second
+
+    first, second = asyncio.run(verify_twice())
+    assert first == second == {"id": 7, "username": "alice"}
+    assert fetches == ["/.well-known/jwks.json"]
@@ -0,0 +1,165 @@
+"""api-backend endpoint tests on SQLite (aiosqlite) with locally verified tokens."""
+import time
+
+import pytest
+
+pytest.importorskip("fastapi")
+jose_jwt = pytest.importorskip("jose.jwt")
+
+SECRET = "test-secret"
+
+
+def bearer(uid, username="alice"):
+    token = jose_jwt.encode({"sub": username, "uid": uid, "exp": int(time.time()) + 600}, SECRET, algorithm="HS256")
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def client(service_app):
+    from fastapi.testclient import TestClient
+
+    service = service_app("api-backend", JWT_SECRET_KEY=SECRET)
+    with TestClient(service.app) as client:
+        yield client
+
+
+def test_products_are_scoped_to_their_owner(client):
+    created = client.post("/products", params={"name": "lamp", "description": "desk", "price": 12.5}, headers=bearer(1))
+    assert created.status_code == 200
+    product_id = created.json()["id"]
+    client.post("/products", params={"name": "chair", "description": "", "price": 40}, headers=bearer(2, "bob"))
+
+    assert [p["name"] for p in client.get("/products", headers=bearer(1)).json()] == ["lamp"]
+    assert client.get(f"/products/{product_id}", headers=bearer(1)).json()["price"] == 12.5
+    assert client.get(f"/products/{product_id}", headers=bearer(2, "bob")).status_code == 404
+
+
+def test_requests_without_valid_token_are_rejected(client):
+    assert client.get("/products").status_code == 401
+    assert client.get("/products", headers={"Authorization": "Bearer nope"}).status_code == 401
+
+
+def test_products_are_paginated_by_cursor(client):
+    for i in range(5):
+        client.post("/products", params={"name": f"item-{i}", "description": "", "price": i}, headers=bearer(1))
+
+    names, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/products", params=params, headers=bearer(1))
+        names += [product["name"] for product in page.json()]
+        cursor = page.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert names == [f"item-{i}" for i in range(5)]
+
+
+def test_products_support_projection_and_filters(client):
+    for name, price in [("desk lamp", 20), ("desk", 150), ("chair", 40), ("desk_pad", 5)]:
+        client.post("/products", params={"name": name, "description": "", "price": price}, headers=bearer(1))
+
+    page = client.get(
+        "/products",
+        params={"fields": "name,price", "name_prefix": "desk", "min_price": 10, "max_price": 100},
+        headers=bearer(1),
+    )
+    assert page.json() == [{"name": "desk lamp", "price": 20.0}]
+    # LIKE wildcards in the prefix are matched literally
+    assert [p["name"] for p in client.get("/products", params={"name_prefix": "desk_"}, headers=bearer(1)).json()] == [
+        "desk_pad"
+    ]
+    assert client.get("/products", params={"fields": "name,password"}, headers=bearer(1)).status_code == 400
+
+
+def test_bulk_import_reports_bad_rows_without_rolling_back(client):
+    rows = [{"name": f"p{i}", "description": "", "price": i} for i in range(5)]
+    rows.insert(2, {"name": "broken", "price": "free"})
+    result = client.post("/products/bulk", json=rows, headers=bearer(1)).json()
+    assert result["received"] == 6
+    assert result["inserted"] == 5
+    assert [error["row"] for error in result["errors"]] == [3]
+    assert sum(len(chunk["ids"]) for chunk in result["chunks"]) == 5
+
+    ndjson = b"\n".join(
+        [
+            b'{"name": "n1", "description": "", "price": 1}',
+            b"not json",
+            b"",
+            b'{"name": "n2", "description": "", "price": 2}',
+        ]
+    )
+    result = client.post(
+        "/products/bulk", content=ndjson, headers={**bearer(1), "Content-Type": "application/x-ndjson"}
+    ).json()
+    assert result["inserted"] == 2
+    assert result["errors"][0]["row"] == 2
+
+    names = [p["name"] for p in client.get("/products", headers=bearer(1)).json()]
+    assert names == ["p0", "p1", "p2", "p3", "p4", "n1", "n2"]
+    assert client.post("/products/bulk", json={"name": "x"}, headers=bearer(1)).status_code == 400
+
+
+def test_conditional_get_skips_the_database(client):
+    import main
+    from sqlalchemy import event
+
+    client.post("/products", params={"name": "lamp", "description": "", "price": 1}, headers=bearer(1))
+    first = client.get("/products", headers=bearer(1))
+    etag = first.headers["ETag"]
+
+    queries = []
+    event.listen(main.engine.sync_engine, "before_cursor_execute", lambda *args: queries.append(args[2]))
+    assert client.get("/products", headers={**bearer(1), "If-None-Match": etag}).status_code == 304
+    assert client.get("/products", headers=bearer(1)).json() == first.json()  # served from the cache
+    assert queries == []
+
+    # A write invalidates the owner's ETags and cached pages
+    client.post("/products", params={"name": "desk", "description": "", "price": 2}, headers=bearer(1))
+    refreshed = client.get("/products", headers={**bearer(1), "If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert [p["name"] for p in refreshed.json()] == ["lamp", "desk"]
+    assert refreshed.headers["ETag"] != etag
+
+
+def test_if_none_match_star_needs_an_existing_product(client):
+    created = client.post("/products", params={"name": "lamp", "description": "", "price": 1}, headers=bearer(1))
+    product_id = created.json()["id"]
+    star = {**bearer(1), "If-None-Match": "*"}
+
+    assert client.get(f"/products/{product_id + 1}", headers=star).status_code == 404
+    assert client.get(f"/products/{product_id}", headers=star).status_code == 304
+
+
+def test_product_cache_needs_redis_with_several_replicas(service_app):
+    service = service_app("api-backend", JWT_SECRET_KEY=SECRET, API_REPLICAS="2")
+    assert service.product_cache is None
+
+
+def test_bulk_ndjson_rejects_over_long_lines(service_app):
+    from fastapi.testclient import TestClient
+
+    service = service_app("api-backend", JWT_SECRET_KEY=SECRET, BULK_MAX_LINE_BYTES="64")
+    headers = {**bearer(1), "Content-Type": "application/x-ndjson"}
+    with TestClient(service.app) as client:
+        ok = b'{"name": "n1", "description": "", "price": 1}\n'
+        assert client.post("/products/bulk", content=ok, headers=headers).json()["inserted"] == 1
+        # A body that never sends a newline isn't buffered past the limit
+        response = client.post("/products/bulk", content=ok + b"x" * 1000, headers=headers)
+        assert response.status_code == 413
+        assert "Row 2" in response.json()["detail"]
+
+
+def test_iter_ndjson_splits_lines_across_chunks(service_app):
+    import asyncio
+
+    service_app("api-backend", JWT_SECRET_KEY=SECRET)
+    from bulk import iter_ndjson
+
+    async def chunks():
+        for chunk in (b'{"a"', b": 1}\n\n", b'{"b": 2}\n{"c"', b": 3}"):
+            yield chunk
+
+    async def collect():
+        return [item async for item in iter_ndjson(chunks())]
+
+    assert asyncio.run(collect()) == [(1, b'{"a": 1}'), (3, b'{"b": 2}'), (4, b'{"c": 3}')]
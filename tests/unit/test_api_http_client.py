@@ -0,0 +1,60 @@
+"""Tests for api-backend's shared HTTP client helpers."""
+import asyncio
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("httpx")
+
+MODULE_PATH = Path(__file__).resolve().parents[2] / "services" / "api-backend" / "http_client.py"
+spec = importlib.util.spec_from_file_location("api_backend_http_client", MODULE_PATH)
+http_client = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(http_client)
+
+
+def test_concurrent_identical_calls_are_coalesced():
+    calls = []
+
+    async def check():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"id": 1}
+
+    async def burst():
+        flights = http_client.SingleFlight()
+        results = await asyncio.gather(*(flights.do("token", check) for _ in range(200)))
+        assert len(flights) == 0
+        # Once the call finished, the next caller starts a fresh one
+        await flights.do("token", check)
+        return results
+
+    results = asyncio.run(burst())
+    assert results == [{"id": 1}] * 200
+    assert len(calls) == 2
+
+
+def test_errors_are_shared_by_all_waiters():
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    async def burst():
+        flights = http_client.SingleFlight()
+        return await asyncio.gather(*(flights.do("token", fail) for _ in range(3)), return_exceptions=True)
+
+    errors = asyncio.run(burst())
+    assert all(isinstance(error, ValueError) for error in errors)
+
+
+def test_client_uses_configured_pool_limits():
+    async def build():
+        client = http_client.build_client(max_connections=7, read_timeout=3.0, http2=False)
+        try:
+            return client.timeout, client._transport._pool._max_connections
+        finally:
+            await client.aclose()
+
+    timeout, max_connections = asyncio.run(build())
+    assert timeout.read == 3.0
+    assert max_connections == 7
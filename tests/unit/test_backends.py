@@ -0,0 +1,57 @@
+"""Unit tests for the llm-nlp-service inference backends."""
+import sys
+from pathlib import Path
+
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "services" / "llm-nlp-service"))
+from backends import TorchBackend, load_backend
+
+
+@pytest.fixture(scope="module")
+def tiny_model(tiny_bert_dir, tmp_path_factory):
+    tokenizer = transformers.AutoTokenizer.from_pretrained(str(tiny_bert_dir))
+    model = transformers.AutoModelForSequenceClassification.from_pretrained(str(tiny_bert_dir)).eval()
+    return tmp_path_factory.mktemp("export"), tokenizer, model
+
+
+def encode(tokenizer, texts):
+    return tokenizer(texts, return_tensors="pt", padding=True)
+
+
+def test_int8_backend_quantizes_linear_layers(tiny_model):
+    _, tokenizer, model = tiny_model
+    backend = load_backend("torch-int8", tokenizer, model)
+    assert backend.name == "torch-int8"
+    assert not any(type(module) is torch.nn.Linear for module in backend.model.modules())
+
+    inputs = encode(tokenizer, ["drop table users", "hello"])
+    with torch.no_grad():
+        expected = TorchBackend(model).logits(inputs)
+        actual = backend.logits(inputs)
+    assert actual.shape == expected.shape
+    assert torch.allclose(actual, expected, atol=0.1)
+
+
+def test_onnx_export_is_verified_at_load(tiny_model):
+    pytest.importorskip("onnx")
+    pytest.importorskip("onnxruntime")
+    from backends import export_onnx
+
+    directory, tokenizer, model = tiny_model
+    onnx_path = export_onnx(tokenizer, model, str(directory / "onnx"))
+    backend = load_backend("onnx", tokenizer, onnx_path=onnx_path, tolerance=1e-4)
+
+    inputs = encode(tokenizer, ["<script>alert(1)</script>"])
+    with torch.no_grad():
+        expected = TorchBackend(model).logits(inputs)
+    assert torch.allclose(backend.logits(inputs), expected, atol=1e-4)
+
+
+def test_unknown_backend_is_rejected(tiny_model):
+    _, tokenizer, model = tiny_model
+    with pytest.raises(ValueError):
+        load_backend("tensorrt", tokenizer, model)
@@ -0,0 +1,132 @@
+"""Unit tests for the llm-nlp-service micro-batcher."""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "services" / "llm-nlp-service"))
+from batching import MicroBatcher
+from inference_pool import InferenceOverloaded, InferencePool, default_workers
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_concurrent_requests_are_coalesced():
+    calls = []
+
+    def predict(texts):
+        calls.append(list(texts))
+        return [float(len(text)) for text in texts]
+
+    async def scenario():
+        batcher = MicroBatcher(predict, max_batch_size=8, max_wait_ms=20)
+        batcher.start()
+        scores = await asyncio.gather(*(batcher.submit("x" * n) for n in range(1, 6)))
+        await batcher.stop()
+        return batcher, scores
+
+    batcher, scores = run(scenario())
+    assert scores == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert len(calls) == 1
+    assert batcher.histogram() == {5: 1}
+
+
+def test_batch_size_is_capped():
+    def predict(texts):
+        return [0.0] * len(texts)
+
+    async def scenario():
+        batcher = MicroBatcher(predict, max_batch_size=4, max_wait_ms=20)
+        batcher.start()
+        await asyncio.gather(*(batcher.submit("t") for _ in range(10)))
+        await batcher.stop()
+        return batcher
+
+    batcher = run(scenario())
+    assert max(batcher.histogram()) <= 4
+    assert sum(size * count for size, count in batcher.histogram().items()) == 10
+
+
+def test_predict_errors_reach_every_caller():
+    def predict(texts):
+        raise ValueError("boom")
+
+    async def scenario():
+        batcher = MicroBatcher(predict, max_batch_size=4, max_wait_ms=5)
+        batcher.start()
+        results = await asyncio.gather(
+            batcher.submit("a"), batcher.submit("b"), return_exceptions=True
+        )
+        await batcher.stop()
+        return results
+
+    results = run(scenario())
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_submit_requires_running_worker():
+    batcher = MicroBatcher(lambda texts: [0.0] * len(texts))
+    with pytest.raises(RuntimeError):
+        run(batcher.submit("text"))
+
+
+def test_batches_run_on_inference_pool():
+    pool = InferencePool(workers=2, threads_per_worker=1, max_pending=4)
+
+    def predict(texts):
+        return [1.0 if "attack" in text else 0.0 for text in texts]
+
+    async def scenario():
+        batcher = MicroBatcher(
+            lambda texts: pool.run(predict, texts), max_batch_size=4, max_concurrency=2
+        )
+        batcher.start()
+        scores = await asyncio.gather(*(batcher.submit(t) for t in ["ok", "attack", "ok"]))
+        await batcher.stop()
+        return scores
+
+    try:
+        assert run(scenario()) == [0.0, 1.0, 0.0]
+    finally:
+        pool.shutdown()
+
+
+def test_full_queue_raises_overloaded():
+    async def scenario():
+        batcher = MicroBatcher(lambda texts: [0.0] * len(texts), max_queue=1, retry_after=7)
+        batcher.start()
+        first = asyncio.ensure_future(batcher.submit("a"))
+        second = asyncio.ensure_future(batcher.submit("b"))
+        results = await asyncio.gather(first, second, return_exceptions=True)
+        await batcher.stop()
+        return results
+
+    results = run(scenario())
+    assert results[0] == 0.0
+    assert isinstance(results[1], InferenceOverloaded)
+    assert results[1].retry_after == 7
+
+
+def test_saturated_pool_rejects_jobs():
+    pool = InferencePool(workers=1, threads_per_worker=1, max_pending=0, retry_after=3)
+    try:
+        with pytest.raises(InferenceOverloaded) as excinfo:
+            run(pool.run(len, "text"))
+        assert excinfo.value.retry_after == 3
+    finally:
+        pool.shutdown()
+
+
+def test_torch_threads_are_set_once_per_process(monkeypatch):
+    torch = pytest.importorskip("torch")
+    calls = []
+    monkeypatch.setattr(torch, "set_num_threads", calls.append)
+
+    pool = InferencePool(workers=2, threads_per_worker=3)
+    pool.configure_torch()
+    assert calls == [3]
+    pool.shutdown()
+    assert default_workers(1) == 1 and default_workers(16) == 4
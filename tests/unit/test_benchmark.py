@@ -0,0 +1,63 @@
+"""Tests for the benchmark harness (scripts/benchmark.py)."""
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+SCRIPT = Path(__file__).resolve().parents[2] / "scripts" / "benchmark.py"
+
+
+@pytest.fixture(scope="module")
+def benchmark():
+    spec = importlib.util.spec_from_file_location("benchmark_script", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run(service, p50, p95, rps, calibration=1.0, errors=0):
+    return {
+        "machine": {"calibration_s": calibration},
+        "services": {
+            service: {
+                "errors": errors,
+                "throughput_rps": rps,
+                "operations": {"me": {"p50_ms": p50, "p95_ms": p95}},
+            }
+        },
+    }
+
+
+def test_percentile_is_nearest_rank(benchmark):
+    values = [float(v) for v in range(1, 101)]
+    assert benchmark.percentile(values, 50) == 50
+    assert benchmark.percentile(values, 95) == 95
+    assert benchmark.percentile(values, 99) == 99
+    assert benchmark.percentile([7.0], 99) == 7.0
+    assert benchmark.percentile([], 50) == 0.0
+
+
+def test_compare_flags_regressions_relative_to_machine_speed(benchmark):
+    baseline = run("oauth2-service", p50=10, p95=20, rps=100)
+    assert benchmark.compare(run("oauth2-service", 12, 35, 80), baseline, 0.5, 1.0) == []
+    # Same latencies on a machine twice as fast are a 2x regression
+    regressions = benchmark.compare(run("oauth2-service", 10, 20, 90, calibration=0.5), baseline, 0.5, 1.0)
+    assert len(regressions) == 2 and "throughput" in regressions[0] and "p50_ms" in regressions[1]
+    assert "errors" in benchmark.compare(run("oauth2-service", 10, 20, 100, errors=3), baseline, 0.5, 1.0)[0]
+
+
+def test_oauth2_mix_runs_in_process(benchmark, service_app):
+    # service_app is only requested for its teardown, which forgets the imported service modules
+    pytest.importorskip("fastapi")
+    pytest.importorskip("aiosqlite")
+    pytest.importorskip("passlib")
+    args = benchmark.argparse.Namespace(
+        services=["oauth2-service"], iterations=4, warmup=1, concurrency=2, bcrypt_rounds=4, oauth2_db="", api_db=""
+    )
+    results = benchmark.run_benchmarks(args)
+    stats = results["services"]["oauth2-service"]
+    assert stats["errors"] == 0
+    assert stats["operations"]["token"]["requests"] == 4
+    assert stats["operations"]["me"]["requests"] == 16
+    assert stats["operations"]["me"]["p50_ms"] <= stats["operations"]["me"]["p99_ms"]
+
@@ -0,0 +1,69 @@
+"""Tests for the persistent findings store (scripts/findings_store.py)."""
+import sys
+from pathlib import Path
+
+import pytest
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[2] / "scripts"
+
+
+@pytest.fixture
+def findings_store(monkeypatch):
+    monkeypatch.syspath_prepend(str(SCRIPTS_DIR))
+    for name in ("findings_store", "report_loaders", "json_stream"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    import findings_store
+
+    return findings_store
+
+
+@pytest.fixture
+def store(findings_store, tmp_path):
+    store = findings_store.FindingsStore(str(tmp_path / "findings.db"))
+    yield store
+    store.close()
+
+
+def entries(findings_store, *specs):
+    return [
+        (fingerprint, findings_store.Finding("bandit", f"{fingerprint}.py", 1, "B101", severity, "x"), ["bandit"])
+        for fingerprint, severity in specs
+    ]
+
+
+def test_artifacts_are_cached_by_content_hash_and_loader_version(findings_store, store, tmp_path, monkeypatch):
+    artifact = tmp_path / "bandit.json"
+    artifact.write_text('{"results": []}')
+    digest = findings_store.content_hash(str(artifact))
+    finding = findings_store.Finding("bandit", "app.py", 3, "B101", "high", "assert", "CWE-703", "assert x")
+
+    assert not store.has_artifact("lab", digest, "bandit")
+    store.save_artifact("lab", digest, "bandit", [finding])
+    assert store.has_artifact("lab", digest, "bandit")
+    assert not store.has_artifact("other", digest, "bandit")
+    assert list(store.artifact_findings("lab", digest, "bandit")) == [finding]
+
+    monkeypatch.setattr(findings_store, "LOADER_VERSION", findings_store.LOADER_VERSION + 1)
+    assert not store.has_artifact("lab", digest, "bandit")
+
+    assert store.prune_artifacts("lab", keep=[]) == 1
+    assert list(store.artifact_findings("lab", digest, "bandit")) == []
+
+
+def test_runs_diff_against_the_previous_run_of_the_repo(findings_store, store):
+    first = store.record_run("lab", "a1", entries(findings_store, ("fp1", "high"), ("fp2", "low")))
+    store.record_run("other", "z9", entries(findings_store, ("fp9", "critical")))
+    assert store.diff(first) == {"previous_commit": None, "new": 2, "fixed": 0, "persisting": 0}
+
+    second = store.record_run("lab", "b2", entries(findings_store, ("fp2", "low"), ("fp3", "medium")))
+    assert store.diff(second) == {"previous_commit": "a1", "new": 1, "fixed": 1, "persisting": 1}
+    assert [f["fingerprint"] for f in store.iter_new(second, first)] == ["fp3"]
+    assert [f["fingerprint"] for f in store.iter_fixed(second, first)] == ["fp1"]
+
+    # Re-running a commit replaces its run instead of adding one
+    third = store.record_run("lab", "b2", entries(findings_store, ("fp2", "low")))
+    assert store.previous_run(third)["commit_sha"] == "a1"
+    assert [(t["commit_sha"], t["total"], t["high"], t["low"]) for t in store.trend("lab")] == [
+        ("a1", 2, 1, 1),
+        ("b2", 1, 0, 1),
+    ]
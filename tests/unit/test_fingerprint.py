@@ -0,0 +1,79 @@
+"""Tests for cross-scanner fingerprints (scripts/fingerprint.py)."""
+import sys
+from pathlib import Path
+
+import pytest
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[2] / "scripts"
+
+
+@pytest.fixture
+def fingerprint(monkeypatch):
+    monkeypatch.syspath_prepend(str(SCRIPTS_DIR))
+    for name in ("fingerprint", "report_loaders", "json_stream"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    import fingerprint
+
+    return fingerprint
+
+
+@pytest.mark.parametrize(
+    "raw, expected",
+    [
+        ("services/api/main.py", "services/api/main.py"),
+        ("./services/api/../api/main.py", "services/api/main.py"),
+        ("file:///github/workspace/services/api/main.py", "services/api/main.py"),
+        ("/home/runner/work/lab/lab/services/api/main.py", "services/api/main.py"),
+        ("/src/services/api/main.py", "services/api/main.py"),
+        ("services\\api\\main%20copy.py", "services/api/main copy.py"),
+        ("", ""),
+    ],
+)
+def test_normalize_path(fingerprint, raw, expected):
+    assert fingerprint.normalize_path(raw) == expected
+
+
+def test_scanners_agree_on_the_same_source_line(fingerprint, tmp_path):
+    Finding = fingerprint.Finding
+    (tmp_path / "app").mkdir()
+    (tmp_path / "app" / "db.py").write_text("import db\n\ncursor.execute('SELECT ' + q)\n")
+    findings = [
+        Finding("bandit", "app/db.py", 3, "B608", "medium", "sql", "CWE-89", "cursor.execute('SELECT ' + q)"),
+        Finding("semgrep", "/src/app/db.py", 3, "python.sqli", "high", "sql", "CWE-89", ""),
+        Finding("codeql", "file:///github/workspace/app/db.py", 3, "py/sql-injection", "high", "sql", "CWE-89"),
+        # Same line, different weakness
+        Finding("bandit", "app/db.py", 3, "B101", "low", "assert", "CWE-703", ""),
+        # Same rule further down the file
+        Finding("semgrep", "app/db.py", 40, "python.sqli", "high", "sql", "CWE-89", ""),
+    ]
+
+    index = fingerprint.FindingIndex(fingerprint.Fingerprinter(str(tmp_path)))
+    fingerprints = [index.add(finding) for finding in findings]
+    assert len(set(fingerprints)) == len(index) == 3
+    assert index.added == 5
+
+    merged = {fp: (finding, scanners) for fp, finding, scanners in index}
+    finding, scanners = merged[fingerprints[0]]
+    assert scanners == ["bandit", "codeql", "semgrep"]
+    assert finding.scanner == "bandit" and finding.severity == "high"
+
+
+def test_snippets_distinguish_findings_without_a_checkout(fingerprint):
+    Finding = fingerprint.Finding
+    fingerprinter = fingerprint.Fingerprinter()
+    first = Finding("bandit", "a.py", 10, "B602", "high", "", "CWE-78", "subprocess.call(a, shell=True)")
+    reformatted = first._replace(scanner="semgrep", rule_id="x", snippet="subprocess.call(a,  shell=True)")
+    assert fingerprinter(first) == fingerprinter(reformatted)
+    assert fingerprinter(first) != fingerprinter(first._replace(snippet="subprocess.call(b, shell=True)"))
+    # Without a family, rule ids must match
+    assert fingerprinter(first._replace(family="")) != fingerprinter(first._replace(family="", rule_id="other"))
+    # A fingerprint already stored on the finding is reused as is
+    assert fingerprinter(first._replace(fingerprint="cached")) == "cached"
+
+
+def test_source_lines_outside_the_checkout_are_ignored(fingerprint, tmp_path):
+    (tmp_path / "outside.py").write_text("secret = 1\n")
+    checkout = tmp_path / "checkout"
+    checkout.mkdir()
+    assert fingerprint.Fingerprinter(str(checkout)).source_line("../outside.py", 1) == ""
+    assert fingerprint.Fingerprinter(str(tmp_path)).source_line("outside.py", 1) == "secret = 1"
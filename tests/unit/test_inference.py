@@ -0,0 +1,67 @@
+"""Unit tests for llm-nlp-service batched and sliding-window scoring."""
+import string
+import sys
+from pathlib import Path
+
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "services" / "llm-nlp-service"))
+from inference import score_texts
+
+
+@pytest.fixture(scope="module")
+def tokenizer(tmp_path_factory):
+    vocab_file = tmp_path_factory.mktemp("vocab") / "vocab.txt"
+    vocab_file.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + list(string.ascii_lowercase)))
+    return transformers.BertTokenizerFast(str(vocab_file))
+
+
+class MarkerBackend:
+    """Flags a sequence as a threat iff it contains the token for "z"."""
+
+    name = "marker"
+
+    def __init__(self, tokenizer):
+        self.marker = tokenizer.convert_tokens_to_ids("z")
+        self.batch_shapes = []
+
+    def logits(self, inputs):
+        self.batch_shapes.append(tuple(inputs["input_ids"].shape))
+        hit = (inputs["input_ids"] == self.marker).any(dim=1).float()
+        return torch.stack([1 - hit, hit], dim=1) * 10
+
+
+def test_results_keep_input_order_and_pad_per_bucket(tokenizer):
+    backend = MarkerBackend(tokenizer)
+    texts = ["a " * 50, "z", "a", "a " * 50 + "z"]
+
+    scores = score_texts(tokenizer, backend, texts, bucket_size=2)
+
+    assert [round(score) for score in scores] == [0, 1, 0, 1]
+    # Short texts share a bucket and are padded only to their own length
+    assert backend.batch_shapes == [(2, 3), (2, 53)]
+
+
+def test_long_text_windows_catch_trailing_payload(tokenizer):
+    text = "a " * 2000 + "z"
+
+    truncated = score_texts(tokenizer, MarkerBackend(tokenizer), [text], max_length=64)
+    windowed = score_texts(tokenizer, MarkerBackend(tokenizer), [text], max_length=64, long_text=True, stride=16)
+
+    assert truncated[0] < 0.5
+    assert windowed[0] > 0.5
+
+
+def test_long_text_mean_aggregation_and_bounded_batches(tokenizer):
+    backend = MarkerBackend(tokenizer)
+    text = "a " * 1000 + "z"
+
+    [score] = score_texts(
+        tokenizer, backend, [text], max_length=64, long_text=True, stride=16, aggregation="mean", window_batch_size=4
+    )
+
+    assert 0.0 < score < 0.5
+    assert all(shape[0] <= 4 and shape[1] <= 64 for shape in backend.batch_shapes)
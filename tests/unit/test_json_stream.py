@@ -0,0 +1,93 @@
+"""Tests for the incremental JSON parser used by the report generator."""
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[2] / "scripts"
+
+
+@pytest.fixture
+def json_stream(monkeypatch):
+    monkeypatch.syspath_prepend(str(SCRIPTS_DIR))
+    monkeypatch.delitem(sys.modules, "json_stream", raising=False)
+    import json_stream
+
+    # Exercise the stdlib parser even where ijson is installed
+    monkeypatch.setattr(json_stream, "ijson", None)
+    return json_stream
+
+
+DOCUMENT = {
+    "errors": [{"reason": 'tricky "quotes" \\ and ] brackets } inside strings'}],
+    "generated_at": "2024-01-01",
+    "metrics": {"_totals": {"loc": 12345, "nested": [[1, 2], {"a": [3]}]}},
+    "results": [
+        {"test_id": "B101", "line_number": 3, "issue_text": "assert used é\\n", "score": 1.5e-3},
+        {"test_id": "B602", "line_number": 10, "code": "subprocess.call(x, shell=True)  # [{"},
+        12,
+        None,
+    ],
+    "trailing": True,
+}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 64, 1 << 16])
+def test_yields_items_across_chunk_boundaries(json_stream, tmp_path, chunk_size):
+    path = tmp_path / "report.json"
+    path.write_text(json.dumps(DOCUMENT, indent=2))
+    assert list(json_stream.iter_json_items(path, "results.item", chunk_size)) == DOCUMENT["results"]
+    assert list(json_stream.iter_json_items(path, "metrics._totals.nested.item", chunk_size)) == [[1, 2], {"a": [3]}]
+    assert list(json_stream.iter_json_items(path, "", chunk_size)) == [DOCUMENT]
+
+
+def test_paths_that_do_not_match_yield_nothing(json_stream, tmp_path):
+    path = tmp_path / "report.json"
+    path.write_text(json.dumps(DOCUMENT))
+    assert list(json_stream.iter_json_items(path, "item")) == []
+    assert list(json_stream.iter_json_items(path, "missing.item")) == []
+    assert list(json_stream.iter_json_items(path, "generated_at.item")) == []
+
+    path.write_text("[[1, 2], [3]]")
+    assert list(json_stream.iter_json_items(path, "item.item")) == [1, 2, 3]
+
+
+def test_truncated_input_raises(json_stream, tmp_path):
+    path = tmp_path / "report.json"
+    path.write_text(json.dumps(DOCUMENT)[:-40])
+    with pytest.raises(ValueError):
+        list(json_stream.iter_json_items(path, "results.item", chunk_size=16))
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        '{"results": [1.5]}',
+        '{"results": [-2.5e10, 3E-2, 0.125, 10, -0, 6.02e+23]}',
+        '{"results": [{"score": 12.75, "cvss": [7.5, 1e3]}], "skipped": -4.5e-1}',
+    ],
+)
+def test_numbers_split_across_chunks_match_json_loads(json_stream, tmp_path, text):
+    path = tmp_path / "report.json"
+    path.write_text(text)
+    expected = json.loads(text)["results"]
+    for chunk_size in range(1, len(text) + 1):
+        assert list(json_stream.iter_json_items(path, "results.item", chunk_size)) == expected, chunk_size
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 1 << 16])
+def test_iter_json_paths_reads_several_prefixes_in_one_pass(json_stream, tmp_path, chunk_size):
+    document = {"runs": [{"results": [1, 2], "tool": {"name": "a"}}, {"tool": {"name": "b"}, "results": [3]}]}
+    path = tmp_path / "report.sarif"
+    path.write_text(json.dumps(document))
+    prefixes = ["runs.item", "runs.item.tool", "runs.item.results.item"]
+    assert list(json_stream.iter_json_paths(path, prefixes, chunk_size)) == [
+        ("runs.item", None),
+        ("runs.item.results.item", 1),
+        ("runs.item.results.item", 2),
+        ("runs.item.tool", {"name": "a"}),
+        ("runs.item", None),
+        ("runs.item.tool", {"name": "b"}),
+        ("runs.item.results.item", 3),
+    ]
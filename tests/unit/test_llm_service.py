@@ -0,0 +1,157 @@
+"""Startup/readiness tests for llm-nlp-service with a tiny local model."""
+import importlib.util
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+SERVICE_DIR = Path(__file__).resolve().parents[2] / "services" / "llm-nlp-service"
+
+
+@pytest.fixture
+def load_service(monkeypatch, tiny_bert_dir):
+    """Import main.py fresh (env is read at import time) under a unique module name."""
+
+    def load(**env):
+        settings = {
+            "DISABLE_LOCAL_MODEL": "false",
+            "MODEL_PATH": str(tiny_bert_dir),
+            "ALLOWED_MODEL_PREFIX": str(tiny_bert_dir.parent),
+            "WARMUP_BATCHES": "1",
+            "BATCH_MAX_WAIT_MS": "1",
+        }
+        settings.update(env)
+        for name, value in settings.items():
+            monkeypatch.setenv(name, value)
+        monkeypatch.syspath_prepend(str(SERVICE_DIR))
+        monkeypatch.delitem(sys.modules, "model_loader", raising=False)
+        spec = importlib.util.spec_from_file_location("llm_nlp_main", SERVICE_DIR / "main.py")
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+    yield load
+    sys.modules.pop("model_loader", None)
+
+
+def wait_until_ready(client, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if client.get("/ready").status_code == 200:
+            return
+        time.sleep(0.05)
+    raise AssertionError("model never became ready")
+
+
+def test_app_is_live_before_model_is_ready(load_service):
+    from fastapi.testclient import TestClient
+
+    service = load_service()
+    with TestClient(service.app) as client:
+        health = client.get("/health")
+        assert health.status_code == 200
+        assert health.json()["status"] == "healthy"
+
+        wait_until_ready(client)
+        response = client.post("/detect-threat", json={"text": "sudo cat ../etc/passwd"})
+        assert response.status_code == 200
+        assert response.json()["threat_type"] == "privilege_escalation"
+
+        batch = client.post("/detect-threats-batch", json={"texts": ["a", "b" * 600, "c"]})
+        assert batch.json()["total_processed"] == 3
+
+
+def test_batch_scores_match_single_requests_in_input_order(load_service, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    service = load_service(BULK_BUCKET_SIZE="2", RESULT_CACHE_ENABLED="false")
+    texts = ["long text " * 20, "hi", "x", "long text " * 20 + "sudo"]
+    with TestClient(service.app) as client:
+        wait_until_ready(client)
+        singles = [client.post("/detect-threat", json={"text": text}).json()["confidence"] for text in texts]
+
+        shapes = []
+        logits = service.model_state.backend.logits
+        monkeypatch.setattr(
+            service.model_state.backend,
+            "logits",
+            lambda inputs: shapes.append(tuple(inputs["input_ids"].shape)) or logits(inputs),
+        )
+        results = client.post("/detect-threats-batch", json={"texts": texts}).json()["results"]
+
+    assert [result["text"] for result in results] == [text[:100] for text in texts]
+    # Padding to the bucket's longest text doesn't change a text's score
+    assert [result["confidence"] for result in results] == pytest.approx(singles, abs=1e-5)
+    # Two length buckets of two, each padded only to its own longest sequence
+    assert [shape[0] for shape in shapes] == [2, 2]
+    assert shapes[0][1] < shapes[1][1]
+
+
+def test_requests_get_503_until_ready(load_service):
+    from fastapi.testclient import TestClient
+
+    service = load_service()
+    with TestClient(service.app) as client:
+        wait_until_ready(client)
+        service.model_state.status = "loading"
+        response = client.post("/detect-threat", json={"text": "hello"})
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == str(service.MODEL_RETRY_AFTER)
+        assert client.get("/ready").status_code == 503
+
+
+def test_failed_load_is_reported_by_health(load_service):
+    from fastapi.testclient import TestClient
+
+    service = load_service(DISABLE_LOCAL_MODEL="true")
+    with TestClient(service.app) as client:
+        deadline = time.monotonic() + 30
+        while service.model_state.status != "failed" and time.monotonic() < deadline:
+            time.sleep(0.05)
+        health = client.get("/health")
+        assert health.status_code == 503
+        assert "disabled" in health.json()["error"]
+
+
+def test_eager_mode_writes_model_cache(load_service, tiny_bert_dir):
+    from fastapi.testclient import TestClient
+
+    cache_dir = tiny_bert_dir.parent / "cache"
+    service = load_service(MODEL_LOAD_MODE="eager", MODEL_CACHE_DIR=str(cache_dir))
+    with TestClient(service.app) as client:
+        assert client.get("/ready").status_code == 200
+    snapshots = list(cache_dir.glob("*/model.safetensors"))
+    assert len(snapshots) == 1
+
+
+def test_metrics_expose_stage_latencies(load_service):
+    pytest.importorskip("prometheus_client")
+    from fastapi.testclient import TestClient
+
+    service = load_service()
+    with TestClient(service.app) as client:
+        wait_until_ready(client)
+        # Warmup batches stay out of the histograms
+        warm = client.get("/metrics").text
+        assert "threat_detector_batch_size_count 0.0" in warm
+        assert 'threat_detector_stage_seconds_count{stage="forward"} 0.0' in warm
+        client.post("/detect-threat", json={"text": "sudo rm -rf /"})
+        client.post("/detect-threat", json={"text": "sudo rm -rf /"})
+        client.post("/detect-threats-batch", json={"texts": ["a", "b"]})
+
+        body = client.get("/metrics").text
+        for stage in ("batch_wait", "queue_wait", "tokenization", "forward", "classify", "serialization"):
+            assert f'threat_detector_stage_seconds_count{{stage="{stage}"}}' in body
+        assert 'threat_detector_texts_total{source="cache"} 1.0' in body
+        assert 'threat_detector_texts_total{source="model"} 3.0' in body
+        assert "threat_detector_batch_size_bucket" in body
+        assert "process_resident_memory_bytes" in body
+
+        stats = client.post("/model-stats").json()
+        assert stats["model_name"] == service.MODEL_NAME
+        assert stats["backend"] == "torch"
+        assert stats["parameter_bytes"] > 0
@@ -0,0 +1,164 @@
+"""oauth2-service endpoint tests on SQLite (aiosqlite)."""
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("jose")
+pytest.importorskip("passlib")
+
+
+@pytest.fixture
+def service(service_app):
+    return service_app(
+        "oauth2-service",
+        SECRET_KEY="test-secret",
+        BCRYPT_ROUNDS="4",
+        PASSWORD_WORKERS="1",
+        INTROSPECT_CLIENTS="api-backend:resource-secret",
+    )
+
+
+RESOURCE_SERVER = ("api-backend", "resource-secret")
+
+
+def test_register_login_and_me(service):
+    from fastapi.testclient import TestClient
+
+    with TestClient(service.app) as client:
+        registered = client.post("/register", params={"username": "alice", "password": "s3cret"})
+        assert registered.status_code == 200
+        assert client.post("/register", params={"username": "alice", "password": "x"}).status_code == 400
+
+        assert client.post("/token", data={"username": "alice", "password": "wrong"}).status_code == 401
+        token = client.post("/token", data={"username": "alice", "password": "s3cret"}).json()["access_token"]
+        me = client.get("/me", headers={"Authorization": f"Bearer {token}"})
+        assert me.json() == registered.json()
+
+        claims = service.jwt.decode(token, "test-secret", algorithms=["HS256"])
+        assert claims["uid"] == registered.json()["id"]
+
+
+def test_login_rehashes_when_the_cost_changes(service_app):
+    from fastapi.testclient import TestClient
+    from sqlalchemy import select
+
+    async def stored_hash(service):
+        import database
+
+        async with database.SessionLocal() as db:
+            return (await db.execute(select(service.User.hashed_password))).scalar_one()
+
+    service = service_app("oauth2-service", BCRYPT_ROUNDS="4", PASSWORD_WORKERS="1")
+    with TestClient(service.app) as client:
+        client.post("/register", params={"username": "alice", "password": "s3cret"})
+        assert client.portal.call(stored_hash, service).startswith("$2b$04$")
+
+    service = service_app("oauth2-service", BCRYPT_ROUNDS="5", PASSWORD_WORKERS="1")
+    with TestClient(service.app) as client:
+        assert client.post("/token", data={"username": "alice", "password": "s3cret"}).status_code == 200
+        assert client.portal.call(stored_hash, service).startswith("$2b$05$")
+        assert client.post("/token", data={"username": "alice", "password": "s3cret"}).status_code == 200
+
+
+def test_me_is_served_from_cached_claims_and_user_projection(service):
+    from datetime import timedelta
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    async def rename(old, new):
+        import database
+
+        async with database.SessionLocal() as db:
+            user = await service.get_user(db, old)
+            user.username = new
+            await db.commit()
+
+    with TestClient(service.app) as client:
+        user = client.post("/register", params={"username": "alice", "password": "s3cret"}).json()
+        token = client.post("/token", data={"username": "alice", "password": "s3cret"}).json()["access_token"]
+        # Issued before uid was added to the claims
+        legacy = service.create_access_token({"sub": "alice"}, timedelta(minutes=5))
+
+        event.listen(service.engine.sync_engine, "before_cursor_execute", record)
+        try:
+            for _ in range(3):
+                assert client.get("/me", headers={"Authorization": f"Bearer {token}"}).json() == user
+            assert statements == []
+
+            for _ in range(3):
+                assert client.get("/me", headers={"Authorization": f"Bearer {legacy}"}).json() == user
+            assert len(statements) == 1
+        finally:
+            event.remove(service.engine.sync_engine, "before_cursor_execute", record)
+        assert service.token_cache.stats()["hits"] >= 4
+
+        client.portal.call(rename, "alice", "alicia")
+        assert "alice" not in service.user_cache._entries
+        assert client.get("/me", headers={"Authorization": f"Bearer {legacy}"}).status_code == 401
+
+
+def test_introspect_batch_uses_one_user_query(service):
+    from datetime import timedelta
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with TestClient(service.app) as client:
+        tokens = []
+        for name in ("alice", "bob"):
+            client.post("/register", params={"username": name, "password": "s3cret"})
+            tokens.append(client.post("/token", data={"username": name, "password": "s3cret"}).json()["access_token"])
+        ghost = service.create_access_token({"sub": "ghost", "uid": 99}, timedelta(minutes=5))
+        expired = service.create_access_token({"sub": "alice", "uid": 1}, timedelta(minutes=-5))
+
+        event.listen(service.engine.sync_engine, "before_cursor_execute", record)
+        try:
+            response = client.post(
+                "/introspect/batch", json={"tokens": tokens + [ghost, expired, "garbage"]}, auth=RESOURCE_SERVER
+            )
+        finally:
+            event.remove(service.engine.sync_engine, "before_cursor_execute", record)
+        assert response.status_code == 200
+        assert len(statements) == 1 and " IN " in statements[0]
+
+        alice, bob, ghost_result, expired_result, garbage = response.json()["results"]
+        assert alice["active"] and alice["claims"]["sub"] == "alice" and alice["user_id"] == 1
+        assert bob["active"] and bob["user_id"] == 2
+        assert ghost_result == {"active": False, "error": "User not found"}
+        assert not expired_result["active"] and not garbage["active"]
+
+        too_many = client.post(
+            "/introspect/batch", json={"tokens": ["x"] * (service.INTROSPECT_MAX_TOKENS + 1)}, auth=RESOURCE_SERVER
+        )
+        assert too_many.status_code == 413
+
+
+def test_introspect_batch_requires_client_credentials(service):
+    from fastapi.testclient import TestClient
+
+    with TestClient(service.app) as client:
+        client.post("/register", params={"username": "alice", "password": "s3cret"})
+        token = client.post("/token", data={"username": "alice", "password": "s3cret"}).json()["access_token"]
+        body = {"tokens": [token]}
+
+        for auth in (None, ("api-backend", "wrong"), ("unknown", "resource-secret")):
+            response = client.post("/introspect/batch", json=body, auth=auth)
+            assert response.status_code == 401
+            assert response.headers["WWW-Authenticate"].startswith("Basic")
+            assert "results" not in response.json()
+
+        # A user's own bearer token does not make it a resource server
+        response = client.post("/introspect/batch", json=body, headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 401
+
+        assert client.post("/introspect/batch", json=body, auth=RESOURCE_SERVER).json()["results"][0]["active"]
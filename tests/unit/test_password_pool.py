@@ -0,0 +1,63 @@
+"""Tests for oauth2-service's bcrypt process pool."""
+import asyncio
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("passlib")
+
+SERVICE_DIR = Path(__file__).resolve().parents[2] / "services" / "oauth2-service"
+
+
+@pytest.fixture
+def password_pool(monkeypatch):
+    # Worker processes unpickle jobs by module name, so import it as "password_pool"
+    monkeypatch.syspath_prepend(str(SERVICE_DIR))
+    monkeypatch.delitem(sys.modules, "password_pool", raising=False)
+    spec = importlib.util.spec_from_file_location("password_pool", SERVICE_DIR / "password_pool.py")
+    module = importlib.util.module_from_spec(spec)
+    monkeypatch.setitem(sys.modules, "password_pool", module)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_hash_verify_and_rehash(password_pool):
+    async def run():
+        old = password_pool.PasswordHasher(rounds=4, workers=1)
+        new = password_pool.PasswordHasher(rounds=5, workers=1)
+        try:
+            hashed = await old.hash("s3cret")
+            assert await old.verify("s3cret", hashed) == (True, None)
+            assert (await old.verify("wrong", hashed))[0] is False
+            valid, rehashed = await new.verify("s3cret", hashed)
+            return hashed, valid, rehashed
+        finally:
+            old.shutdown()
+            new.shutdown()
+
+    hashed, valid, rehashed = asyncio.run(run())
+    assert hashed.startswith("$2b$04$")
+    assert valid and rehashed.startswith("$2b$05$")
+
+
+def test_queue_limits_reject_excess_jobs(password_pool):
+    async def run():
+        hasher = password_pool.PasswordHasher(rounds=4, workers=1, max_pending=2, max_pending_per_key=1)
+        try:
+            results = await asyncio.gather(
+                hasher.hash("a", key="alice"),
+                hasher.hash("b", key="alice"),
+                hasher.hash("c", key="bob"),
+                hasher.hash("d", key="carol"),
+                return_exceptions=True,
+            )
+        finally:
+            hasher.shutdown()
+        return results
+
+    first, same_user, other_user, over_limit = asyncio.run(run())
+    assert first.startswith("$2b$04$") and other_user.startswith("$2b$04$")
+    assert isinstance(same_user, password_pool.PasswordPoolBusy) and same_user.status_code == 429
+    assert isinstance(over_limit, password_pool.PasswordPoolBusy) and over_limit.status_code == 503
@@ -0,0 +1,100 @@
+"""Tests for api-backend's per-owner product read cache."""
+import asyncio
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+SERVICE_DIR = Path(__file__).resolve().parents[2] / "services" / "api-backend"
+
+
+def load(name, module_name):
+    spec = importlib.util.spec_from_file_location(module_name, SERVICE_DIR / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# product_cache does ``from ttl_cache import ...``; provide it without putting the service dir on sys.path
+sys.modules.setdefault("ttl_cache", load("ttl_cache", "ttl_cache"))
+product_cache = load("product_cache", "api_backend_product_cache")
+
+
+class InMemoryRedis:
+    """Local stand-in for the subset of the redis.asyncio API the backend uses."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, px=None, nx=False):
+        assert (ex is None or ex > 0) and (px is None or px > 0), "Redis rejects non-positive expiry"
+        if nx and key in self.data:
+            return None
+        self.data[key] = value.encode() if isinstance(value, str) else value
+        return True
+
+
+def round_trip(backend):
+    async def run():
+        cache = product_cache.ProductCache(backend)
+        generation = await cache.generation(1)
+        assert await cache.generation(1) == generation
+        etag = cache.etag(1, generation, "/products?")
+
+        await cache.set(1, generation, "/products?", b'[{"id": 1}]', {"X-Next-Cursor": "1"})
+        assert await cache.get(1, generation, "/products?") == (b'[{"id": 1}]', {"X-Next-Cursor": "1"})
+
+        # A write to another owner leaves this owner's entries alone
+        await cache.invalidate(2)
+        assert await cache.generation(1) == generation
+
+        await cache.invalidate(1)
+        fresh = await cache.generation(1)
+        assert fresh != generation
+        assert cache.etag(1, fresh, "/products?") != etag
+        assert await cache.get(1, fresh, "/products?") is None
+        return cache.stats()
+
+    return asyncio.run(run())
+
+
+def test_lru_backend_invalidates_per_owner():
+    stats = round_trip(product_cache.LRUBackend(max_entries=10))
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_redis_backend_invalidates_per_owner():
+    stats = round_trip(product_cache.RedisBackend(InMemoryRedis()))
+    assert stats["backend"] == "RedisBackend"
+
+
+def test_redis_backend_keeps_sub_second_ttls():
+    backend = product_cache.RedisBackend(InMemoryRedis(), ttl_seconds=0.5)
+    assert backend.ttl_ms == 500
+    asyncio.run(backend.set("k", b"v"))
+    with pytest.raises(ValueError):
+        product_cache.RedisBackend(InMemoryRedis(), ttl_seconds=0)
+
+
+def test_lru_generations_are_bounded_and_expire():
+    now = [0.0]
+    backend = product_cache.LRUBackend(max_entries=10, ttl_seconds=60, clock=lambda: now[0], max_generations=2)
+
+    async def run():
+        await backend.get_generation(1)
+        await backend.get_generation(2)
+        await backend.get_generation(3)
+        assert list(backend._generations) == [2, 3]
+
+        # Reads don't extend a generation: another replica's write shows up within the TTL
+        now[0] = 30
+        second = await backend.get_generation(2)
+        assert await backend.get_generation(2) == second
+        now[0] = 61
+        assert await backend.get_generation(2) != second
+
+    asyncio.run(run())
@@ -0,0 +1,197 @@
+"""Tests for scripts/generate_report.py."""
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("jinja2")
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[2] / "scripts"
+
+
+@pytest.fixture
+def generate_report(monkeypatch):
+    monkeypatch.syspath_prepend(str(SCRIPTS_DIR))
+    for name in ("generate_report", "findings_store", "fingerprint", "report_loaders", "json_stream"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    import generate_report
+
+    return generate_report
+
+
+def bandit_result(filename, line, test_id, severity="HIGH"):
+    return {
+        "filename": filename,
+        "line_number": line,
+        "test_id": test_id,
+        "issue_severity": severity,
+        "issue_text": "x",
+    }
+
+
+def test_loaders_stream_and_deduplicate(generate_report, tmp_path):
+    finding, other = bandit_result("app.py", 3, "B101"), bandit_result("app.py", 9, "B602", "LOW")
+    (tmp_path / "bandit.json").write_text(json.dumps({"metrics": {}, "results": [finding, other, finding]}))
+    (tmp_path / "safety.json").write_text(json.dumps({"report_meta": {}}))
+
+    generator = generate_report.ReportGenerator(artifact_dir=str(tmp_path))
+    loaded = generator.load_bandit_report(str(tmp_path / "bandit.json"))
+    assert [(f.file, f.line, f.rule_id, f.severity) for f in loaded] == [
+        ("app.py", 3, "B101", "high"),
+        ("app.py", 9, "B602", "low"),
+    ]
+    assert generator.load_safety_report(str(tmp_path / "safety.json")) == []
+    assert generator.load_semgrep_report(str(tmp_path / "missing.json")) == []
+
+
+def test_generate_reports_from_discovered_artifacts(generate_report, tmp_path):
+    artifacts = tmp_path / "artifacts"
+    (artifacts / "bandit-report").mkdir(parents=True)
+    (artifacts / "bandit-report" / "bandit-report.json").write_text(
+        json.dumps({"results": [bandit_result("app.py", 3, "B101"), bandit_result("db.py", 7, "B608", "MEDIUM")]})
+    )
+    (artifacts / "semgrep.json").write_text(
+        json.dumps(
+            {"results": [{"path": "app.py", "start": {"line": 5}, "check_id": "r", "extra": {"severity": "ERROR"}}]}
+        )
+    )
+
+    generator = generate_report.ReportGenerator(artifact_dir=str(artifacts), workers=1)
+    assert generator.load_artifacts() == 2
+    aggregated = generator.generate_reports(output_dir=str(tmp_path / "reports"))
+
+    assert aggregated["summary"] == {"total_issues": 3, "critical": 0, "high": 2, "medium": 1, "low": 0, "info": 0}
+    assert aggregated["by_scanner"]["bandit"]["count"] == 2
+    report = json.loads((tmp_path / "reports" / "security-report.json").read_text())
+    assert report["by_scanner"]["semgrep"]["findings"][0]["file"] == "app.py"
+    assert "db.py" in (tmp_path / "reports" / "security-report.html").read_text()
+
+
+def test_findings_are_fingerprinted_once(generate_report, tmp_path, monkeypatch):
+    (tmp_path / "bandit.json").write_text(
+        json.dumps({"results": [bandit_result("app.py", 3, "B101"), bandit_result("db.py", 7, "B608")]})
+    )
+    generator = generate_report.ReportGenerator(artifact_dir=str(tmp_path), workers=1, source_cache_files=None)
+    lookups = []
+    source_line = generator.fingerprinter.source_line
+    monkeypatch.setattr(
+        generator.fingerprinter, "source_line", lambda *args: lookups.append(args) or source_line(*args)
+    )
+
+    generator.load_artifacts()
+    aggregated = generator.aggregate_findings()
+    assert len(lookups) == 2
+    stored = generator.findings["bandit"][0].fingerprint
+    assert stored and aggregated["by_scanner"]["bandit"]["findings"][0]["fingerprint"] == stored
+
+
+def test_findings_reported_by_several_scanners_are_merged(generate_report, tmp_path):
+    Finding = generate_report.Finding
+    (tmp_path / "app.py").write_text("import os\nos.system(cmd)\n")
+    generator = generate_report.ReportGenerator(artifact_dir=str(tmp_path), source_dir=str(tmp_path))
+    generator.findings["bandit"] = [Finding("bandit", "app.py", 2, "B605", "high", "shell", "CWE-78")]
+    generator.findings["semgrep"] = [
+        Finding("semgrep", "./app.py", 2, "os-system", "medium", "shell", "CWE-78"),
+        Finding("semgrep", "./app.py", 2, "os-system", "medium", "shell", "CWE-78"),
+        Finding("semgrep", "app.py", 1, "import-os", "low", "import", "", "import os"),
+    ]
+
+    aggregated = generator.aggregate_findings()
+    assert aggregated["summary"]["total_issues"] == 2
+    assert aggregated["summary"]["high"] == 1 and aggregated["summary"]["low"] == 1
+    assert aggregated["by_scanner"]["semgrep"]["count"] == 2
+    assert aggregated["by_scanner"]["semgrep"]["findings"][0]["scanners"] == ["bandit", "semgrep"]
+    assert aggregated["cross_scanner"] == {
+        "reported": 3,
+        "unique": 2,
+        "confirmed": 1,
+        "agreement": {"bandit+semgrep": 1},
+    }
+
+
+def test_store_reuses_unchanged_artifacts_and_diffs_runs(generate_report, tmp_path, monkeypatch):
+    artifacts = tmp_path / "artifacts"
+    artifacts.mkdir()
+    bandit = artifacts / "bandit.json"
+    bandit.write_text(json.dumps({"results": [bandit_result("app.py", 3, "B101"), bandit_result("db.py", 7, "B608")]}))
+    store = generate_report.FindingsStore(str(tmp_path / "findings.db"))
+    parsed = []
+    load_artifacts = generate_report.load_artifacts
+    monkeypatch.setattr(
+        generate_report, "load_artifacts", lambda jobs, workers: load_artifacts(parsed.extend(jobs) or jobs, workers)
+    )
+
+    def run(commit):
+        generator = generate_report.ReportGenerator(
+            artifact_dir=str(artifacts), workers=1, store=store, repo="lab", commit=commit
+        )
+        generator.load_artifacts()
+        return generator.aggregate_findings()
+
+    first = run("a1")
+    assert len(parsed) == 1
+    assert first["diff"] == {"previous_commit": None, "new": 2, "fixed": 0, "persisting": 0}
+
+    # Unchanged bytes: read back from the store, not parsed again
+    second = run("b2")
+    assert len(parsed) == 1
+    assert second["summary"]["total_issues"] == 2
+    assert second["diff"]["persisting"] == 2 and second["diff"]["new_findings"] == []
+
+    bandit.write_text(json.dumps({"results": [bandit_result("db.py", 7, "B608"), bandit_result("web.py", 1, "B201")]}))
+    third = run("c3")
+    assert len(parsed) == 2
+    assert {k: third["diff"][k] for k in ("previous_commit", "new", "fixed", "persisting")} == {
+        "previous_commit": "b2",
+        "new": 1,
+        "fixed": 1,
+        "persisting": 1,
+    }
+    assert [f["file"] for f in third["diff"]["new_findings"]] == ["web.py"]
+    assert [f["file"] for f in third["diff"]["fixed_findings"]] == ["app.py"]
+    trend = [(t["commit_sha"], t["total"], t["high"]) for t in third["trend"]]
+    assert trend == [("a1", 2, 2), ("b2", 2, 2), ("c3", 2, 2)]
+
+
+def test_store_does_not_cache_artifacts_that_fail_to_parse(generate_report, tmp_path, caplog):
+    artifacts = tmp_path / "artifacts"
+    artifacts.mkdir()
+    (artifacts / "bandit.json").write_text('{"results": [{"filename": ')
+    store = generate_report.FindingsStore(str(tmp_path / "findings.db"))
+
+    for commit in ("a1", "b2"):
+        caplog.clear()
+        generator = generate_report.ReportGenerator(
+            artifact_dir=str(artifacts), workers=1, store=store, repo="lab", commit=commit
+        )
+        generator.load_artifacts()
+        aggregated = generator.aggregate_findings()
+        assert "Failed to parse bandit artifact" in caplog.text
+        assert aggregated["failed_artifacts"] == [str(artifacts / "bandit.json")]
+
+    digest = generate_report.content_hash(str(artifacts / "bandit.json"))
+    assert not store.has_artifact("lab", digest, "bandit")
+
+
+def test_html_report_lists_every_finding_and_paginates(generate_report, tmp_path):
+    Finding = generate_report.Finding
+    generator = generate_report.ReportGenerator(artifact_dir=str(tmp_path))
+    generator.findings["bandit"] = [
+        Finding("bandit", f"app{i}.py", i, "B101", "high", f"<b>{i}</b>") for i in range(25)
+    ]
+    aggregated = generator.aggregate_findings()
+
+    generator.generate_html_report(aggregated, str(tmp_path / "full.html"))
+    full = (tmp_path / "full.html").read_text()
+    assert all(f"app{i}.py" in full for i in range(25))
+    assert "&lt;b&gt;24&lt;/b&gt;" in full and "<b>24</b>" not in full
+
+    (tmp_path / "paged").mkdir()
+    generator.generate_html_report(aggregated, str(tmp_path / "paged" / "report.html"), page_size=10)
+    pages = sorted(p.name for p in (tmp_path / "paged").iterdir())
+    assert pages == ["report-bandit-1.html", "report-bandit-2.html", "report-bandit-3.html", "report.html"]
+    index = (tmp_path / "paged" / "report.html").read_text()
+    assert 'href="report-bandit-3.html"' in index and "app0.py" not in index
+    last = (tmp_path / "paged" / "report-bandit-3.html").read_text()
+    assert "app24.py" in last and "app19.py" not in last
@@ -0,0 +1,193 @@
+"""Tests for the scanner report loaders (scripts/report_loaders.py)."""
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[2] / "scripts"
+
+
+@pytest.fixture
+def report_loaders(monkeypatch):
+    monkeypatch.syspath_prepend(str(SCRIPTS_DIR))
+    for name in ("report_loaders", "json_stream"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    import report_loaders
+
+    return report_loaders
+
+
+ARTIFACTS = {
+    "bandit-report.json": {
+        "results": [
+            {"filename": "a.py", "line_number": 4, "test_id": "B105", "issue_severity": "LOW", "issue_text": "pw",
+             "issue_cwe": {"id": 259}, "code": "3 x = 1\n4 password = 'hunter2'\n5 y = 2\n"}
+        ]
+    },
+    "semgrep.json": {
+        "results": [
+            {
+                "path": "b.py",
+                "start": {"line": 2},
+                "check_id": "sqli",
+                "extra": {
+                    "severity": "WARNING",
+                    "message": "m",
+                    "lines": "cur.execute(q)\n",
+                    "metadata": {"cwe": ["CWE-89: SQLi"]},
+                },
+            }
+        ]
+    },
+    "safety-reports/api.json": [["requests", "<2.31", "2.0.0", "CRLF injection", "58755"]],
+    "safety-v3.json": {
+        "vulnerabilities": [
+            {"package_name": "jinja2", "vulnerability_id": "1", "analyzed_version": "2.0", "advisory": "xss",
+             "severity": {"cvssv3": {"base_score": 9.1}}}
+        ]
+    },
+    "trivy-api.json": {
+        "Results": [
+            {
+                "Target": "requirements.txt",
+                "Vulnerabilities": [{"VulnerabilityID": "CVE-1", "Severity": "CRITICAL", "PkgName": "x", "Title": "t"}],
+                "Misconfigurations": [{"AVDID": "AVD-DS-0002", "Severity": "HIGH", "Title": "root",
+                                       "CauseMetadata": {"StartLine": 7}}],
+            }
+        ]
+    },
+    "pylint-report.json": [{"type": "error", "path": "c.py", "line": 8, "message-id": "E1101", "message": "no member"}],
+    "dependency-check-report.json": {
+        "dependencies": [{"fileName": "lib.jar", "vulnerabilities": [{"name": "CVE-2", "cvssv3": {"baseScore": 5.0}}]}]
+    },
+    "codeql/python.sarif": {
+        "version": "2.1.0",
+        "runs": [
+            {
+                "tool": {
+                    "driver": {
+                        "name": "CodeQL",
+                        "rules": [
+                            {
+                                "id": "py/sql",
+                                "properties": {
+                                    "security-severity": "8.8",
+                                    "tags": ["security", "external/cwe/cwe-089"],
+                                },
+                            }
+                        ],
+                    }
+                },
+                "results": [
+                    {
+                        "ruleId": "py/sql",
+                        "level": "error",
+                        "message": {"text": "SQL built from user input"},
+                        "locations": [
+                            {"physicalLocation": {"artifactLocation": {"uri": "d.py"}, "region": {"startLine": 12}}}
+                        ],
+                    }
+                ],
+            }
+        ],
+    },
+    # Same findings as trivy-api.json; skipped in favour of the native report
+    "trivy-api.sarif": {
+        "version": "2.1.0",
+        "runs": [{"tool": {"driver": {"name": "Trivy"}}, "results": [{"ruleId": "x"}]}],
+    },
+    "notes.json": {"results": []},
+}
+
+
+@pytest.fixture
+def artifact_dir(tmp_path):
+    for name, content in ARTIFACTS.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(content))
+    return tmp_path
+
+
+def test_discover_matches_loaders(report_loaders, artifact_dir):
+    jobs = {
+        Path(path).relative_to(artifact_dir).as_posix(): loader
+        for loader, path in report_loaders.discover(artifact_dir)
+    }
+    assert jobs == {
+        "bandit-report.json": "bandit",
+        "codeql/python.sarif": "sarif",
+        "dependency-check-report.json": "dependency-check",
+        "pylint-report.json": "pylint",
+        "safety-reports/api.json": "safety",
+        "safety-v3.json": "safety",
+        "semgrep.json": "semgrep",
+        "trivy-api.json": "trivy",
+    }
+    assert report_loaders.discover(artifact_dir / "missing") == []
+
+
+def test_discover_prefers_sarif_for_sarif_json(report_loaders, tmp_path):
+    for name in ("semgrep.sarif.json", "trivy-results.sarif.json", "semgrep.json"):
+        (tmp_path / name).write_text(json.dumps(ARTIFACTS["trivy-api.sarif"]))
+    jobs = {Path(path).name: loader for loader, path in report_loaders.discover(tmp_path)}
+    assert jobs == {"semgrep.sarif.json": "sarif", "trivy-results.sarif.json": "sarif", "semgrep.json": "semgrep"}
+
+
+def test_sarif_results_are_credited_to_their_own_run(report_loaders, tmp_path):
+    def result(rule_id, uri):
+        return {"ruleId": rule_id, "locations": [{"physicalLocation": {"artifactLocation": {"uri": uri}}}]}
+
+    codeql_rules = [{"id": "py/sql", "properties": {"security-severity": "9.5"}}]
+    runs = [
+        {
+            "tool": {"driver": {"name": "CodeQL", "rules": codeql_rules}},
+            "results": [result("py/sql", "a.py")],
+        },
+        # Results before the tool: still Semgrep's, and CodeQL's rule metadata doesn't leak into this run
+        {"results": [result("py/sql", "b.py")], "tool": {"driver": {"name": "Semgrep OSS"}}},
+        {"results": [result("x", "c.py")]},
+    ]
+    path = tmp_path / "combined.sarif"
+    path.write_text(json.dumps({"version": "2.1.0", "runs": runs}))
+    assert [(f.scanner, f.file, f.severity) for f in report_loaders.parse_sarif(str(path))] == [
+        ("codeql", "a.py", "critical"),
+        ("semgrep", "b.py", "medium"),
+        ("sarif", "c.py", "medium"),
+    ]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_load_artifacts_normalizes_every_format(report_loaders, artifact_dir, workers):
+    jobs = report_loaders.discover(artifact_dir)
+    findings = sorted(f for _, parsed in report_loaders.load_artifacts(jobs, workers) for f in parsed)
+    Finding = report_loaders.Finding
+    assert findings == [
+        Finding("bandit", "a.py", 4, "B105", "low", "pw", "CWE-259", "password = 'hunter2'"),
+        Finding("codeql", "d.py", 12, "py/sql", "high", "SQL built from user input", "CWE-89"),
+        Finding("dependency-check", "lib.jar", 0, "CVE-2", "medium", "", "CVE-2"),
+        Finding("pylint", "c.py", 8, "E1101", "high", "no member"),
+        Finding("safety", "jinja2", 0, "1", "critical", "jinja2 2.0: xss"),
+        Finding("safety", "requests", 0, "58755", "medium", "requests 2.0.0: CRLF injection"),
+        Finding("semgrep", "b.py", 2, "sqli", "medium", "m", "CWE-89", "cur.execute(q)"),
+        Finding("trivy", "requirements.txt", 0, "CVE-1", "critical", "x : t", "CVE-1"),
+        Finding("trivy", "requirements.txt", 7, "AVD-DS-0002", "high", "root"),
+    ]
+
+
+def test_dependency_check_falls_back_to_textual_severity(report_loaders, tmp_path):
+    vulnerabilities = [
+        {"name": "CVE-3", "severity": "HIGH", "cvssv3": {"baseScore": "N/A"}},
+        {"name": "CVE-4", "severity": "MODERATE"},
+        {"name": "CVE-5", "severity": "LOW", "cvssv3": {"baseScore": 9.8}},
+    ]
+    path = tmp_path / "dependency-check-report.json"
+    path.write_text(json.dumps({"dependencies": [{"fileName": "lib.jar", "vulnerabilities": vulnerabilities}]}))
+    assert [f.severity for f in report_loaders.parse_dependency_check(str(path))] == ["high", "medium", "critical"]
+
+
+def test_unparseable_artifacts_are_reported_and_skipped(report_loaders, tmp_path, caplog):
+    (tmp_path / "bandit.json").write_text('{"results": [{"filename": ')
+    assert report_loaders.parse_artifact("bandit", str(tmp_path / "bandit.json")) is None
+    assert "Failed to parse bandit artifact" in caplog.text
@@ -0,0 +1,110 @@
+"""Unit tests for the llm-nlp-service result cache."""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "services" / "llm-nlp-service"))
+from result_cache import LRUBackend, RedisBackend, ResultCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class InMemoryRedis:
+    """Local stand-in for the subset of the redis.asyncio API the backend uses."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        return InMemoryPipeline(self)
+
+
+class InMemoryPipeline:
+    def __init__(self, client):
+        self.client = client
+        self.pending = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def set(self, key, value, ex=None, px=None):
+        assert (ex is None or ex > 0) and (px is None or px > 0), "Redis rejects non-positive expiry"
+        self.pending.append((key, value.encode()))
+
+    async def execute(self):
+        self.client.data.update(self.pending)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_lru_evicts_least_recently_used():
+    backend = LRUBackend(max_entries=2, ttl_seconds=60)
+    run(backend.set_many({"a": 0.1, "b": 0.2}))
+    run(backend.get_many(["a"]))
+    run(backend.set_many({"c": 0.3}))
+    assert run(backend.get_many(["a", "b", "c"])) == [0.1, None, 0.3]
+
+
+def test_lru_expires_entries():
+    clock = FakeClock()
+    backend = LRUBackend(ttl_seconds=10, clock=clock)
+    run(backend.set_many({"a": 0.5}))
+    clock.now = 9.0
+    assert run(backend.get_many(["a"])) == [0.5]
+    clock.now = 10.0
+    assert run(backend.get_many(["a"])) == [None]
+    assert len(backend) == 0
+
+
+def test_cache_key_ignores_whitespace_and_threshold_independent():
+    cache = ResultCache(LRUBackend(), model_id="bert-base-uncased")
+    run(cache.set_many(["DROP  TABLE users "], [0.93]))
+    assert run(cache.get_many(["DROP TABLE users", "other"])) == [0.93, None]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_cache_key_depends_on_model():
+    first = ResultCache(LRUBackend(), model_id="model-a")
+    second = ResultCache(LRUBackend(), model_id="model-b")
+    assert first.key("payload") != second.key("payload")
+
+
+def test_redis_backend_round_trip():
+    cache = ResultCache(RedisBackend(InMemoryRedis(), ttl_seconds=60), model_id="m")
+    run(cache.set_many(["a", "b"], [0.25, 0.75]))
+    assert run(cache.get_many(["b", "a", "c"])) == [0.75, 0.25, None]
+
+
+def test_redis_backend_keeps_sub_second_ttls():
+    backend = RedisBackend(InMemoryRedis(), ttl_seconds=0.25)
+    assert backend.ttl_ms == 250
+    run(backend.set_many({"a": 0.5}))
+    assert run(backend.get_many(["a"])) == [0.5]
+    with pytest.raises(ValueError):
+        RedisBackend(InMemoryRedis(), ttl_seconds=0)
+
+
+def test_redis_errors_degrade_to_misses():
+    class BrokenRedis:
+        async def mget(self, keys):
+            raise ConnectionError("down")
+
+    backend = RedisBackend(BrokenRedis())
+    assert run(backend.get_many(["a", "b"])) == [None, None]
@@ -0,0 +1,48 @@
+"""Unit tests for the llm-nlp-service NDJSON streaming helpers."""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("starlette")
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "services" / "llm-nlp-service"))
+from streaming import LineTooLong, iter_batches, iter_lines
+
+
+async def chunked(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+async def collect(iterator):
+    return [item async for item in iterator]
+
+
+def test_lines_are_reassembled_across_chunks():
+    lines = asyncio.run(collect(iter_lines(chunked(b"fir", b"st\r\nsec", b"ond\nthird"))))
+    assert lines == [b"first", b"second", b"third"]
+
+
+def test_overlong_line_is_reported_and_skipped():
+    lines = asyncio.run(collect(iter_lines(chunked(b"ok\n", b"x" * 8, b"x" * 8, b"x\nnext\n"), max_line_bytes=10)))
+    assert lines[0] == b"ok"
+    assert isinstance(lines[1], LineTooLong)
+    assert lines[2:] == [b"next"]
+
+
+def test_ndjson_batches_keep_line_numbers_and_errors():
+    body = b'{"text": "a"}\n"b"\nnot json\n\n{"text": "c"}\n{"other": 1}\n'
+    batches = asyncio.run(collect(iter_batches(iter_lines(chunked(body)), ndjson=True, batch_size=2)))
+
+    texts = [item for batch, _ in batches for item in batch]
+    errors = [line for _, batch_errors in batches for line, _ in batch_errors]
+    assert texts == [(1, "a"), (2, "b"), (5, "c")]
+    assert errors == [3, 6]
+    assert [len(batch) for batch, _ in batches] == [2, 1]
+
+
+def test_plain_text_lines_are_used_verbatim():
+    lines = iter_lines(chunked(b'{"text": 1}\nDROP TABLE'))
+    batches = asyncio.run(collect(iter_batches(lines, ndjson=False, batch_size=10)))
+    assert batches == [([(1, '{"text": 1}'), (2, "DROP TABLE")], [])]